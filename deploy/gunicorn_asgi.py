@@ -0,0 +1,19 @@
+# deploy/gunicorn_asgi.py
+"""
+ASGI profile: gunicorn managing uvicorn workers, with the async views on.
+
+    pip install gunicorn uvicorn
+    gunicorn tracker.asgi:application -c deploy/gunicorn_asgi.py
+
+Each worker runs one event loop, so a slow dashboard aggregate no longer
+holds a whole worker; compare against deploy/gunicorn_wsgi.py with
+`manage.py load_test`.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+keepalive = 5
+raw_env = ['ASYNC_VIEWS=1']
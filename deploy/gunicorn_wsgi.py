@@ -0,0 +1,16 @@
+# deploy/gunicorn_wsgi.py
+"""
+WSGI profile: threaded sync workers running the sync views.
+
+    pip install gunicorn
+    gunicorn tracker.wsgi:application -c deploy/gunicorn_wsgi.py
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4))
+keepalive = 5
+raw_env = ['ASYNC_VIEWS=0']
@@ -1,6 +1,64 @@
 from django.contrib import admin
-from .models import Expense, Category, Profile
+from .models import Expense, ExpenseEvent, Category, Profile
 
-admin.site.register(Expense)
 admin.site.register(Category)
 admin.site.register(Profile)
+
+
+@admin.register(ExpenseEvent)
+class ExpenseEventAdmin(admin.ModelAdmin):
+    """The journal is append-only: readable here, never edited."""
+    list_display = ('seq', 'action', 'expense_id', 'user_id', 'created_at')
+    list_filter = ('action',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class DeletedFilter(admin.SimpleListFilter):
+    title = 'deleted'
+    parameter_name = 'deleted'
+
+    def lookups(self, request, model_admin):
+        return [('no', 'Live'), ('yes', 'Deleted')]
+
+    def queryset(self, request, queryset):
+        if self.value() in ('no', 'yes'):
+            return queryset.filter(deleted_at__isnull=self.value() == 'no')
+        return queryset
+
+
+@admin.register(Expense)
+class ExpenseAdmin(admin.ModelAdmin):
+    """
+    Every expense, deleted ones included. Deleting here is a soft delete
+    like on the site, so it can still be undone until the purge.
+    """
+    list_display = ('title', 'user', 'amount', 'currency', 'date', 'deleted_at')
+    list_filter = (DeletedFilter, 'deleted_at')
+    list_select_related = ('user',)
+    actions = ['restore_selected']
+
+    def get_queryset(self, request):
+        qs = Expense.all_objects.all()
+        ordering = self.get_ordering(request)
+        return qs.order_by(*ordering) if ordering else qs
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        # One save per row so rollups, counters, the index and the journal follow
+        for expense in queryset.filter(deleted_at__isnull=True):
+            expense.soft_delete()
+
+    @admin.action(description='Restore selected expenses')
+    def restore_selected(self, request, queryset):
+        for expense in queryset.filter(deleted_at__isnull=False):
+            expense.restore()
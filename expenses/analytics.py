@@ -0,0 +1,200 @@
+# expenses/analytics.py
+"""
+Spending analytics over a user's whole history, computed on columns.
+
+load_history() fetches (id, date, category, amount in the user's currency)
+for a user in one query straight into NumPy arrays (on SQLite, as one
+GROUP_CONCAT string per column); resamples, rolling averages, the
+month-end forecast and the per-category anomaly flags are then pandas
+operations over those columns, with no per-row Python.
+
+NumPy and pandas are optional dependencies: they are imported on first
+use, and available() tells views whether to offer these features.
+"""
+from datetime import date
+from importlib.util import find_spec
+
+from django.db import connection
+from django.db.models import Aggregate, TextField
+from django.db.models.functions import Coalesce
+
+from . import fx
+from .models import Category, Expense
+
+FORECAST_WINDOW_DAYS = 28   # trailing days used for the daily spending rate
+ANOMALY_Z = 3.0             # |z| at or above this is flagged
+ANOMALY_MIN_COUNT = 5       # categories with fewer expenses are never flagged
+ANOMALY_LOOKBACK_DAYS = 90  # only recent expenses are reported as anomalies
+
+
+def available():
+    return find_spec('numpy') is not None and find_spec('pandas') is not None
+
+
+class GroupConcat(Aggregate):
+    function = 'GROUP_CONCAT'
+    output_field = TextField()
+
+
+def fetch_columns(user):
+    """
+    (ids, days, category ids with 0 for none, amounts in the user's
+    preferred currency) as NumPy arrays, in one query.
+    """
+    import numpy as np
+
+    # Rows already in the preferred currency skip the rate lookups
+    qs = Expense.objects.filter(user=user)
+    amount = fx.converted()
+    if connection.vendor == 'sqlite':
+        # Each column comes back as one comma-separated string, so no
+        # per-row Python objects are ever built; all four aggregates walk
+        # the same rows, so their orders match
+        columns = qs.aggregate(
+            ids=GroupConcat('id'), days=GroupConcat('date'),
+            categories=GroupConcat(Coalesce('category_id', 0)), amounts=GroupConcat(amount),
+        )
+        if not columns['ids']:
+            return None
+        return (
+            np.fromstring(columns['ids'], dtype='int64', sep=','),
+            np.array(columns['days'].split(','), dtype='datetime64[D]'),
+            np.fromstring(columns['categories'], dtype='int64', sep=','),
+            np.fromstring(columns['amounts'], dtype='float64', sep=','),
+        )
+
+    sql, params = qs.values_list('id', 'date', 'category_id', amount).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return None
+    ids, days, category_ids, amounts = zip(*rows)
+    return (
+        np.array(ids, dtype='int64'),
+        np.array(days, dtype='datetime64[D]'),
+        np.array([c or 0 for c in category_ids], dtype='int64'),
+        np.array(amounts, dtype='float64'),
+    )
+
+
+def load_history(user):
+    """DataFrame of the user's expenses: id, date (datetime64), category, amount (float)."""
+    import numpy as np
+    import pandas as pd
+
+    columns = fetch_columns(user)
+    if columns is None:
+        return pd.DataFrame({
+            'id': np.array([], dtype='int64'),
+            'date': np.array([], dtype='datetime64[ns]'),
+            'category': pd.Categorical([], categories=['Uncategorized']),
+            'amount': np.array([], dtype='float64'),
+        })
+
+    ids, days, category_ids, amounts = columns
+    # Only the categories this user has used, looked up by primary key
+    names = dict(Category.objects.filter(id__in=np.unique(category_ids).tolist()).values_list('id', 'name'))
+    labels = ['Uncategorized', *names.values()]
+    # Category ids -> codes into `labels` through a lookup array (0 = no category)
+    lookup = np.zeros(max(names, default=0) + 1, dtype='int64')
+    lookup[list(names)] = np.arange(1, len(names) + 1)
+    return pd.DataFrame({
+        'id': ids,
+        'date': days.astype('datetime64[ns]'),
+        'category': pd.Categorical.from_codes(lookup[category_ids], categories=labels),
+        'amount': amounts,
+    })
+
+
+def resample(series, rule):
+    """Totals of a date-indexed series per 'D' day, 'W' Monday week or 'M' calendar month; gaps are zero."""
+    if rule == 'W':
+        return series.resample('W-MON', label='left', closed='left').sum()
+    return series.resample({'D': 'D', 'M': 'MS'}[rule]).sum()
+
+
+def daily_totals(history, today):
+    """Daily totals from the first expense through `today` (zeros filled in)."""
+    import pandas as pd
+
+    daily = resample(history.set_index('date')['amount'], 'D')
+    start = daily.index[0] if len(daily) else pd.Timestamp(today)
+    return daily.reindex(pd.date_range(start, pd.Timestamp(today), freq='D'), fill_value=0.0)
+
+
+def forecast_month_end(daily, today):
+    """Spent so far this month plus the trailing daily rate for the days left."""
+    import pandas as pd
+
+    month_start = pd.Timestamp(today.replace(day=1))
+    month_end = month_start + pd.offsets.MonthEnd(0)
+    spent = float(daily[daily.index >= month_start].sum())
+    rate = float(daily.iloc[-FORECAST_WINDOW_DAYS:].mean()) if len(daily) else 0.0
+    days_left = int((month_end - pd.Timestamp(today)).days)
+    return {
+        'spent_to_date': round(spent, 2),
+        'daily_rate': round(rate, 2),
+        'days_left': days_left,
+        'projected': round(spent + rate * days_left, 2),
+    }
+
+
+def anomalies(history, today, z=ANOMALY_Z, limit=10):
+    """Recent expenses unusually large (or small) for their category, by z-score."""
+    import numpy as np
+    import pandas as pd
+
+    if history.empty:
+        return []
+    by_category = history.groupby('category', observed=True)['amount']
+    mean = by_category.transform('mean')
+    std = by_category.transform('std', ddof=0)
+    count = by_category.transform('count')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = ((history['amount'] - mean) / std).to_numpy()
+    recent = (history['date'] >= pd.Timestamp(today) - pd.Timedelta(days=ANOMALY_LOOKBACK_DAYS)).to_numpy()
+    flagged = recent & (count.to_numpy() >= ANOMALY_MIN_COUNT) & (np.abs(np.nan_to_num(scores)) >= z)
+
+    picked = history[flagged].assign(z=scores[flagged], typical=mean[flagged])
+    picked = picked.reindex(picked['z'].abs().sort_values(ascending=False).index)[:limit]
+    return [
+        {
+            'id': int(row.id),
+            'date': row.date.date().isoformat(),
+            'category': row.category,
+            'amount': round(row.amount, 2),
+            'typical': round(row.typical, 2),
+            'z': round(row.z, 2),
+        }
+        for row in picked.itertuples(index=False)
+    ]
+
+
+def series_json(series, rolling=None, tail=None):
+    """[{period, total[, avg]}] for a resampled series, optionally with a rolling mean."""
+    avg = series.rolling(rolling, min_periods=1).mean() if rolling else None
+    if tail:
+        series = series.iloc[-tail:]
+        avg = avg.iloc[-tail:] if avg is not None else None
+    points = [{'period': ts.date().isoformat(), 'total': round(float(v), 2)} for ts, v in series.items()]
+    if avg is not None:
+        for point, value in zip(points, avg.to_numpy()):
+            point['avg'] = round(float(value), 2)
+    return points
+
+
+def summarise(user, today=None):
+    """Everything the analytics API and dashboard widgets show, as plain JSON-able data."""
+    today = today or date.today()
+    history = load_history(user)
+    daily = daily_totals(history, today)
+    return {
+        'expenses': len(history),
+        'daily': series_json(daily, rolling=7, tail=60),
+        # Weeks and months are rolled up from the ~days-long daily series, not the raw rows
+        'weekly': series_json(resample(daily, 'W'), rolling=4, tail=26),
+        'monthly': series_json(resample(daily, 'M'), rolling=3, tail=24),
+        'forecast': forecast_month_end(daily, today),
+        'anomalies': anomalies(history, today),
+    }
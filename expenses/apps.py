@@ -5,4 +5,7 @@ class ExpensesConfig(AppConfig):
     name = 'expenses'
 #8 n0v 2025 new
     def ready(self):
-        import expenses.signals  # this line makes Django load your signals
\ No newline at end of file
+        import expenses.signals  # this line makes Django load your signals
+        import expenses.tasks  # registers the background job handlers
+        import expenses.database  # SQLite PRAGMAs on every new connection
+        import expenses.assets  # system check for the vendored front-end files
\ No newline at end of file
@@ -0,0 +1,70 @@
+# expenses/assets.py
+"""
+Third-party front-end assets: Bootstrap, bootstrap-icons and Chart.js.
+
+Pages load them from our own static files, so rendering never waits on a
+CDN's DNS and TLS and the app works offline. `manage.py vendor_assets`
+downloads the pinned versions below into expenses/static/vendor/ once;
+collectstatic then hashes and pre-compresses them like every other static
+file (expenses/storage.py). Until the downloaded files are committed,
+VENDOR_CDN_FALLBACK (on by default) makes pages load any that are missing
+from the same pinned versions on the CDN. With it off, downloading them is
+a required build step: while any is missing the system checks warn (and
+fail in the prod profile, which stops collectstatic and the server), and
+pages link to the missing local file.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core import checks
+from django.templatetags.static import static
+
+CDN = 'https://cdn.jsdelivr.net/npm/'
+VENDOR_DIR = Path(__file__).resolve().parent / 'static' / 'vendor'
+
+# Path under static/vendor/ -> package file on the CDN
+FILES = {
+    'bootstrap/bootstrap.min.css': 'bootstrap@5.3.2/dist/css/bootstrap.min.css',
+    'bootstrap/bootstrap.bundle.min.js': 'bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+    'bootstrap-icons/bootstrap-icons.min.css': 'bootstrap-icons@1.10.5/font/bootstrap-icons.min.css',
+    'bootstrap-icons/fonts/bootstrap-icons.woff2': 'bootstrap-icons@1.10.5/font/fonts/bootstrap-icons.woff2',
+    'bootstrap-icons/fonts/bootstrap-icons.woff': 'bootstrap-icons@1.10.5/font/fonts/bootstrap-icons.woff',
+    'chart.js/chart.umd.js': 'chart.js@4.4.1/dist/chart.umd.js',
+}
+
+
+@lru_cache(maxsize=None)
+def vendored(path):
+    return (VENDOR_DIR / path).is_file()
+
+
+def cdn_fallback():
+    return getattr(settings, 'VENDOR_CDN_FALLBACK', False)
+
+
+def url(path):
+    """URL of a vendored asset: our static copy, or the CDN while it is missing and VENDOR_CDN_FALLBACK is on."""
+    if path not in FILES:
+        raise KeyError(f"Unknown vendored asset '{path}'")
+    if not vendored(path) and cdn_fallback():
+        return CDN + FILES[path]
+    return static(f'vendor/{path}')
+
+
+def missing():
+    return [path for path in FILES if not vendored(path)]
+
+
+@checks.register(checks.Tags.staticfiles)
+def check_vendored(app_configs, **kwargs):
+    absent = missing()
+    if not absent or cdn_fallback():
+        return []
+    level, code = (checks.Error, 'expenses.E001') if getattr(settings, 'PRODUCTION', False) else (checks.Warning, 'expenses.W001')
+    return [level(
+        f"Vendored front-end assets are missing: {', '.join(absent)}.",
+        hint='Run `manage.py vendor_assets` and commit expenses/static/vendor/, '
+             'or set VENDOR_CDN_FALLBACK=1 to load them from the CDN.',
+        id=code,
+    )]
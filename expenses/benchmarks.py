@@ -0,0 +1,140 @@
+# expenses/benchmarks.py
+"""
+Request-level benchmarks driven through the Django test client.
+
+Each scenario is a request against one (ideally seeded) user. For every
+scenario we record latency percentiles, queries per request and the peak
+Python memory of a single request. Results are plain dicts so they can be
+saved as JSON and compared between runs (see `manage.py run_benchmarks`).
+"""
+import statistics
+import time
+import tracemalloc
+from datetime import date
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import analytics, caching, pagination
+from .models import Category, Expense
+from .perf import percentile
+
+DEEP_PAGE_HOPS = 50
+
+
+def run_request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def deep_cursor(user, hops=DEEP_PAGE_HOPS, per_page=20):
+    """Cursor for the page `hops` pages into the user's listing."""
+    row = (
+        Expense.objects.filter(user=user).order_by('-date', '-id')
+        .only('id', 'date')[hops * per_page:hops * per_page + 1].first()
+    )
+    return pagination.make_token(row) if row else None
+
+
+def scenarios(user):
+    """[(name, method, url, data, options)] for the hot views."""
+    today = date.today().isoformat()
+    category_id = Category.objects.values_list('id', flat=True).first()
+    cursor = deep_cursor(user)
+    items = [
+        ('dashboard (cold cache)', 'get', reverse('dashboard'), {}, {'cold_cache': True}),
+        ('dashboard', 'get', reverse('dashboard'), {}, {}),
+        ('expense_list', 'get', reverse('expense_list'), {}, {}),
+        ('expense_list offset page 50', 'get', reverse('expense_list'), {'page': DEEP_PAGE_HOPS + 1}, {}),
+        ('expense_list search', 'get', reverse('expense_list'), {'q': 'coff'}, {}),
+        ('expense_list_api', 'get', reverse('expense_list_api'), {}, {}),
+        ('export_csv', 'get', reverse('export_csv'), {}, {}),
+        ('month_total_api', 'get', reverse('month_total_api'), {}, {}),
+        ('add_expense', 'post', reverse('add_expense'), {
+            'title': 'Benchmark', 'amount': '9.99', 'date': today,
+            'category': category_id or '', 'description': '',
+        }, {'rollback': True}),
+    ]
+    if cursor:
+        items.insert(4, ('expense_list cursor page 50', 'get', reverse('expense_list'), {'cursor': cursor}, {}))
+    if analytics.available():
+        items += [
+            ('analytics_api (cold cache)', 'get', reverse('analytics_api'), {}, {'cold_cache': True}),
+            ('analytics_api', 'get', reverse('analytics_api'), {}, {}),
+        ]
+    return items
+
+
+def measure(client, user, method, url, data, iterations=20, warmup=2, cold_cache=False, rollback=False):
+    def once():
+        if cold_cache:
+            caching.bump_user_version(user.pk)
+        if rollback:
+            # Writes are measured but not kept, so runs stay comparable
+            with transaction.atomic():
+                run_request(client, method, url, data)
+                transaction.set_rollback(True)
+        else:
+            run_request(client, method, url, data)
+
+    for _ in range(warmup):
+        once()
+
+    timings, query_counts = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            once()
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(ctx.captured_queries))
+
+    # Separate pass: tracemalloc slows everything down, so keep it out of the timings
+    tracemalloc.start()
+    try:
+        once()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': max(query_counts),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_suite(client, user, iterations=20, only=None):
+    client.force_login(user)
+    results = {}
+    for name, method, url, data, options in scenarios(user):
+        if only and not any(word in name for word in only):
+            continue
+        results[name] = measure(client, user, method, url, data, iterations=iterations, **options)
+    return results
+
+
+def compare(current, baseline, threshold=1.25, metric='p95_ms'):
+    """
+    [(scenario, baseline value, current value, ratio)] for every scenario whose
+    `metric` grew by more than `threshold` times, or whose query count grew.
+    """
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before[metric] and result[metric] / before[metric] > threshold:
+            regressions.append((name, before[metric], result[metric], result[metric] / before[metric]))
+        if result['queries'] > before['queries']:
+            regressions.append((f'{name} (queries)', before['queries'], result['queries'],
+                                result['queries'] / max(before['queries'], 1)))
+    return regressions
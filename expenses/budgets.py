@@ -0,0 +1,156 @@
+# expenses/budgets.py
+"""
+Running spent-vs-budget counters.
+
+Every Budget owns one BudgetCounter holding what has been spent in its
+month, either in its category or overall when the budget has no category.
+Budgets and counters are in the user's preferred currency. Expense saves,
+edits and deletes reuse the (user, month, category, currency) deltas from
+rollups.py, convert them (fx.convert()) and move the matching counters with
+F-expressions, so a budget check reads at most two rows instead of
+aggregating the month.
+
+Alert levels are percentages of the limit, BUDGET_ALERT_THRESHOLDS in
+settings (default 80 and 100).
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Sum
+
+from . import fx
+from .models import Budget, BudgetCounter, ExpenseRollup
+
+DEFAULT_THRESHOLDS = (80, 100)
+
+
+def thresholds():
+    return tuple(sorted(getattr(settings, 'BUDGET_ALERT_THRESHOLDS', DEFAULT_THRESHOLDS)))
+
+
+def level_of(spent, limit):
+    """Highest alert threshold reached by `spent`, or None."""
+    if not limit:
+        return None
+    percent = spent * 100 / limit
+    reached = [t for t in thresholds() if percent >= t]
+    return reached[-1] if reached else None
+
+
+@dataclass
+class BudgetStatus:
+    category: str | None
+    limit: Decimal
+    spent: Decimal
+
+    @property
+    def percent(self):
+        return float(self.spent * 100 / self.limit) if self.limit else None
+
+    @property
+    def level(self):
+        return level_of(self.spent, self.limit)
+
+
+def counters_for(user_id, month, category_id=None):
+    """The overall counter and, for a category, that category's counter."""
+    scope = Q(category__isnull=True)
+    if category_id is not None:
+        scope |= Q(category_id=category_id)
+    return BudgetCounter.objects.filter(user_id=user_id, month=month).filter(scope)
+
+
+def apply_deltas(changes):
+    """Move counters by deltas from rollups.deltas()/deltas_for_rows()."""
+    preferred = {}
+    for (user_id, month, category_id, currency), (amount, _) in changes.items():
+        if amount:
+            if user_id not in preferred:
+                preferred[user_id] = fx.preferred_currency(user_id)
+            amount = fx.convert(amount, currency, preferred[user_id], month)
+            counters_for(user_id, month, category_id).update(spent=F('spent') + amount)
+
+
+def spent_rows(rollups, currency=None):
+    """
+    Rollup rows annotated with `spent`: each bucket's total converted to
+    `currency`, or to each user's preferred currency.
+    """
+    return rollups.annotate(spent=fx.converted(currency, amount='total', month=OuterRef('month')))
+
+
+def spent_for(user_id, month, category_id=None):
+    rows = ExpenseRollup.objects.filter(user_id=user_id, month=month)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    rows = spent_rows(rows, fx.preferred_currency(user_id))
+    return rows.aggregate(total=Sum('spent'))['total'] or Decimal('0')
+
+
+def sync(budget):
+    """Create or refresh the counter of a saved Budget."""
+    month = budget.month.replace(day=1)
+    BudgetCounter.objects.update_or_create(budget=budget, defaults={
+        'user_id': budget.user_id,
+        'month': month,
+        'category_id': budget.category_id,
+        'limit': budget.amount,
+        'spent': spent_for(budget.user_id, month, budget.category_id),
+    })
+
+
+def check(user, day, category_id=None):
+    """BudgetStatus for the overall and category budgets covering `day`."""
+    rows = counters_for(user.pk, day.replace(day=1), category_id).select_related('category')
+    return [BudgetStatus(c.category.name if c.category else None, c.limit, c.spent) for c in rows]
+
+
+def alerts(statuses, added=Decimal('0')):
+    """
+    Statuses worth warning about after adding `added`: those that just
+    crossed a threshold, plus those already over their limit.
+    """
+    return [
+        s for s in statuses
+        if s.level is not None and (s.level >= 100 or s.level != level_of(s.spent - added, s.limit))
+    ]
+
+
+def rebuild(user_ids=None):
+    """
+    Recompute counters from Budget and ExpenseRollup, for `user_ids` or
+    everyone. Rollups must be up to date first. Returns rows written.
+    """
+    budgets = Budget.objects.all()
+    rollups = ExpenseRollup.objects.all()
+    counters = BudgetCounter.objects.all()
+    if user_ids is not None:
+        budgets = budgets.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+
+    rows = spent_rows(rollups)
+    by_category = {
+        (r['user_id'], r['month'], r['category_id']): r['total']
+        for r in rows.values('user_id', 'month', 'category_id').annotate(total=Sum('spent')).order_by()
+    }
+    overall = {
+        (r['user_id'], r['month']): r['total']
+        for r in rows.values('user_id', 'month').annotate(total=Sum('spent')).order_by()
+    }
+
+    def counter(b):
+        month = b.month.replace(day=1)
+        if b.category_id is None:
+            spent = overall.get((b.user_id, month), 0)
+        else:
+            spent = by_category.get((b.user_id, month, b.category_id), 0)
+        return BudgetCounter(budget_id=b.id, user_id=b.user_id, month=month,
+                             category_id=b.category_id, limit=b.amount, spent=spent)
+
+    with transaction.atomic():
+        counters.delete()
+        objs = BudgetCounter.objects.bulk_create((counter(b) for b in budgets.iterator()), batch_size=1000)
+    return len(objs)
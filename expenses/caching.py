@@ -0,0 +1,184 @@
+# expenses/caching.py
+"""
+Per-user cache for derived data (the dashboard payload and friends).
+
+Entries are keyed by a per-user data version instead of being deleted:
+the handlers in expenses/signals.py bump the version whenever the user's
+expenses or budgets change, so every older entry simply stops being read
+and ages out. A global version, bumped on category changes, is folded in
+because category names appear in every user's payload. Each bump also
+stamps the time of the change, which conditional views send as
+Last-Modified (expenses/conditional.py).
+
+The cache alias is EXPENSES_CACHE_ALIAS (default 'default'); see CACHES in
+tracker/settings.py for the local-memory/file/Redis choice. The versions
+must be seen by every process, so the prod profile refuses the
+local-memory cache, which is per process.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+ENTRY_TIMEOUT = 24 * 60 * 60
+STATS_KEYS = ('hits', 'misses')
+
+
+def get_cache():
+    return caches[getattr(settings, 'EXPENSES_CACHE_ALIAS', 'default')]
+
+
+def _fresh_version():
+    # Never restart from 1 after an eviction, or stale entries could match again
+    return int(time.time() * 1000)
+
+
+def _version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+    cache.set(f'{key}:changed', time.time(), None)
+
+
+def data_version(user_id):
+    """Opaque string that changes whenever this user's data changes."""
+    return f"{global_version()}.{_version(f'expenses:version:{user_id}')}"
+
+
+def global_version():
+    """The part of every data version shared by all users (category changes)."""
+    return _version('expenses:version:global')
+
+
+def _version_keys(user_id):
+    return ['expenses:version:global', f'expenses:version:{user_id}']
+
+
+def _stamp_keys(keys):
+    return [f'{key}:changed' for key in keys]
+
+
+def version_and_modified(user_id):
+    """
+    (data_version(user_id), Unix time of the user's last change) in one
+    cache round trip. A stamp lost to eviction counts as a change now.
+    """
+    cache = get_cache()
+    keys = _version_keys(user_id)
+    stamps = _stamp_keys(keys)
+    found = cache.get_many(keys + stamps)
+    version = '.'.join(str(found[key] if key in found else _version(key)) for key in keys)
+    if not all(stamp in found for stamp in stamps):
+        for stamp in stamps:
+            cache.add(stamp, time.time(), None)
+        found.update(cache.get_many(stamps))
+    return version, max(found.get(stamp, 0) for stamp in stamps)
+
+
+def bump_user_version(user_id):
+    _bump(f'expenses:version:{user_id}')
+
+
+def bump_global_version():
+    _bump('expenses:version:global')
+
+
+def _count(name):
+    cache = get_cache()
+    key = f'expenses:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def stats():
+    cache = get_cache()
+    values = cache.get_many([f'expenses:stats:{name}' for name in STATS_KEYS])
+    counts = {name: values.get(f'expenses:stats:{name}', 0) for name in STATS_KEYS}
+    lookups = counts['hits'] + counts['misses']
+    counts['hit_rate'] = counts['hits'] / lookups if lookups else None
+    return counts
+
+
+def entry_key(user_id, name, *parts):
+    """Cache key of (user, name, *parts) at the user's current data version."""
+    return ':'.join(str(p) for p in ('expenses', name, user_id, data_version(user_id), *parts))
+
+
+def get_or_build(user_id, name, build, *parts):
+    """
+    Return the cached value for (user, name, *parts) at the user's current
+    data version, calling build() and storing the result on a miss.
+    """
+    cache = get_cache()
+    key = entry_key(user_id, name, *parts)
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+    _count('misses')
+    value = build()
+    cache.set(key, value, ENTRY_TIMEOUT)
+    return value
+
+
+# ---------------- Async twins for ASGI views ---------------- #
+async def _aversion(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _fresh_version(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def adata_version(user_id):
+    return f"{await _aversion('expenses:version:global')}.{await _aversion(f'expenses:version:{user_id}')}"
+
+
+async def aversion_and_modified(user_id):
+    cache = get_cache()
+    keys = _version_keys(user_id)
+    stamps = _stamp_keys(keys)
+    found = await cache.aget_many(keys + stamps)
+    version = '.'.join([str(found[key] if key in found else await _aversion(key)) for key in keys])
+    if not all(stamp in found for stamp in stamps):
+        for stamp in stamps:
+            await cache.aadd(stamp, time.time(), None)
+        found.update(await cache.aget_many(stamps))
+    return version, max(found.get(stamp, 0) for stamp in stamps)
+
+
+async def _acount(name):
+    cache = get_cache()
+    key = f'expenses:stats:{name}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, None)
+
+
+async def aget_or_build(user_id, name, abuild, *parts):
+    """get_or_build() for async views; `abuild` is a coroutine function."""
+    cache = get_cache()
+    key = ':'.join(str(p) for p in ('expenses', name, user_id, await adata_version(user_id), *parts))
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount('hits')
+        return value
+    await _acount('misses')
+    value = await abuild()
+    await cache.aset(key, value, ENTRY_TIMEOUT)
+    return value
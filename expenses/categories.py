@@ -0,0 +1,147 @@
+# expenses/categories.py
+"""
+In-process cache of the Category table.
+
+A category is global (owner NULL) or one user's own, and names are unique
+ignoring case among the global ones and within each user's. The table is
+tiny but read on every expense form and edit, so each process keeps all
+of it in memory: the name -> id map and the per-user choice lists are
+served from here without touching the database.
+
+The copy is tagged with the global cache version (expenses/caching.py).
+The Category signals call changed(): the process that changed a category
+reloads at once, and the global version is bumped again once the change
+commits, so every other process reloads on its next lookup. That relies
+on the cache being shared, which the prod profile requires; a process
+that cannot see the bump (the local-memory cache in development, where
+run_workers is a separate process) still reloads once its copy is
+CATEGORY_CACHE_SECONDS old. A rollback sends no signal, so a change made
+inside a transaction is remembered along with the savepoints open at the
+time, and the copy is reloaded as soon as they are gone.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from . import caching
+from .models import Category
+
+
+class CategoryCache:
+    """Every category, reloaded when the global data version moves on."""
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self.version = None
+        self.loaded_at = 0.0
+        self.ids = {}    # (owner id or None, lower-cased name) -> id
+        self.rows = []   # (id, name, owner id), sorted by name
+        self.names = {}  # id -> name
+        self.pending = None  # savepoint ids of an uncommitted change
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        version = caching.global_version()
+        with self.lock:
+            if self.pending is not None:
+                self.settle()
+            now = time.monotonic()
+            if version != self.version or (self.max_age is not None and now - self.loaded_at > self.max_age):
+                rows = sorted(Category.objects.values_list('id', 'name', 'owner_id'), key=lambda r: r[1].lower())
+                self.ids = {(owner, name.lower()): pk for pk, name, owner in rows}
+                self.rows = rows
+                self.names = {pk: name for pk, name, _ in rows}
+                # Tagged with the version read *before* loading, so a change
+                # racing the load is picked up on the next refresh
+                self.version, self.loaded_at = version, now
+            return self
+
+    def settle(self):
+        """Drop the copy once savepoints open at an uncommitted change are released or rolled back."""
+        if not connection.in_atomic_block:
+            self.pending = self.version = None
+            return
+        kept = 0
+        for ours, theirs in zip(self.pending, connection.savepoint_ids):
+            if ours != theirs:
+                break
+            kept += 1
+        if kept < len(self.pending):
+            # A released savepoint's changes now belong to the one around it
+            self.pending, self.version = self.pending[:kept], None
+
+    def clear(self):
+        with self.lock:
+            self.version = None
+
+    def changed(self):
+        with self.lock:
+            self.version = None
+            if connection.in_atomic_block:
+                self.pending = list(connection.savepoint_ids)
+                transaction.on_commit(self.committed)
+
+    def committed(self):
+        with self.lock:
+            self.pending = self.version = None
+        caching.bump_global_version()
+
+
+_cache = CategoryCache(getattr(settings, 'CATEGORY_CACHE_SECONDS', 60))
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def changed():
+    """A category was saved or deleted; called from the Category signals."""
+    _cache.changed()
+
+
+def normalize(name):
+    """Category names are stored trimmed with inner runs of spaces collapsed."""
+    return ' '.join((name or '').split())
+
+
+def choices(user_id=None):
+    """[(id, name)] of the global categories plus the user's own, by name."""
+    rows = _cache.refresh().rows
+    return [(pk, name) for pk, name, owner in rows if owner is None or owner == user_id]
+
+
+def names():
+    """{id: name} of every category."""
+    return _cache.refresh().names
+
+
+def find(name, user_id=None):
+    """Id of the user's own category called `name` (any case), else the global one, else None."""
+    key = normalize(name).lower()
+    ids = _cache.refresh().ids
+    if user_id is not None and (user_id, key) in ids:
+        return ids[user_id, key]
+    return ids.get((None, key))
+
+
+def get_or_create(name, user_id=None):
+    """
+    Id of the category `name` as seen by the user, creating it (as the
+    user's own, or global when user_id is None) if missing. Returns None
+    for a blank name.
+    """
+    name = normalize(name)
+    if not name:
+        return None
+    found = find(name, user_id)
+    if found is not None:
+        return found
+    try:
+        with transaction.atomic():
+            return Category.objects.create(name=name, owner_id=user_id).id
+    except IntegrityError:
+        # Created concurrently by another request; the unique index has it
+        clear_cache()
+        return find(name, user_id)
@@ -0,0 +1,87 @@
+# expenses/conditional.py
+"""
+Conditional GETs for the user-scoped pages, JSON endpoints and the CSV
+export.
+
+A response depends on the user's data (their data version, see
+expenses/caching.py), the URL with its query string, today's date (the
+current month, "this month" totals) and the CSRF cookie baked into the
+page's forms; the ETag is a hash of exactly those. Last-Modified is the
+time of the user's last change, or midnight if that was before today.
+Both come from one cache read, so a browser revalidating an unchanged
+page gets its 304 before the view runs a single query. Responses are
+marked private, no-cache: browsers keep them but must ask first.
+
+Requests with flash messages waiting are always answered in full, or the
+message would stay queued behind a 304.
+
+A 304 is only right if every process bumps the versions this one reads,
+so the decorator does nothing unless CONDITIONAL_GETS is on; it defaults
+to on only with a shared (file or Redis) cache, which the prod profile
+requires.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+
+
+def validators(request, user_id, version, changed):
+    """(ETag, Last-Modified as a Unix time) for this request at the user's data version."""
+    today = date.today()
+    parts = (user_id, version, today.isoformat(), request.get_full_path(),
+             request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    etag = quote_etag(hashlib.md5('\n'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest())
+    return etag, int(max(changed, time.mktime(today.timetuple())))
+
+
+def applies(request):
+    return (getattr(settings, 'CONDITIONAL_GETS', False) and request.method in ('GET', 'HEAD')
+            and not len(get_messages(request)))
+
+
+def finish(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(view):
+    """
+    View decorator (inside @login_required): answer 304 Not Modified when
+    the client's copy is still current, else run the view and tag its
+    response.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not applies(request):
+                return await view(request, *args, **kwargs)
+            user = await request.auser()
+            etag, last_modified = validators(request, user.pk, *await caching.aversion_and_modified(user.pk))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            return finish(response, etag, last_modified)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not applies(request):
+                return view(request, *args, **kwargs)
+            user_id = request.user.pk
+            etag, last_modified = validators(request, user_id, *caching.version_and_modified(user_id))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finish(response, etag, last_modified)
+    return wrapper
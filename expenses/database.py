@@ -0,0 +1,92 @@
+# expenses/database.py
+"""
+Database connection tuning and read-replica routing.
+
+SQLite connections run settings.SQLITE_PRAGMAS as soon as they open; the
+prod profile (DJANGO_ENV=prod) turns on WAL so readers no longer wait
+for a writer to commit. PostgreSQL pooling and persistent connections are
+plain DATABASES options, see tracker/settings.py.
+
+With a replica configured (settings.DATABASE_REPLICA), ReplicaRouter
+sends reads of the expense tables made inside replica_reads() to it, and
+everything else, writes included, to the primary. The dashboard and
+listing views opt in with @replica_reads. Replicas lag behind, so a
+browser that has just written something keeps reading from the primary
+for REPLICA_PIN_SECONDS (PrimaryAfterWriteMiddleware sets the cookie).
+Auth, sessions and categories always use the primary: a stale read there
+would log people out or be cached.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_MODELS = {
+    'expenses.expense', 'expenses.expenserollup', 'expenses.budget', 'expenses.budgetcounter', 'expenses.fxrate',
+}
+PIN_COOKIE = 'primary_reads'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def replica_reads_enabled(enabled=True):
+    """Route reads of REPLICA_MODELS in this block (and this context) to the replica."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view):
+    """View decorator: read from the replica unless this browser wrote recently."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads_enabled(PIN_COOKIE not in request.COOKIES):
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads_enabled(PIN_COOKIE not in request.COOKIES):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = replica_alias()
+        if replica and _use_replica.get() and model._meta.label_lower in REPLICA_MODELS:
+            return replica
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, replica_alias()}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == replica_alias():
+            return False
+        return None
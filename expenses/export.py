@@ -0,0 +1,49 @@
+# expenses/export.py
+"""
+Listing filters and CSV rows for the expense list, its JSON API and the
+CSV export, shared by the views and the export_csv job (expenses/tasks.py).
+"""
+import csv
+
+from . import fx, search
+
+
+def apply_list_filters(qs, params, user):
+    """
+    Apply the expense_list search/date filters (q, start, end) from a
+    GET QueryDict (or a job's params dict).
+    """
+    q = params.get('q')
+    if q:
+        qs = search.get_backend().filter(qs, user, q)
+
+    start = params.get('start')
+    end = params.get('end')
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    return qs
+
+
+class Echo:
+    """File-like object whose write() just hands the line back, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(qs):
+    """
+    Yield CSV lines for `qs` without caching model instances. Amounts are
+    also converted to the user's preferred currency inside the same query.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Date', 'Category', 'Title', 'Description', 'Amount', 'Currency', 'Converted Amount'])
+    rows = qs.annotate(converted=fx.converted()).values_list(
+        'date', 'category__name', 'title', 'description', 'amount', 'currency', 'converted',
+    )
+    for day, category, title, description, amount, currency, converted in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow([day, category or '', title, description or '', float(amount), currency, float(converted)])
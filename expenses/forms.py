@@ -1,14 +1,52 @@
 # expenses/forms.py
+from datetime import date
+from dateutil.relativedelta import relativedelta
 from django import forms
-from .models import Expense, Budget
+from .models import Expense, Budget, RecurringExpense
+from . import categories, fx
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+# ---------------- Currency choice ---------------- #
+class CurrencyChoiceMixin:
+    """
+    Offer the currencies with loaded FX rates for the `currency` field.
+    Left blank, the view fills in the user's preferred currency.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['currency'] = forms.ChoiceField(
+            choices=[('', 'My currency')] + [(c, c) for c in fx.currencies()],
+            required=False, widget=forms.Select(attrs={'class': 'form-select'}),
+        )
+
+# ---------------- Category choice ---------------- #
+class CategoryChoiceMixin:
+    """
+    Offer the global categories plus the user's own for `category`, from
+    the in-process category cache: rendering and validating the form read
+    nothing from the Category table. `category` stays out of Meta.fields
+    (so model validation does not look the id up either) and is copied to
+    the instance as category_id.
+    """
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'] = forms.TypedChoiceField(
+            label='Category', choices=[('', '---------')] + categories.choices(user.pk if user else None),
+            coerce=int, empty_value=None, required=False, widget=forms.Select(attrs={'class': 'form-select'}),
+        )
+        if self.instance.pk:
+            self.initial.setdefault('category', self.instance.category_id)
+
+    def _post_clean(self):
+        self.instance.category_id = self.cleaned_data.get('category')
+        super()._post_clean()
+
 # ---------------- Expense Form ---------------- #
-class ExpenseForm(forms.ModelForm):
+class ExpenseForm(CategoryChoiceMixin, CurrencyChoiceMixin, forms.ModelForm):
     class Meta:
         model = Expense
-        fields = ['title', 'amount', 'category', 'date', 'description']
+        fields = ['title', 'amount', 'currency', 'date', 'description']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -19,9 +57,6 @@ class ExpenseForm(forms.ModelForm):
                 'placeholder': 'Amount',
                 'step': '0.01'
             }),
-            'category': forms.Select(attrs={
-                'class': 'form-select'
-            }),
             'date': forms.DateInput(attrs={
                 'type': 'date',
                 'class': 'form-control'
@@ -34,10 +69,10 @@ class ExpenseForm(forms.ModelForm):
         }
 
 # ---------------- Budget Form ---------------- #
-class BudgetForm(forms.ModelForm):
+class BudgetForm(CategoryChoiceMixin, forms.ModelForm):
     class Meta:
         model = Budget
-        fields = ['month', 'amount', 'category']
+        fields = ['month', 'amount']
         widgets = {
             'month': forms.DateInput(attrs={
                 'type': 'month',
@@ -47,11 +82,98 @@ class BudgetForm(forms.ModelForm):
                 'class': 'form-control',
                 'step': '0.01'
             }),
-            'category': forms.Select(attrs={
+        }
+
+# ---------------- Recurring Expense Form ---------------- #
+class RecurringExpenseForm(CategoryChoiceMixin, CurrencyChoiceMixin, forms.ModelForm):
+    class Meta:
+        model = RecurringExpense
+        fields = ['title', 'amount', 'currency', 'frequency', 'interval', 'start_date', 'end_date', 'description']
+        widgets = {
+            'title': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'e.g. Rent, Netflix'
+            }),
+            'amount': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': '0.01'
+            }),
+            'frequency': forms.Select(attrs={
                 'class': 'form-select'
             }),
+            'interval': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '1'
+            }),
+            'start_date': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'form-control'
+            }),
+            'end_date': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'form-control'
+            }),
+            'description': forms.Textarea(attrs={
+                'class': 'form-control',
+                'rows': 2,
+                'placeholder': 'Optional description'
+            }),
         }
 
+    # The view creates every occurrence already due while the request
+    # waits, so the backlog a new schedule may bring is kept to a year
+    MAX_BACKFILL = relativedelta(years=1)
+
+    def clean_start_date(self):
+        start = self.cleaned_data['start_date']
+        if start and start < date.today() - self.MAX_BACKFILL:
+            raise forms.ValidationError('The start date can be at most a year in the past.')
+        return start
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start_date'), cleaned.get('end_date')
+        if start and end and end < start:
+            self.add_error('end_date', 'The end date must be on or after the start date.')
+        if cleaned.get('interval') == 0:
+            self.add_error('interval', 'The interval must be at least 1.')
+        return cleaned
+
+# ---------------- Import Form ---------------- #
+class ImportForm(forms.Form):
+    FORMAT_CHOICES = [('auto', 'Detect from file name'), ('csv', 'CSV'), ('ofx', 'OFX / QFX')]
+
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={
+        'class': 'form-control',
+        'accept': '.csv,.ofx,.qfx'
+    }))
+    file_format = forms.ChoiceField(choices=FORMAT_CHOICES, initial='auto', widget=forms.Select(attrs={
+        'class': 'form-select'
+    }))
+
+# ---------------- Report Form ---------------- #
+class ReportForm(forms.Form):
+    FORMAT_CHOICES = [('pdf', 'PDF'), ('xlsx', 'Excel (XLSX)')]
+
+    start = forms.DateField(widget=forms.DateInput(attrs={
+        'type': 'date',
+        'class': 'form-control'
+    }))
+    end = forms.DateField(widget=forms.DateInput(attrs={
+        'type': 'date',
+        'class': 'form-control'
+    }))
+    file_format = forms.ChoiceField(choices=FORMAT_CHOICES, initial='pdf', widget=forms.Select(attrs={
+        'class': 'form-select'
+    }))
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start'), cleaned.get('end')
+        if start and end and end < start:
+            self.add_error('end', 'The end date must be on or after the start date.')
+        return cleaned
+
 # ---------------- User Registration Form ---------------- #
 #8 nov 2025 new 
 class RegisterForm(UserCreationForm):
@@ -0,0 +1,215 @@
+# expenses/fx.py
+"""
+Currencies and exchange rates.
+
+Every Expense keeps the currency it was paid in; totals are shown in the
+user's Profile.preferred_currency. FxRate holds the value of one unit of
+each currency in settings.FX_BASE_CURRENCY, loaded from a CSV file by
+`manage.py load_fx_rates` (no network involved).
+
+An amount is converted at the rates in effect on the first day of its
+month (or the earliest known rate, and 1 for a currency without rates).
+Monthly rollups, budget counters and exports therefore all agree:
+- Queries convert inside the database. converted() multiplies each row
+  (or rollup bucket) by rate subqueries on FxRate, so totals are plain
+  SUMs of the converted amounts.
+- Python-side conversions (budget deltas, alert amounts) go through
+  rate(), which caches rates per month in-process; the least recently
+  used months are evicted and entries expire after FX_CACHE_SECONDS.
+"""
+import csv
+import io
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import (
+    Case, DateField, DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, TruncMonth, Upper
+
+from .models import FxRate, Profile
+
+CENTS = Decimal('0.01')
+SYMBOLS = {'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥'}
+
+
+def base_currency():
+    return getattr(settings, 'FX_BASE_CURRENCY', 'INR')
+
+
+def symbol(currency):
+    return SYMBOLS.get(currency, currency)
+
+
+def preferred_currency(user_id):
+    currency = Profile.objects.filter(user_id=user_id).values_list('preferred_currency', flat=True).first()
+    return (currency or base_currency()).upper()
+
+
+async def apreferred_currency(user_id):
+    currency = await Profile.objects.filter(user_id=user_id).values_list('preferred_currency', flat=True).afirst()
+    return (currency or base_currency()).upper()
+
+
+def rated_currencies():
+    """
+    Currencies present in FxRate. Walks the (currency, date) index one
+    currency at a time rather than reading every rate for a DISTINCT.
+    """
+    codes = ['']
+    while True:
+        later = FxRate.objects.filter(currency__gt=codes[-1])
+        code = later.order_by('currency').values_list('currency', flat=True).first()
+        if code is None:
+            return codes[1:]
+        codes.append(code)
+
+
+def currencies():
+    """Currencies an expense can be entered in: the base one plus any with rates."""
+    return _cache.currencies(lambda: sorted({base_currency(), *rated_currencies()}))
+
+
+def lookup(currency, month):
+    """Rate in effect on `month` straight from the table, or None."""
+    rates = FxRate.objects.filter(currency=currency)
+    found = rates.filter(date__lte=month).order_by('-date').values_list('rate', flat=True).first()
+    if found is None:
+        found = rates.order_by('date').values_list('rate', flat=True).first()
+    return found
+
+
+class RateCache:
+    """Rates per month, least recently used months evicted past `max_months`."""
+
+    def __init__(self, max_months, max_age):
+        self.max_months, self.max_age = max_months, max_age
+        self.months = OrderedDict()
+        self.codes = None
+        self.lock = threading.Lock()
+
+    def get(self, currency, month):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.months.get(month)
+            if entry is None or now - entry[0] > self.max_age:
+                entry = self.months[month] = (now, {})
+            self.months.move_to_end(month)
+            while len(self.months) > self.max_months:
+                self.months.popitem(last=False)
+            rates = entry[1]
+        if currency not in rates:
+            rates[currency] = lookup(currency, month)
+        return rates[currency]
+
+    def currencies(self, load):
+        """The list of known currencies, cached like a month's rates."""
+        now = time.monotonic()
+        if self.codes is None or now - self.codes[0] > self.max_age:
+            self.codes = (now, load())
+        return self.codes[1]
+
+    def clear(self):
+        with self.lock:
+            self.months.clear()
+            self.codes = None
+
+
+_cache = RateCache(getattr(settings, 'FX_CACHE_MONTHS', 36), getattr(settings, 'FX_CACHE_SECONDS', 300))
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def rate(currency, day):
+    """Value of one unit of `currency` in the base currency, for `day`'s month."""
+    if currency == base_currency():
+        return Decimal('1')
+    found = _cache.get(currency, day.replace(day=1))
+    return Decimal('1') if found is None else found
+
+
+def convert(amount, from_currency, to_currency, day):
+    if from_currency == to_currency or not amount:
+        return amount
+    return (amount * rate(from_currency, day) / rate(to_currency, day)).quantize(CENTS)
+
+
+def rate_expression(currency, month):
+    """
+    SQL for rate(currency, month); both arguments are expressions. Cast
+    to a float: SQLite stores whole-number decimals as integers, and its
+    integer division would truncate the rate ratios.
+    """
+    rates = FxRate.objects.filter(currency=currency)
+    before = rates.filter(date__lte=month).order_by('-date').values('rate')[:1]
+    earliest = rates.order_by('date').values('rate')[:1]
+    return Cast(Coalesce(Subquery(before), Subquery(earliest), Value(Decimal('1'))), FloatField())
+
+
+def preferred_expression(ref=F):
+    """SQL for the preferred currency of each row's user (joins Profile)."""
+    return Upper(Coalesce(ref('user__profile__preferred_currency'), Value(base_currency())))
+
+
+def converted(to_currency=None, amount='amount', currency='currency', month=None):
+    """
+    `amount` (a field of the outer query, in its `currency`) converted at
+    the rates of `month` to `to_currency`, or when None to each row's
+    user's preferred currency. `month` defaults to the month of the
+    outer row's `date`; rollups pass OuterRef('month'). Rows already in
+    the target currency skip the rate lookups.
+    """
+    if to_currency is None:
+        target, target_ref = preferred_expression(), preferred_expression(OuterRef)
+    else:
+        target = target_ref = Value(to_currency)
+    if month is None:
+        month = TruncMonth(ExpressionWrapper(OuterRef('date'), output_field=DateField()))
+    factor = rate_expression(OuterRef(currency), month)
+    if to_currency != base_currency():
+        factor = factor / rate_expression(target_ref, month)
+    return Case(
+        When(Q(**{currency: target}), then=F(amount)),
+        default=F(amount) * factor,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def parse_rates(fileobj):
+    """
+    FxRate objects from a CSV file with date, currency and rate columns
+    (header row required). Raises ValueError naming the first bad line.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig') if isinstance(fileobj.read(0), bytes) else fileobj
+    reader = csv.DictReader(text)
+    fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+    missing = {'date', 'currency', 'rate'} - set(fields)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+    rates = []
+    for line, row in enumerate(reader, start=2):
+        try:
+            day = date.fromisoformat(row[fields['date']].strip())
+            value = Decimal(row[fields['rate']].strip())
+        except (ValueError, InvalidOperation):
+            raise ValueError(f'Line {line}: expected YYYY-MM-DD date and a number rate')
+        currency = row[fields['currency']].strip().upper()
+        if len(currency) != 3 or value <= 0:
+            raise ValueError(f'Line {line}: expected a 3-letter currency code and a positive rate')
+        rates.append(FxRate(currency=currency, date=day, rate=value))
+    return rates
+
+
+def load_rates(fileobj):
+    """Insert or update the rates in a CSV file. Returns the number of rows read."""
+    rates = parse_rates(fileobj)
+    FxRate.objects.bulk_create(rates, batch_size=1000, update_conflicts=True,
+                               unique_fields=['currency', 'date'], update_fields=['rate'])
+    clear_cache()
+    return len(rates)
@@ -0,0 +1,265 @@
+# expenses/importers.py
+"""
+Bulk import of bank statements (CSV or OFX).
+
+Files are parsed as a stream, rows are validated one by one and written
+with bulk_create, one transaction per batch. Category names are resolved
+through the in-process category cache (expenses/categories.py), so an
+import reads the Category table at most once per new name.
+"""
+import csv
+import io
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import categories, fx
+from .models import Expense
+from .signals import expenses_bulk_created
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 500
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y%m%d')
+AMOUNT_LIMIT = Decimal('99999999.99')  # Expense.amount is max_digits=10, decimal_places=2
+CENT = Decimal('0.01')
+
+# Header aliases for CSV files; our own export format is accepted as-is.
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted', 'posting date'),
+    'title': ('title', 'payee', 'name', 'merchant'),
+    'amount': ('amount', 'debit', 'value'),
+    'category': ('category',),
+    'currency': ('currency',),
+    'description': ('description', 'memo', 'details', 'narration'),
+}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)   # [(line number, message), ...]
+    error_count: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+# ---------------- Parsers ---------------- #
+def parse_csv(fileobj):
+    """Yield (line number, {date, title, amount, category, description}) from a binary CSV file."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = {}
+        normalised = [h.strip().lower() for h in header]
+        for key, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in normalised:
+                    positions[key] = normalised.index(alias)
+                    break
+        missing = {'date', 'amount'} - set(positions)
+        if missing:
+            raise ImportRowError(f"CSV header is missing column(s): {', '.join(sorted(missing))}")
+
+        for row in reader:
+            if not any(row):
+                continue
+            yield reader.line_num, {
+                key: row[pos].strip() if pos < len(row) else ''
+                for key, pos in positions.items()
+            }
+    except UnicodeDecodeError:
+        # Bank exports in cp1252 and friends; decoding is lazy, so this can come at any line
+        raise ImportRowError(f'File is not UTF-8 (after line {reader.line_num}); save it as UTF-8 and import again')
+
+
+OFX_TOKEN_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_READ_SIZE = 64 * 1024
+
+
+def _ofx_tokens(fileobj):
+    """Yield (closing, tag, text) tokens from an OFX (SGML or XML) stream."""
+    pending = ''
+    while True:
+        chunk = fileobj.read(OFX_READ_SIZE)
+        if not chunk:
+            break
+        pending += chunk.decode('utf-8', errors='replace') if isinstance(chunk, bytes) else chunk
+        cut = pending.rfind('<')
+        complete, pending = pending[:cut], pending[cut:]
+        for match in OFX_TOKEN_RE.finditer(complete):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+    for match in OFX_TOKEN_RE.finditer(pending):
+        yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+
+
+def parse_ofx(fileobj):
+    """
+    Yield (transaction number, row) for each <STMTTRN> in an OFX file.
+    Debits (negative TRNAMT) become expenses; credits are passed through
+    with a positive amount and skipped by the importer.
+    """
+    current = None
+    number = 0
+    for closing, tag, text in _ofx_tokens(fileobj):
+        if tag == 'STMTTRN':
+            if closing and current is not None:
+                number += 1
+                yield number, current
+                current = None
+            elif not closing:
+                current = {}
+        elif current is not None and not closing:
+            if tag == 'DTPOSTED':
+                current['date'] = text[:8]
+            elif tag == 'TRNAMT':
+                current['amount'] = text
+            elif tag == 'NAME':
+                current['title'] = text
+            elif tag == 'MEMO':
+                current['description'] = text
+
+
+PARSERS = {'csv': parse_csv, 'ofx': parse_ofx}
+
+
+def detect_format(filename):
+    return 'ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+# ---------------- Importer ---------------- #
+class ExpenseImporter:
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        # Names seen in this file -> id, resolved through the category cache
+        self.category_ids = {}
+        # Rows without a currency column are in the user's own currency
+        self.currency = fx.preferred_currency(user.id)
+
+    def category_id(self, name):
+        if not name:
+            return None
+        key = name.lower()
+        if key not in self.category_ids:
+            # Names the user has no category for yet become their own
+            self.category_ids[key] = categories.get_or_create(name, self.user.id)
+        return self.category_ids[key]
+
+    @staticmethod
+    def parse_date(value):
+        try:
+            # Fast path: ISO dates, which our own export and most banks produce
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        raise ImportRowError(f"Unrecognised date '{value}'")
+
+    @staticmethod
+    def parse_amount(value):
+        try:
+            amount = Decimal(value.replace(',', '')).quantize(CENT)
+        except (InvalidOperation, AttributeError):
+            raise ImportRowError(f"Invalid amount '{value}'")
+        if not amount.is_finite():
+            raise ImportRowError(f"Invalid amount '{value}'")
+        if abs(amount) > AMOUNT_LIMIT:
+            raise ImportRowError(f"Amount '{value}' is too large")
+        return amount
+
+    def build(self, row, skip_credits=False):
+        """
+        Turn a parsed row into an unsaved Expense, or None to skip it.
+        With skip_credits (OFX) debits are negative and credits skipped;
+        otherwise amounts are positive and a negative one (a refund or
+        credit) is reported instead of being imported as an expense.
+        """
+        amount = self.parse_amount(row.get('amount', ''))
+        if skip_credits:
+            if amount >= 0:
+                return None
+            amount = -amount
+        elif amount < 0:
+            raise ImportRowError(f"Negative amount '{row['amount']}' (a credit or refund?) was not imported")
+        title = (row.get('title') or row.get('description') or row.get('category') or '').strip()
+        if not title:
+            raise ImportRowError('Missing title')
+        currency = (row.get('currency') or self.currency).upper()
+        if len(currency) != 3 or not currency.isalpha():
+            raise ImportRowError(f"Invalid currency '{currency}'")
+        day = self.parse_date(row.get('date', ''))
+        # Only rows that passed validation may create a category
+        return Expense(
+            user_id=self.user.id,
+            category_id=self.category_id(row.get('category')),
+            title=title[:200],
+            amount=amount,
+            currency=currency,
+            date=day,
+            description=row.get('description') or None,
+        )
+
+    def write_batch(self, batch):
+        with transaction.atomic():
+            created = Expense.objects.bulk_create(batch)
+            expenses_bulk_created.send(sender=Expense, expenses=created)
+        return len(created)
+
+    def run(self, rows, skip_credits=False, progress=None):
+        """Import parsed rows; `progress(result)` is called after every batch written."""
+        result = ImportResult()
+        started = time.perf_counter()
+        batch = []
+        try:
+            for line, row in rows:
+                try:
+                    expense = self.build(row, skip_credits)
+                except ImportRowError as exc:
+                    result.add_error(line, str(exc))
+                    continue
+                if expense is None:
+                    result.skipped += 1
+                    continue
+                batch.append(expense)
+                if len(batch) >= self.batch_size:
+                    result.created += self.write_batch(batch)
+                    batch = []
+                    if progress:
+                        progress(result)
+        except ImportRowError as exc:
+            # Raised by the parser: the rest of the file cannot be read
+            result.add_error(0, str(exc))
+        if batch:
+            result.created += self.write_batch(batch)
+        result.seconds = time.perf_counter() - started
+        return result
+
+
+def import_file(user, fileobj, fmt='csv', batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Import a binary file object for `user`. Returns an ImportResult."""
+    importer = ExpenseImporter(user, batch_size=batch_size)
+    return importer.run(PARSERS[fmt](fileobj), skip_credits=(fmt == 'ofx'), progress=progress)
@@ -0,0 +1,191 @@
+# expenses/jobs.py
+"""
+A small database-backed job queue for work too slow for a request.
+
+enqueue() stores a Job row and returns at once. `manage.py run_workers`
+claims queued jobs with a conditional UPDATE, which is safe across worker
+processes on SQLite and PostgreSQL alike, so no broker is needed. It then
+runs the handler registered for the job's kind and records progress, the
+result file or the error. Failures are retried with exponential backoff
+until Job.max_attempts is used up.
+
+Handlers are plain functions taking the Job; they live in
+expenses/tasks.py and register themselves with @handler('kind').
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+CLAIM_CANDIDATES = 5
+
+
+def handler(kind):
+    """Register `fn(job)` as the handler for jobs of this kind."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(kind, user=None, params=None, input_file=None, max_attempts=None):
+    """
+    Queue a job and return it. `input_file` is an uploaded (or any Django)
+    File for the handler; pass max_attempts=1 for work that is not safe to
+    repeat.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'")
+    job = Job(kind=kind, user=user, params=params or {},
+              max_attempts=max_attempts or setting('JOBS_MAX_ATTEMPTS', 3))
+    if input_file is not None:
+        job.input_file.save(os.path.basename(input_file.name), input_file, save=False)
+    job.save()
+    return job
+
+
+def run_now(kind, user=None, params=None):
+    """
+    Create a job and run it in this process, for work small enough to do
+    during the request that still wants its result stored like a queued
+    job's. Not retried: a failure leaves the job failed.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'")
+    now = timezone.now()
+    job = Job.objects.create(kind=kind, user=user, params=params or {}, status=Job.RUNNING, attempts=1,
+                             max_attempts=1, worker=worker_name(), started_at=now, heartbeat_at=now)
+    run(job)
+    return job
+
+
+def report(job, progress, message=''):
+    """
+    Record progress (percent) from inside a handler; also serves as the
+    heartbeat. Best effort: SQLite refuses a write from a connection that
+    is mid-read while another process writes, and a skipped progress
+    update is not worth failing the job over.
+    """
+    job.progress = max(0, min(int(progress), 100))
+    job.message = message[:200]
+    try:
+        Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message, heartbeat_at=timezone.now())
+    except OperationalError:
+        logger.debug('Skipped progress update for job %s', job.pk)
+
+
+def claim(worker_id):
+    """Take the next runnable job for this worker, or return None."""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:CLAIM_CANDIDATES]
+    )
+    for pk in candidates:
+        # Only one worker's UPDATE can still see the row as queued
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker_id, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, progress=0, message='',
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale():
+    """
+    Put running jobs whose worker stopped heartbeating back in the queue,
+    or mark them failed when their attempts are used up: a job enqueued
+    with max_attempts=1 is not safe to run twice.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=setting('JOBS_STALE_AFTER', 600)))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, message='Failed: the worker stopped responding',
+        error='The worker running this job stopped responding; it was not retried.',
+    )
+    return stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, run_after=now, message='Requeued after the worker stopped responding',
+    )
+
+
+def run(job):
+    """Run one claimed job to completion, retry or failure."""
+    try:
+        HANDLERS[job.kind](job)
+    except Exception:
+        logger.exception('Job %s failed (attempt %s/%s)', job.pk, job.attempts, job.max_attempts)
+        fail(job, traceback.format_exc())
+        return
+    job.status, job.progress, job.finished_at = Job.DONE, 100, timezone.now()
+    job.save(update_fields=['status', 'progress', 'message', 'result_file', 'result', 'finished_at'])
+
+
+def fail(job, error):
+    job.error = error
+    if job.attempts < job.max_attempts:
+        delay = setting('JOBS_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+        job.status, job.run_after = Job.QUEUED, timezone.now() + timedelta(seconds=delay)
+        job.message = f'Retrying in {delay}s'
+    else:
+        job.status, job.finished_at = Job.FAILED, timezone.now()
+        job.message = 'Failed'
+    job.save(update_fields=['status', 'error', 'message', 'run_after', 'finished_at'])
+
+
+def purge(days):
+    """Delete finished jobs (and their files) older than `days`."""
+    cutoff = timezone.now() - timedelta(days=days)
+    removed = 0
+    for job in Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).iterator():
+        for f in (job.input_file, job.result_file):
+            if f:
+                f.delete(save=False)
+        job.delete()
+        removed += 1
+    return removed
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def work(worker_id, once=False, poll_interval=1.0, should_stop=lambda: False):
+    """
+    Claim and run jobs until `should_stop()` is true, or until the queue
+    is empty when `once` is set. Returns the number of jobs run.
+    """
+    done = 0
+    while not should_stop():
+        close_old_connections()
+        try:
+            requeue_stale()
+            job = claim(worker_id)
+        except OperationalError:
+            # Locked by another writer (SQLite); try again after a pause
+            logger.warning('Worker %s could not poll the queue', worker_id, exc_info=True)
+            job = None
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        done += 1
+    return done
@@ -0,0 +1,146 @@
+# expenses/journal.py
+"""
+The expense journal: an append-only log of every change to an expense.
+
+The handlers in expenses/signals.py add an ExpenseEvent for each create,
+update, (soft) delete, restore and purge, with the expense's stored
+values before and after the change. Bulk creates that send
+expenses_bulk_created are journaled too, as are seed_expenses' inserts.
+SQL-level changes (a category delete setting category_id to NULL) are
+not; consumers rebuild from scratch after those.
+
+Derived data (the search index, an external store) can follow the journal
+instead of rescanning the Expense table: a consumer is a function taking
+a batch of events, registered with @consumer('name'). consume() feeds it
+the events after its checkpoint, in seq order and in batches, and moves
+the checkpoint forward after each batch in the same transaction, so a
+crash replays at most one batch. Consumers must therefore be idempotent.
+Run them with `manage.py consume_journal`.
+
+Seqs come from the table's autoincrement key. On PostgreSQL two writers
+can commit out of seq order, so a consumer running right behind them may
+skip an event; keep the batches that consume() reads a few seconds old
+there (lag=...).
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .models import Expense, ExpenseEvent, JournalCheckpoint
+
+JOURNALED_FIELDS = ('user_id', 'category_id', 'title', 'amount', 'currency', 'date', 'description',
+                    'recurring_id', 'deleted_at')
+BATCH_SIZE = 500
+
+CONSUMERS = {}
+
+
+def consumer(name):
+    """Register `fn(events)` as the journal consumer `name`."""
+    def register(fn):
+        CONSUMERS[name] = fn
+        return fn
+    return register
+
+
+def snapshot(expense):
+    """The journaled values of an Expense instance, normalised like the stored ones."""
+    values = {name: getattr(expense, name) for name in JOURNALED_FIELDS}
+    for name in ('amount', 'date'):
+        # Views such as edit_expense assign raw POST strings
+        values[name] = Expense._meta.get_field(name).to_python(values[name])
+    return values
+
+
+def stored_values(expense):
+    """Values currently in the database for this expense, deleted or not (None if new)."""
+    if expense.pk is None or expense._state.adding:
+        return None
+    return Expense.all_objects.filter(pk=expense.pk).values(*JOURNALED_FIELDS).first()
+
+
+def action_for(before, after):
+    if before is None:
+        return ExpenseEvent.CREATE
+    if after is None:
+        return ExpenseEvent.PURGE
+    if before['deleted_at'] is None and after['deleted_at'] is not None:
+        return ExpenseEvent.DELETE
+    if before['deleted_at'] is not None and after['deleted_at'] is None:
+        return ExpenseEvent.RESTORE
+    return ExpenseEvent.UPDATE
+
+
+def record(expense, before, after):
+    """Journal the change of `expense` from `before` to `after` (either may be None); no-ops are skipped."""
+    if before == after:
+        return None
+    return ExpenseEvent.objects.create(
+        expense_id=expense.pk, user_id=expense.user_id, action=action_for(before, after),
+        before=before, after=after,
+    )
+
+
+def record_created(expenses):
+    ExpenseEvent.objects.bulk_create([
+        ExpenseEvent(expense_id=e.pk, user_id=e.user_id, action=ExpenseEvent.CREATE, after=snapshot(e))
+        for e in expenses if e.pk is not None
+    ], batch_size=BATCH_SIZE)
+
+
+def history(expense_id):
+    """Every event of one expense, oldest first."""
+    return ExpenseEvent.objects.filter(expense_id=expense_id).order_by('seq')
+
+
+def read(after=0, limit=BATCH_SIZE, lag=None):
+    """Up to `limit` events with seq > `after`, in order; with `lag`, only events older than that."""
+    qs = ExpenseEvent.objects.filter(seq__gt=after)
+    if lag:
+        qs = qs.filter(created_at__lte=timezone.now() - timedelta(seconds=lag))
+    return list(qs.order_by('seq')[:limit])
+
+
+def position(name):
+    """Seq of the last event consumer `name` has handled (0 before its first run)."""
+    return JournalCheckpoint.objects.filter(consumer=name).values_list('position', flat=True).first() or 0
+
+
+def reset(name, to=0):
+    JournalCheckpoint.objects.update_or_create(consumer=name, defaults={'position': to})
+
+
+def consume(name, batch_size=BATCH_SIZE, max_batches=None, lag=None):
+    """
+    Hand the events after consumer `name`'s checkpoint to it, batch by
+    batch, until the journal is exhausted (or `max_batches` is reached).
+    Returns the number of events handled.
+    """
+    handle = CONSUMERS[name]
+    JournalCheckpoint.objects.get_or_create(consumer=name)
+    handled = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            # Locks the checkpoint: two runs of one consumer take turns
+            checkpoint = JournalCheckpoint.objects.select_for_update().get(consumer=name)
+            events = read(checkpoint.position, batch_size, lag)
+            if not events:
+                break
+            handle(events)
+            checkpoint.position = events[-1].seq
+            checkpoint.save(update_fields=['position', 'updated_at'])
+        handled += len(events)
+        batches += 1
+    return handled
+
+
+@consumer('search')
+def sync_search_index(events):
+    """Re-index the expenses these events touched; drop the deleted ones from the index."""
+    ids = {event.expense_id for event in events}
+    live = list(Expense.objects.filter(pk__in=ids).only('id', 'user_id', 'title', 'description', 'category_id'))
+    backend = search.get_backend()
+    backend.remove(ids - {e.pk for e in live})
+    backend.index(live)
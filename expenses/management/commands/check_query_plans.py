@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from expenses import queryplans
+
+
+class Command(BaseCommand):
+    help = ("Run EXPLAIN QUERY PLAN over the SQL issued by the hot views and fail "
+            "if any statement does a full table scan or a temp B-tree sort.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user('__query_plan_check__')
+                failures = queryplans.check_views(Client(), user)
+                # Leave no trace of the probe user in the database
+                transaction.set_rollback(True)
+        except NotImplementedError as exc:
+            raise CommandError(str(exc))
+        finally:
+            teardown_test_environment()
+
+        if failures:
+            for label, problems in failures.items():
+                self.stderr.write(self.style.ERROR(label))
+                for problem in problems:
+                    self.stderr.write(f'  {problem}')
+            raise CommandError(f'{len(failures)} view(s) have regressed query plans.')
+        self.stdout.write(self.style.SUCCESS('All hot view queries use indexes.'))
@@ -0,0 +1,35 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ("Delete expired sessions from the database in batches, pausing between batches so "
+            "requests can write in the meantime (SQLite allows one writer at a time). Schedule it "
+            "from cron, e.g. hourly. Sessions kept only in the cache or in signed cookies expire on "
+            "their own and are left alone.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **opts):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no sessions in the database; nothing to do.')
+            return
+        expired = store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+        removed = 0
+        while True:
+            # Walks the expire_date index; each DELETE is one short transaction
+            keys = list(expired.values_list('session_key', flat=True)[:opts['batch_size']])
+            if not keys:
+                break
+            removed += expired.filter(session_key__in=keys).delete()[0]
+            if len(keys) < opts['batch_size']:
+                break
+            time.sleep(opts['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {removed} expired sessions.'))
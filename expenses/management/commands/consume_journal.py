@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import journal
+
+
+class Command(BaseCommand):
+    help = ("Feed the expense journal to its consumers (see expenses/journal.py) from where each "
+            "left off, in batches. Run it from cron or after bulk changes; --reset replays the "
+            "whole journal.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumers', nargs='*', metavar='CONSUMER',
+                            help=f"Consumers to run (default: all of {', '.join(sorted(journal.CONSUMERS))}).")
+        parser.add_argument('--batch-size', type=int, default=journal.BATCH_SIZE)
+        parser.add_argument('--lag', type=float, default=None,
+                            help='Only read events at least this many seconds old (see expenses/journal.py).')
+        parser.add_argument('--reset', action='store_true', help='Start again from the first event.')
+
+    def handle(self, *args, **opts):
+        names = opts['consumers'] or sorted(journal.CONSUMERS)
+        unknown = set(names) - set(journal.CONSUMERS)
+        if unknown:
+            raise CommandError(f"Unknown consumer(s): {', '.join(sorted(unknown))}")
+        for name in names:
+            if opts['reset']:
+                journal.reset(name)
+            handled = journal.consume(name, batch_size=opts['batch_size'], lag=opts['lag'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: handled {handled} events, now at seq {journal.position(name)}.'
+            ))
@@ -0,0 +1,122 @@
+import multiprocessing
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from expenses import database, fx, views
+from expenses.models import Expense
+from expenses.perf import percentile
+
+# Django's own SQLite behaviour: rollback journal, fully synchronous commits
+SQLITE_DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def read_loop(user_id, currency, deadline, results):
+    """Dashboard reads plus the first listing page, as fast as possible until `deadline`."""
+    user = get_user_model()(pk=user_id)
+    start_month, end_month = views.dashboard_months(12)
+    timings, errors = [], 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with database.replica_reads_enabled():
+                for qs in views.dashboard_querysets(user, start_month, end_month, currency):
+                    list(qs)
+                list(Expense.objects.filter(user_id=user_id).order_by('-date', '-id')[:20])
+        except OperationalError:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    results.put(('read', timings, errors))
+
+
+def write_loop(user_id, currency, deadline, results):
+    """Add and delete an expense (with all its signal work) until `deadline`."""
+    timings, errors = [], 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            expense = Expense.objects.create(user_id=user_id, title='Load test', amount=Decimal('1.00'),
+                                             currency=currency, date=date.today())
+            expense.delete()
+        except OperationalError:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    results.put(('write', timings, errors))
+
+
+class Command(BaseCommand):
+    help = ("Run reader and writer processes against the database at the same time and report "
+            "throughput, latency and lock errors. On SQLite the run is repeated with Django's default "
+            "journal and with SQLITE_TUNED_PRAGMAS (WAL) on the same file, which is left as it was found.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username whose data is read (default: the user with the most expenses).')
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each run.')
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        if opts['user']:
+            user = User.objects.filter(username=opts['user']).first()
+        else:
+            user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No user to read; seed data with `manage.py seed_expenses`.')
+        currency = fx.preferred_currency(user.pk)
+
+        if connection.vendor == 'sqlite':
+            profiles = [('default', SQLITE_DEFAULT_PRAGMAS), ('tuned', settings.SQLITE_TUNED_PRAGMAS)]
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+        else:
+            profiles = [(connection.vendor, {})]
+
+        self.stdout.write(f"{'profile':<10}{'op':<7}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        try:
+            for label, pragmas in profiles:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    for op, rate, timings, errors in self.run(user.pk, currency, opts):
+                        timings.sort()
+                        self.stdout.write(
+                            f"{label:<10}{op:<7}{rate:>9.1f}{percentile(timings, 50):>10.1f}"
+                            f"{percentile(timings, 95):>10.1f}{percentile(timings, 99):>10.1f}{errors:>8}"
+                        )
+        finally:
+            if connection.vendor == 'sqlite':
+                connections.close_all()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+
+    @staticmethod
+    def run(user_id, currency, opts):
+        """[(op, ops per second, timings, errors)] for one concurrent run."""
+        # Children must open their own connections (with the PRAGMAs in effect)
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.monotonic() + opts['seconds']
+        workers = [context.Process(target=read_loop, args=(user_id, currency, deadline, results))
+                   for _ in range(opts['readers'])]
+        workers += [context.Process(target=write_loop, args=(user_id, currency, deadline, results))
+                    for _ in range(opts['writers'])]
+        for worker in workers:
+            worker.start()
+        collected = {'read': ([], 0), 'write': ([], 0)}
+        for _ in workers:
+            op, timings, errors = results.get()
+            collected[op] = (collected[op][0] + timings, collected[op][1] + errors)
+        for worker in workers:
+            worker.join()
+        return [(op, len(timings) / opts['seconds'], timings or [0.0], errors)
+                for op, (timings, errors) in collected.items()]
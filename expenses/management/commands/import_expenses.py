@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import importers
+
+
+class Command(BaseCommand):
+    help = "Bulk import expenses for a user from a CSV or OFX/QFX bank statement."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username to import for.')
+        parser.add_argument('--format', dest='fmt', choices=['auto', 'csv', 'ofx'], default='auto')
+        parser.add_argument('--batch-size', type=int, default=importers.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Unknown user: {options['user']}")
+
+        fmt = options['fmt']
+        if fmt == 'auto':
+            fmt = importers.detect_format(options['path'])
+
+        with open(options['path'], 'rb') as fh:
+            result = importers.import_file(user, fh, fmt, batch_size=options['batch_size'])
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} rows ({result.skipped} skipped, {result.error_count} errors) "
+            f"in {result.seconds:.2f}s - {result.rows_per_second:,.0f} rows/s"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import budgets, caching, fx
+
+
+class Command(BaseCommand):
+    help = "Load exchange rates from a CSV file with date, currency and rate columns (rate in FX_BASE_CURRENCY)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, e.g. one exported from your bank or a central bank site.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                loaded = fx.load_rates(fh)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        # Counters hold converted amounts, and every cached total may change
+        counters = budgets.rebuild()
+        caching.bump_global_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {loaded} rates in {fx.base_currency()}; refreshed {counters} budget counters."
+        ))
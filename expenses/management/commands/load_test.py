@@ -0,0 +1,76 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import reverse
+
+from expenses.perf import percentile
+
+DEFAULT_PATHS = ['dashboard', 'expense_list', 'expense_list_api', 'month_total_api']
+
+
+class Command(BaseCommand):
+    help = ("Fire concurrent GET requests at a running server (e.g. gunicorn with deploy/gunicorn_asgi.py "
+            "or deploy/gunicorn_wsgi.py) and report throughput and latency percentiles.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--user', help='Username to log in as (default: the user with the most expenses).')
+        parser.add_argument('--view', action='append', help=f'URL name to request (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per view.')
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        if opts['user']:
+            user = User.objects.filter(username=opts['user']).first()
+        else:
+            user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No user to log in as; seed data with `manage.py seed_expenses`.')
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.session_for(user)}'
+
+        self.stdout.write(f"{'view':<24}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name in opts['view'] or DEFAULT_PATHS:
+            url = opts['base_url'].rstrip('/') + reverse(name)
+            rate, timings, errors = self.run(url, cookie, opts['requests'], opts['concurrency'])
+            timings.sort()
+            self.stdout.write(f"{name:<24}{rate:>10.1f}{percentile(timings, 50):>10.1f}"
+                              f"{percentile(timings, 95):>10.1f}{percentile(timings, 99):>10.1f}{errors:>8}")
+
+    @staticmethod
+    def session_for(user):
+        """Session key for a logged-in session, without going through the login form."""
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.create()
+        return store.session_key
+
+    @staticmethod
+    def fetch(url, cookie):
+        request = urllib.request.Request(url, headers={'Cookie': cookie})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                # A redirect to the login page is a failure, not a fast 200
+                ok = response.status == 200 and response.geturl() == url
+        except (urllib.error.URLError, OSError):
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    def run(self, url, cookie, count, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: self.fetch(url, cookie), range(count)))
+        elapsed = time.perf_counter() - started
+        timings = [ms for ms, ok in results if ok]
+        return len(timings) / elapsed, timings or [0.0], sum(1 for _, ok in results if not ok)
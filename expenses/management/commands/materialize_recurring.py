@@ -0,0 +1,30 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import recurring
+
+
+class Command(BaseCommand):
+    help = "Create the Expense rows due from recurring expenses, catching up any missed periods."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Materialize occurrences up to this day (YYYY-MM-DD, default today).')
+        parser.add_argument('--batch-size', type=int, default=recurring.DEFAULT_BATCH_SIZE,
+                            help=f'Schedules per transaction (default {recurring.DEFAULT_BATCH_SIZE}).')
+
+    def handle(self, *args, **opts):
+        as_of = None
+        if opts['date']:
+            try:
+                as_of = date.fromisoformat(opts['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date '{opts['date']}', expected YYYY-MM-DD")
+
+        started = time.perf_counter()
+        schedules, created = recurring.materialize(as_of, batch_size=opts['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} expenses from {schedules} due schedules in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import perf
+
+
+class Command(BaseCommand):
+    help = "Summarise request metrics logged by PerformanceMiddleware (PERF_LOG_FILE) per URL name."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Metrics log to read (defaults to PERF_LOG_FILE).')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--sort', default='total_ms', choices=['total_ms', 'db_ms', 'template_ms', 'queries'],
+                            help='Order views by the p95 of this field.')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'PERF_LOG_FILE', None)
+        if not path:
+            raise CommandError('No metrics log: set PERF_LOG_FILE or pass --file.')
+        try:
+            report = perf.summarise(perf.read_log(path))
+        except FileNotFoundError:
+            raise CommandError(f'Metrics log not found: {path}')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        sort = options['sort']
+        header = f"{'view':<28}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db p95':>10}{'tpl p95':>10}{'q p95':>7}{'q max':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for view, entry in sorted(report.items(), key=lambda item: item[1][sort]['p95'], reverse=True):
+            total = entry['total_ms']
+            self.stdout.write(
+                f"{view:<28}{entry['count']:>7}{total['p50']:>10.1f}{total['p95']:>10.1f}{total['p99']:>10.1f}"
+                f"{entry['db_ms']['p95']:>10.1f}{entry['template_ms']['p95']:>10.1f}"
+                f"{entry['queries']['p95']:>7}{entry['max_queries']:>7}"
+            )
+        self.stdout.write('')
+        self.stdout.write('Slowest SQL per view:')
+        for view, entry in report.items():
+            self.stdout.write(f"  {view} ({entry['slowest_sql']['ms']:.1f} ms): {entry['slowest_sql']['sql']}")
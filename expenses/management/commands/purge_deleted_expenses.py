@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from expenses.models import Expense
+
+
+class Command(BaseCommand):
+    help = ("Permanently remove expenses deleted more than EXPENSE_PURGE_DAYS ago (until then they can "
+            "be restored), in batches with a pause between them so requests can write in the meantime. "
+            "Each purge is journaled. Schedule it from cron, e.g. daily.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=None,
+                            help='Purge expenses deleted more than this many days ago (default: EXPENSE_PURGE_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **opts):
+        days = opts['days'] if opts['days'] is not None else getattr(settings, 'EXPENSE_PURGE_DAYS', 30)
+        expired = Expense.all_objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+        purged = 0
+        while True:
+            # Walks the partial deleted_at index; rows, events and search entries go in one transaction
+            ids = list(expired.order_by('deleted_at').values_list('pk', flat=True)[:opts['batch_size']])
+            if not ids:
+                break
+            with transaction.atomic():
+                purged += Expense.all_objects.filter(pk__in=ids).delete()[1].get('expenses.Expense', 0)
+            if len(ids) < opts['batch_size']:
+                break
+            time.sleep(opts['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} deleted expenses.'))
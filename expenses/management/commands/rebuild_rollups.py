@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import budgets, jobs, rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user monthly/category expense rollups and budget counters from the Expense table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only rebuild this user (may be repeated).')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the rebuild for `manage.py run_workers` instead of running it now.')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            User = get_user_model()
+            users = dict(User.objects.filter(username__in=options['usernames']).values_list('username', 'id'))
+            missing = set(options['usernames']) - set(users)
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            user_ids = list(users.values())
+
+        if options['background']:
+            job = jobs.enqueue('rebuild_rollups', params={'user_ids': user_ids})
+            self.stdout.write(self.style.SUCCESS(f"Queued rebuild as job #{job.id}."))
+            return
+
+        written = rollups.rebuild(user_ids)
+        counters = budgets.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows and {counters} budget counters."))
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the expense full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only reindex this user (may be repeated).')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            User = get_user_model()
+            users = dict(User.objects.filter(username__in=options['usernames']).values_list('username', 'id'))
+            missing = set(options['usernames']) - set(users)
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            user_ids = list(users.values())
+
+        backend = search.get_backend()
+        indexed = backend.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} expenses with {type(backend).__name__}."))
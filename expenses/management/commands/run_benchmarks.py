@@ -0,0 +1,92 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from expenses import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the hot views through the test client and report latency percentiles, "
+            "queries per request and peak memory. Seed data first with `manage.py seed_expenses`.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to drive (default: the user with the most expenses).')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--only', action='append', help='Only scenarios whose name contains this text.')
+        parser.add_argument('--output', help='Write results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run.')
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Flag scenarios whose p95 grew by more than this factor (default 1.25).')
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        if opts['user']:
+            user = User.objects.filter(username=opts['user']).first()
+        else:
+            user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError('No user to benchmark; seed data with `manage.py seed_expenses`.')
+
+        setup_test_environment()
+        try:
+            results = benchmarks.run_suite(Client(), user, opts['iterations'], opts['only'])
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git': self.git_revision(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'user': user.username,
+                'expenses': user.expense_set.count(),
+                'iterations': opts['iterations'],
+            },
+            'scenarios': results,
+        }
+        self.print_table(report)
+
+        if opts['output']:
+            with open(opts['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Saved results to {opts['output']}")
+
+        if opts['compare']:
+            with open(opts['compare'], encoding='utf-8') as fh:
+                baseline = json.load(fh)
+            regressions = benchmarks.compare(results, baseline['scenarios'], opts['threshold'])
+            for name, before, after, ratio in regressions:
+                self.stderr.write(self.style.ERROR(f'REGRESSION {name}: {before} -> {after} ({ratio:.2f}x)'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {opts["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {opts["compare"]}'))
+
+    def print_table(self, report):
+        meta = report['meta']
+        self.stdout.write(f"user={meta['user']} expenses={meta['expenses']} db={meta['database']} "
+                          f"debug={meta['debug']} iterations={meta['iterations']}")
+        header = f"{'scenario':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KB':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, r in report['scenarios'].items():
+            self.stdout.write(f"{name:<32}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                              f"{r['queries']:>9}{r['peak_kb']:>10.1f}")
+
+    @staticmethod
+    def git_revision():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
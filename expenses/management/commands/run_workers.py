@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# expenses.jobs is imported lazily: spawned worker processes load this
+# module before Django is set up.
+
+
+def worker_process(index, once, poll_interval):
+    import django
+    django.setup()
+    from expenses import jobs
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    try:
+        jobs.work(jobs.worker_name(index), once=once, poll_interval=poll_interval,
+                  should_stop=lambda: bool(stopping))
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (exports, imports, rebuilds) from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to start (default 1).')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when idle.')
+        parser.add_argument('--purge-days', type=int, default=7,
+                            help='First delete finished jobs older than this many days (0 keeps everything).')
+
+    def handle(self, *args, **opts):
+        from expenses import jobs
+
+        if opts['purge_days']:
+            removed = jobs.purge(opts['purge_days'])
+            if removed:
+                self.stdout.write(f'Purged {removed} old jobs.')
+
+        if opts['processes'] <= 1:
+            try:
+                run = jobs.work(jobs.worker_name(), once=opts['once'], poll_interval=opts['poll_interval'])
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f'Ran {run} jobs.'))
+            return
+
+        # Children must not inherit open database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=worker_process, args=(i, opts['once'], opts['poll_interval']))
+            for i in range(opts['processes'])
+        ]
+        for w in workers:
+            w.start()
+        self.stdout.write(f"Started {len(workers)} workers; Ctrl+C to stop.")
+        try:
+            for w in workers:
+                w.join()
+        except KeyboardInterrupt:
+            for w in workers:
+                w.terminate()
+            for w in workers:
+                w.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
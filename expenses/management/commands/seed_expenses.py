@@ -0,0 +1,125 @@
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expenses import budgets, caching, journal, profiles, rollups, search
+from expenses.models import Budget, Category, Expense
+
+# (category, relative frequency, median amount)
+CATEGORY_PROFILE = [
+    ('Food', 40, 12),
+    ('Transport', 20, 8),
+    ('Shopping', 15, 45),
+    ('Bills', 8, 120),
+    ('Entertainment', 12, 25),
+    ('Other', 5, 30),
+]
+TITLES = {
+    'Food': ['Groceries', 'Lunch', 'Coffee', 'Dinner out', 'Bakery'],
+    'Transport': ['Metro card', 'Taxi', 'Fuel', 'Parking', 'Bus ticket'],
+    'Shopping': ['Clothes', 'Shoes', 'Electronics', 'Books', 'Home goods'],
+    'Bills': ['Electricity', 'Internet', 'Phone', 'Water', 'Rent'],
+    'Entertainment': ['Cinema', 'Concert', 'Streaming', 'Games', 'Museum'],
+    'Other': ['Gift', 'Donation', 'Haircut', 'Pharmacy', 'Repairs'],
+}
+USER_CHUNK = 500
+
+
+class Command(BaseCommand):
+    help = ("Generate synthetic users, expenses and budgets with bulk_create (for benchmarks and load tests). "
+            "Expenses are journaled and rollups, budgets, search and cache versions rebuilt for the new users.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--per-month', type=int, default=30, help='Average expenses per user per month.')
+        parser.add_argument('--skew', type=float, default=1.5,
+                            help='Pareto shape for per-user activity; lower is more skewed (0 disables skew).')
+        parser.add_argument('--budget-share', type=float, default=0.5,
+                            help='Fraction of users with a monthly budget.')
+        parser.add_argument('--prefix', default='seed', help='Username prefix for generated users.')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        rng = random.Random(opts['seed'])
+        prefix = opts['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users starting with '{prefix}' already exist; pick another --prefix.")
+
+        started = time.perf_counter()
+        defaults = Category.objects.filter(owner__isnull=True, name__in=[c[0] for c in CATEGORY_PROFILE])
+        categories = {c.name: c.id for c in defaults}
+        profile = [(categories[name], weight, median, name) for name, weight, median in CATEGORY_PROFILE
+                   if name in categories]
+        if not profile:
+            raise CommandError('Default categories are missing; run migrations first.')
+        weights = [p[1] for p in profile]
+
+        # One hash for everyone: hashing per user would dominate the run
+        password = make_password(opts['password'])
+        users = User.objects.bulk_create(
+            [User(username=f'{prefix}{i:06d}', password=password) for i in range(opts['users'])],
+            batch_size=opts['batch_size'],
+        )
+        profiles.create_for(users, batch_size=opts['batch_size'])
+
+        first_month = date.today().replace(day=1) - relativedelta(years=opts['years'])
+        months = [first_month + relativedelta(months=m) for m in range(opts['years'] * 12 + 1)]
+        expenses, budget_rows, total = [], [], 0
+        for user in users:
+            activity = rng.paretovariate(opts['skew']) if opts['skew'] > 0 else 1.0
+            per_month = max(1, int(opts['per_month'] * min(activity, 20)))
+            for month in months:
+                days = (month + relativedelta(months=1) - month).days
+                for _ in range(max(0, int(rng.gauss(per_month, per_month / 4)))):
+                    category_id, _, median, name = rng.choices(profile, weights)[0]
+                    expenses.append(Expense(
+                        user_id=user.id,
+                        category_id=category_id,
+                        title=rng.choice(TITLES[name]),
+                        amount=Decimal(str(round(rng.lognormvariate(0, 0.6) * median, 2))),
+                        date=month.replace(day=rng.randint(1, days)),
+                    ))
+                if len(expenses) >= opts['batch_size']:
+                    total += self.flush(expenses, opts['batch_size'])
+                    expenses = []
+            if rng.random() < opts['budget_share']:
+                limit = Decimal(per_month * 25)
+                budget_rows.extend(Budget(user_id=user.id, month=m, amount=limit) for m in months)
+        total += self.flush(expenses, opts['batch_size'])
+        Budget.objects.bulk_create(budget_rows, batch_size=opts['batch_size'])
+
+        # Derived data is rebuilt set-wise instead of per batch (expenses_bulk_created
+        # would update it per batch); only the journal is written as we go, in flush()
+        user_ids = [u.id for u in users]
+        backend = search.get_backend()
+        for start in range(0, len(user_ids), USER_CHUNK):
+            chunk = user_ids[start:start + USER_CHUNK]
+            rollups.rebuild(chunk)
+            budgets.rebuild(chunk)
+            backend.rebuild(chunk)
+            for user_id in chunk:
+                caching.bump_user_version(user_id)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {total} expenses and {len(budget_rows)} budgets "
+            f"in {elapsed:.1f}s ({total / elapsed:,.0f} expenses/s)."
+        ))
+
+    @staticmethod
+    def flush(expenses, batch_size):
+        with transaction.atomic():
+            Expense.objects.bulk_create(expenses, batch_size=batch_size)
+            journal.record_created(expenses)
+        return len(expenses)
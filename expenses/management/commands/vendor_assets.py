@@ -0,0 +1,38 @@
+import re
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import assets
+
+# Source maps are not shipped, and collectstatic would fail on the dangling reference
+SOURCE_MAP_RE = re.compile(rb'\n?/[/*]# sourceMappingURL=\S+(?: \*/)?\s*$')
+
+
+class Command(BaseCommand):
+    help = ("Download the pinned Bootstrap, bootstrap-icons and Chart.js files into expenses/static/vendor/ "
+            "so pages stop loading them from the CDN. Commit the result; run collectstatic afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that are already present again.')
+
+    def handle(self, *args, **opts):
+        fetched = 0
+        for path, package_file in assets.FILES.items():
+            target = assets.VENDOR_DIR / path
+            if target.exists() and not opts['force']:
+                continue
+            try:
+                with urllib.request.urlopen(assets.CDN + package_file, timeout=60) as response:
+                    content = response.read()
+            except (urllib.error.URLError, OSError) as exc:
+                raise CommandError(f'Could not download {package_file}: {exc}')
+            if path.endswith(('.css', '.js')):
+                content = SOURCE_MAP_RE.sub(b'\n', content)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            fetched += 1
+            self.stdout.write(f'{path} ({len(content) // 1024} KB)')
+        assets.vendored.cache_clear()
+        self.stdout.write(self.style.SUCCESS(f'Downloaded {fetched} file(s) into {assets.VENDOR_DIR}.'))
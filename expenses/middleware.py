@@ -0,0 +1,225 @@
+# expenses/middleware.py
+import json
+import mimetypes
+import os
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+from . import database, perf
+
+
+class PerformanceMiddleware:
+    """
+    Records query count, DB time, template time and total latency for every
+    request, grouped by URL name. Disable with PERF_MONITORING = False.
+    Queries issued while a StreamingHttpResponse is consumed are not counted.
+    Works in both sync and async stacks so async views stay async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'PERF_MONITORING', True):
+            return self.get_response(request)
+
+        metrics = perf.RequestMetrics()
+        token = perf.current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack)
+                response = self.get_response(request)
+        finally:
+            perf.current_metrics.reset(token)
+
+        self.record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'PERF_MONITORING', True):
+            return await self.get_response(request)
+
+        metrics = perf.RequestMetrics()
+        token = perf.current_metrics.set(metrics)
+        stack = ExitStack()
+        try:
+            # Async ORM calls run on the request's sync thread, and connections
+            # are thread-local, so the wrappers must be installed there too
+            await sync_to_async(self.wrap_connections)(stack)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            perf.current_metrics.reset(token)
+
+        self.record(request, response, metrics)
+        return response
+
+    @staticmethod
+    def wrap_connections(stack):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(perf.query_timer))
+
+    @staticmethod
+    def record(request, response, metrics):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        perf.store.add(metrics.as_sample(view, response.status_code))
+
+
+class PrimaryAfterWriteMiddleware:
+    """
+    After a write (any non-GET/HEAD/OPTIONS request), keep this browser's
+    reads on the primary database for REPLICA_PIN_SECONDS, so replica lag
+    never hides what the user just saved. Does nothing without a replica.
+    """
+    sync_capable = True
+    async_capable = True
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if database.replica_alias() and request.method not in self.SAFE_METHODS:
+            response.set_cookie(database.PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+@dataclass
+class StaticFile:
+    path: str
+    content_type: str
+    cache_control: str
+    mtime: float
+    variants: dict = field(default_factory=dict)   # Content-Encoding -> path of the compressed copy
+
+    def pick(self, accept_encoding):
+        """(encoding or None, path) of the smallest copy the client accepts."""
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return None, self.path
+
+
+class StaticFilesMiddleware:
+    """
+    Serves the collected static files (STATIC_ROOT) before any other
+    middleware runs, so no session, auth or view work is done for them.
+
+    The directory is indexed once at startup (collectstatic runs before a
+    deploy starts the server). Names from the manifest (hashed, see
+    expenses/storage.py) are sent with a one-year immutable Cache-Control,
+    others with STATIC_MAX_AGE; the pre-compressed .br/.gz copies are
+    served to browsers that accept them, and ETags answer revalidations
+    with a 304. Not used with DEBUG on, where runserver serves static
+    files from the apps directly.
+    """
+    sync_capable = True
+    async_capable = True
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+    TYPES = {'.woff2': 'font/woff2', '.woff': 'font/woff', '.js': 'text/javascript'}
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if settings.DEBUG or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.files = self.index(str(root))
+
+    @classmethod
+    def index(cls, root):
+        """{name relative to STATIC_ROOT: StaticFile} for every collected file."""
+        hashed = set()
+        manifest = os.path.join(root, 'staticfiles.json')
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                hashed = set(json.load(f).get('paths', {}).values())
+        short = f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60)}"
+        files, compressed = {}, []
+        for directory, _, names in os.walk(root):
+            for filename in names:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                base, ext = os.path.splitext(name)
+                if ext in cls.ENCODINGS:
+                    compressed.append((base, cls.ENCODINGS[ext], path))
+                    continue
+                content_type = cls.TYPES.get(ext) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                files[name] = StaticFile(path, content_type, cls.IMMUTABLE if name in hashed else short,
+                                         os.stat(path).st_mtime)
+        for base, encoding, path in compressed:
+            if base in files:
+                files[base].variants[encoding] = path
+        return files
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return await self.get_response(request) if response is None else response
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        static = self.files.get(request.path[len(self.prefix):])
+        if static is None:
+            return None
+        encoding, path = static.pick(request.headers.get('Accept-Encoding', ''))
+        size = os.path.getsize(path)
+        etag = f'"{int(static.mtime):x}-{size:x}{"-" + encoding if encoding else ""}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            with open(path, 'rb') as f:
+                body = f.read() if request.method == 'GET' else b''
+            response = HttpResponse(body, content_type=static.content_type)
+            response['Content-Length'] = size
+            response['Last-Modified'] = http_date(static.mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = static.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        # SecurityMiddleware never sees these responses
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_counters(apps, schema_editor):
+    Budget = apps.get_model('expenses', 'Budget')
+    BudgetCounter = apps.get_model('expenses', 'BudgetCounter')
+    ExpenseRollup = apps.get_model('expenses', 'ExpenseRollup')
+    by_category = {
+        (r['user_id'], r['month'], r['category_id']): r['spent']
+        for r in ExpenseRollup.objects.values('user_id', 'month', 'category_id').annotate(spent=Sum('total')).order_by()
+    }
+    overall = {
+        (r['user_id'], r['month']): r['spent']
+        for r in ExpenseRollup.objects.values('user_id', 'month').annotate(spent=Sum('total')).order_by()
+    }
+    counters = []
+    for b in Budget.objects.all().iterator():
+        if b.category_id is None:
+            spent = overall.get((b.user_id, b.month), 0)
+        else:
+            spent = by_category.get((b.user_id, b.month, b.category_id), 0)
+        counters.append(BudgetCounter(budget_id=b.id, user_id=b.user_id, month=b.month,
+                                      category_id=b.category_id, limit=b.amount, spent=spent))
+    BudgetCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_expense_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('budget', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='counter', to='expenses.budget')),
+                ('category', models.ForeignKey(blank=True, help_text='Empty for the overall monthly budget', null=True, on_delete=django.db.models.deletion.CASCADE, to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'month'], name='budgetcounter_user_month_idx')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_recurringexpense'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='expenserollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='expenserollup',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='recurringexpense',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+        migrations.AlterUniqueTogether(
+            name='expenserollup',
+            unique_together={('user', 'month', 'category', 'currency')},
+        ),
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+            options={
+                'ordering': ['currency', '-date'],
+                'unique_together': {('currency', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rename_duplicate_categories(apps, schema_editor):
+    """
+    Existing categories all become global ones, whose names must now be
+    unique ignoring case. Names are trimmed, and later duplicates get a
+    " (2)", " (3)"... suffix rather than being merged, so no expense,
+    budget or rollup changes category here.
+    """
+    Category = apps.get_model('expenses', 'Category')
+    taken = set()
+    for category in Category.objects.order_by('id'):
+        base = ' '.join(category.name.split()) or 'Unnamed'
+        name, n = base, 1
+        while name.lower() in taken:
+            n += 1
+            name = f'{base} ({n})'
+        taken.add(name.lower())
+        if name != category.name:
+            category.name = name
+            category.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_currencies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='owner',
+            field=models.ForeignKey(blank=True, help_text="Set for a user's own category; global categories have none", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='categories', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(rename_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), condition=models.Q(('owner__isnull', True)), name='category_global_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), models.F('owner'), condition=models.Q(('owner__isnull', False)), name='category_owner_name_uniq'),
+        ),
+    ]
@@ -1,28 +1,80 @@
 # expenses/models.py
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class Category(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='categories',
+                              help_text="Set for a user's own category; global categories have none")
+
+    class Meta:
+        constraints = [
+            # Names are unique ignoring case, among global categories and within each user's
+            models.UniqueConstraint(Lower('name'), condition=models.Q(owner__isnull=True),
+                                    name='category_global_name_uniq'),
+            models.UniqueConstraint(Lower('name'), 'owner', condition=models.Q(owner__isnull=False),
+                                    name='category_owner_name_uniq'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class LiveExpenseManager(models.Manager):
+    """Expenses that have not been (soft-)deleted."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Expense(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     title = models.CharField(max_length=200)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default='INR')
     date = models.DateField()
     description = models.TextField(blank=True, null=True)
+    recurring = models.ForeignKey('RecurringExpense', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='expenses', help_text='Schedule this expense was generated from')
+    deleted_at = models.DateTimeField(null=True, blank=True,
+                                      help_text='Set when deleted; the row is purged EXPENSE_PURGE_DAYS later')
+
+    # Deleted expenses are invisible everywhere except through all_objects
+    objects = LiveExpenseManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='expense_user_cat_date_idx'),
+            # The trash page and the purge command
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                         name='expense_deleted_idx'),
+        ]
+        constraints = [
+            # A schedule produces at most one expense per date, so re-runs cannot duplicate
+            models.UniqueConstraint(fields=['recurring', 'date'], condition=models.Q(recurring__isnull=False),
+                                    name='expense_recurring_date_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.amount}"
 
+    def soft_delete(self):
+        """Hide the expense (derived data treats it as deleted) until restore() or the purge."""
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
+    def restore(self):
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at'])
+
 
 # ✅ Appended new model for monthly budgets
 class Budget(models.Model):
@@ -34,9 +86,76 @@ class Budget(models.Model):
     class Meta:
         unique_together = ('user', 'month', 'category')
         ordering = ['-month']
+        indexes = [
+            # Overall (category-less) budget lookup used by the dashboard and add_expense
+            models.Index(fields=['user', 'month'], condition=models.Q(category__isnull=True),
+                         name='budget_user_month_overall_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.month:%b %Y} - {self.amount}"
+
+
+class RecurringExpense(models.Model):
+    """
+    A repeating expense (rent, subscriptions). `manage.py materialize_recurring`
+    turns every occurrence up to today into an Expense; see expenses/recurring.py.
+    Occurrences are counted from start_date, so monthly schedules on the 31st
+    fall on the last day of shorter months without drifting.
+    """
+    DAILY, WEEKLY, MONTHLY = 'daily', 'weekly', 'monthly'
+    FREQUENCY_CHOICES = [(DAILY, 'Daily'), (WEEKLY, 'Weekly'), (MONTHLY, 'Monthly')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_expenses')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    title = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default='INR')
+    description = models.TextField(blank=True, null=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=MONTHLY)
+    interval = models.PositiveSmallIntegerField(default=1, help_text='Every N days/weeks/months')
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    occurrences = models.PositiveIntegerField(default=0, help_text='Occurrences generated so far')
+    next_date = models.DateField(help_text='Date of the next occurrence to generate')
+
+    class Meta:
+        ordering = ['next_date']
+        indexes = [
+            # The scheduler's "due" scan
+            models.Index(fields=['next_date'], condition=models.Q(active=True), name='recurring_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.amount} ({self.get_frequency_display().lower()})"
+
+    def save(self, *args, **kwargs):
+        if self.next_date is None:
+            self.next_date = self.start_date
+        super().save(*args, **kwargs)
+
+
+class BudgetCounter(models.Model):
+    """
+    Running amount spent against one Budget, kept in step with Expense by
+    the handlers in expenses/signals.py (see expenses/budgets.py).
+    user/month/category are copied from the budget so expense changes can
+    find their counters without a join.
+    """
+    budget = models.OneToOneField(Budget, on_delete=models.CASCADE, related_name='counter')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_counters')
+    month = models.DateField(help_text='First day of the month')
+    category = models.ForeignKey('Category', on_delete=models.CASCADE, null=True, blank=True,
+                                 help_text='Empty for the overall monthly budget')
+    limit = models.DecimalField(max_digits=12, decimal_places=2)
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'month'], name='budgetcounter_user_month_idx')]
+
+    def __str__(self):
+        return f"{self.user} - {self.month:%b %Y} - {self.spent}/{self.limit}"
     
     # 8 nov 2025 new one
 
@@ -50,6 +169,128 @@ class Profile(models.Model):
         return f"Profile({self.user.username})"
 
 
+class FxRate(models.Model):
+    """
+    Value of one unit of `currency` in settings.FX_BASE_CURRENCY from `date`
+    on. Loaded from CSV with `manage.py load_fx_rates`; see expenses/fx.py.
+    """
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
 
+    class Meta:
+        unique_together = ('currency', 'date')
+        ordering = ['currency', '-date']
 
+    def __str__(self):
+        return f"{self.currency} {self.date} = {self.rate}"
+
+
+class ExpenseRollup(models.Model):
+    """
+    Per-user running totals for one (month, category, currency) bucket,
+    in that currency. Kept in step with Expense by the handlers in
+    expenses/signals.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expense_rollups')
+    month = models.DateField(help_text='First day of the month')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    currency = models.CharField(max_length=3, default='INR')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'month', 'category', 'currency')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.user} - {self.month:%b %Y} - {self.category} - {self.total}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work (export, import, rebuild) run by
+    `manage.py run_workers`. See expenses/jobs.py.
+    """
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True, help_text='Summary written by the handler')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0, help_text='Percent complete')
+    message = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    input_file = models.FileField(upload_to='jobs/input/', blank=True)
+    result_file = models.FileField(upload_to='jobs/results/', blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The workers' "next runnable job" lookup
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
 
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ExpenseEvent(models.Model):
+    """
+    One entry of the append-only expense journal: an expense was created,
+    updated, deleted, restored or purged, with its values before and after.
+    Written by expenses/signals.py; read with expenses/journal.py. The
+    expense and user are plain references so the history outlives them.
+    """
+    CREATE, UPDATE, DELETE, RESTORE, PURGE = 'create', 'update', 'delete', 'restore', 'purge'
+    ACTION_CHOICES = [(CREATE, 'Created'), (UPDATE, 'Updated'), (DELETE, 'Deleted'),
+                      (RESTORE, 'Restored'), (PURGE, 'Purged')]
+
+    seq = models.BigAutoField(primary_key=True)
+    expense = models.ForeignKey(Expense, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                                related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    before = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    after = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [models.Index(fields=['expense', 'seq'], name='expenseevent_expense_seq_idx')]
+
+    @property
+    def changes(self):
+        """{field: (before, after)} for the fields that differ."""
+        before, after = self.before or {}, self.after or {}
+        return {
+            name: (before.get(name), after.get(name))
+            for name in {*before, *after} if before.get(name) != after.get(name)
+        }
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} expense {self.expense_id}"
+
+
+class JournalCheckpoint(models.Model):
+    """How far a journal consumer has got: the seq of the last event it handled."""
+    consumer = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.position}"
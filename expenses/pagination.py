@@ -0,0 +1,133 @@
+# expenses/pagination.py
+"""
+Keyset (seek) pagination for expense listings.
+
+Pages are ordered by (-date, -id). A page token records the (date, id) of
+the row at the page edge and the direction to read in, so fetching any page
+is one indexed range read of `per_page + 1` rows no matter how deep it is.
+Tokens are signed so clients treat them as opaque.
+"""
+import hashlib
+from datetime import date
+
+from django.core import signing
+from django.db.models import Sum
+
+from . import caching
+from .models import ExpenseRollup
+
+TOKEN_SALT = 'expenses.pagination'
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_token=None, previous_token=None, total=None):
+        self.object_list = items
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+
+def make_token(obj, backwards=False):
+    return signing.dumps([obj.date.isoformat(), obj.pk, int(backwards)], salt=TOKEN_SALT)
+
+
+def read_token(token):
+    try:
+        day, pk, backwards = signing.loads(token, salt=TOKEN_SALT)
+        return date.fromisoformat(day), int(pk), bool(backwards)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidToken(token)
+
+
+def parse_cursor(token):
+    """(date, id, backwards) from a token, or None for the first page / a bad token."""
+    if not token:
+        return None
+    try:
+        return read_token(token)
+    except InvalidToken:
+        return None
+
+
+def window(qs, cursor, per_page):
+    """The sliced queryset holding the page after `cursor` plus one look-ahead row."""
+    if cursor is None:
+        return qs.order_by('-date', '-id')[:per_page + 1]
+    day, pk, backwards = cursor
+    if backwards:
+        # date >= day AND NOT (date = day AND id <= pk), read upwards then flip
+        rows = qs.filter(date__gte=day).exclude(date=day, id__lte=pk).order_by('date', 'id')
+    else:
+        # date <= day AND NOT (date = day AND id >= pk); keeps the index range usable
+        rows = qs.filter(date__lte=day).exclude(date=day, id__gte=pk).order_by('-date', '-id')
+    return rows[:per_page + 1]
+
+
+def build_page(rows, cursor, per_page):
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if cursor is None:
+        return KeysetPage(rows, next_token=make_token(rows[-1]) if more else None)
+
+    if cursor[2]:
+        rows.reverse()
+        next_token = make_token(rows[-1]) if rows else None
+        previous_token = make_token(rows[0], backwards=True) if more else None
+    else:
+        next_token = make_token(rows[-1]) if more else None
+        previous_token = make_token(rows[0], backwards=True) if rows else None
+    return KeysetPage(rows, next_token=next_token, previous_token=previous_token)
+
+
+def paginate(qs, token=None, per_page=20):
+    """
+    Return a KeysetPage of `qs` (which must not be sliced or ordered yet).
+    An invalid token falls back to the first page.
+    """
+    cursor = parse_cursor(token)
+    return build_page(list(window(qs, cursor, per_page)), cursor, per_page)
+
+
+async def apaginate(qs, token=None, per_page=20):
+    """paginate() for async views."""
+    cursor = parse_cursor(token)
+    return build_page([row async for row in window(qs, cursor, per_page)], cursor, per_page)
+
+
+def query_digest(qs):
+    sql, params = qs.query.sql_with_params()
+    return hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+
+
+def approximate_total(user, qs, filtered):
+    """
+    Row count for the header. Unfiltered listings are counted exactly from
+    the rollup table; filtered ones run COUNT(*) once per (user, filter)
+    combination and data version, so a write invalidates the count.
+    """
+    if not filtered:
+        return ExpenseRollup.objects.filter(user=user).aggregate(n=Sum('count'))['n'] or 0
+    return caching.get_or_build(user.pk, 'count', qs.count, query_digest(qs))
+
+
+async def aapproximate_total(user, qs, filtered):
+    """approximate_total() for async views."""
+    if not filtered:
+        return (await ExpenseRollup.objects.filter(user=user).aaggregate(n=Sum('count')))['n'] or 0
+    return await caching.aget_or_build(user.pk, 'count', qs.acount, query_digest(qs))
@@ -0,0 +1,152 @@
+# expenses/perf.py
+"""
+Per-view performance metrics.
+
+PerformanceMiddleware (expenses/middleware.py) fills a RequestMetrics for
+each request: SQL query count and time through a database execute wrapper,
+template render time through TimedDjangoTemplates, and total latency.
+Finished samples go to a bounded in-process store (served to staff at
+/expenses/api/perf/) and, when PERF_LOG_FILE is set, are appended to that
+file as JSON lines for `manage.py perf_report`.
+"""
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+SAMPLES_PER_VIEW = 1000
+SQL_PREVIEW_LENGTH = 500
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.slowest_sql = None
+        self.slowest_sql_time = 0.0
+
+    def record_query(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_sql_time:
+            self.slowest_sql_time = elapsed
+            self.slowest_sql = sql
+
+    def as_sample(self, view, status):
+        return {
+            'view': view,
+            'status': status,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+            'slowest_sql_ms': round(self.slowest_sql_time * 1000, 3),
+            'slowest_sql': (self.slowest_sql or '')[:SQL_PREVIEW_LENGTH],
+        }
+
+
+def query_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper hook that feeds the current RequestMetrics."""
+    metrics = current_metrics.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.record_query(sql, time.perf_counter() - started)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = current_metrics.get()
+            if metrics is not None:
+                metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The standard Django template backend, with render times recorded."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ---------------- Storage and reporting ---------------- #
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarise(samples):
+    """{view: {count, p50/p95/p99 of each timing, max queries, slowest SQL}}"""
+    by_view = defaultdict(list)
+    for sample in samples:
+        by_view[sample['view']].append(sample)
+
+    report = {}
+    for view, rows in sorted(by_view.items()):
+        entry = {'count': len(rows)}
+        for field in ('total_ms', 'db_ms', 'template_ms', 'queries'):
+            values = sorted(r[field] for r in rows)
+            entry[field] = {f'p{p}': percentile(values, p) for p in (50, 95, 99)}
+        entry['max_queries'] = max(r['queries'] for r in rows)
+        slowest = max(rows, key=lambda r: r['slowest_sql_ms'])
+        entry['slowest_sql'] = {'ms': slowest['slowest_sql_ms'], 'sql': slowest['slowest_sql']}
+        report[view] = entry
+    return report
+
+
+class MetricsStore:
+    def __init__(self, maxlen=SAMPLES_PER_VIEW):
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.maxlen))
+
+    def add(self, sample):
+        with self.lock:
+            self.samples[sample['view']].append(sample)
+        path = getattr(settings, 'PERF_LOG_FILE', None)
+        if path:
+            with open(path, 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps(sample) + '\n')
+
+    def all_samples(self):
+        with self.lock:
+            return [sample for rows in self.samples.values() for sample in rows]
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+store = MetricsStore()
+
+
+def read_log(path):
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,23 @@
+# expenses/profiles.py
+"""
+Profile rows for users.
+
+Every user has one Profile (preferred currency, phone, avatar). Users
+saved one at a time get theirs from the User post_save signal. Users
+made with bulk_create() skip signals, so bulk tools such as seeding and
+imports call create_for() afterwards. Readers never depend on the row
+being there: fx.preferred_currency() falls back to the base currency.
+
+Saving a User (every login updates last_login) leaves the profile
+alone, and a Profile save that does not include preferred_currency in
+update_fields skips the currency bookkeeping in signals.py.
+"""
+from .models import Profile
+
+
+def create_for(users, batch_size=1000):
+    """Create the missing profiles of `users` (objects or ids) in bulk; existing ones are left as they are."""
+    Profile.objects.bulk_create(
+        [Profile(user_id=getattr(user, 'pk', user)) for user in users],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
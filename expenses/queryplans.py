@@ -0,0 +1,119 @@
+# expenses/queryplans.py
+"""
+EXPLAIN QUERY PLAN checks for the hot views.
+
+The views are driven through the Django test client, every SQL statement
+they issue is captured, and SQLite's query plan for it is inspected. A
+statement fails the check when it scans a whole table or needs a temporary
+B-tree to sort/group rows. Sorting the handful of rows in the rollup table
+(one per month/category) is expected and allowed, as is reading the whole
+category table into the category cache.
+"""
+import re
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Expense
+from . import pagination
+
+# Tables small enough (per user, or globally) that a temp sort on them is fine.
+# FX rates only appear as (currency, date) index probes inside rollup sums.
+SORT_OK_TABLES = {'expenses_expenserollup', 'expenses_category', 'auth_user', 'expenses_fxrate'}
+# Lookup tables read whole into an in-process cache (expenses/categories.py).
+SCAN_OK_TABLES = {'expenses_category'}
+
+SCAN_RE = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)')
+# Virtual tables (FTS5) report "SCAN t VIRTUAL TABLE INDEX n:<constraints>";
+# with constraints (MATCH, rowid =) that is an index lookup, not a scan.
+VIRTUAL_LOOKUP_RE = re.compile(r'VIRTUAL TABLE INDEX \d+:\S')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE')
+TABLE_RE = re.compile(r'(?:FROM|JOIN|UPDATE) "(\w+)"')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan):
+    problems = []
+    tables = set(TABLE_RE.findall(sql))
+    for line in plan:
+        if SCAN_RE.match(line) and not VIRTUAL_LOOKUP_RE.search(line) and not tables <= SCAN_OK_TABLES:
+            problems.append(f'full scan: {line}')
+        elif TEMP_SORT_RE.search(line) and not tables <= SORT_OK_TABLES:
+            problems.append(f'temp sort: {line}')
+    return problems
+
+
+def view_requests(expense):
+    """(label, method, url, data) for each hot view."""
+    today = date.today()
+    month_start = today.replace(day=1).isoformat()
+    expense_id = expense.id
+    cursor = pagination.make_token(expense)
+    return [
+        ('dashboard', 'get', reverse('dashboard'), {}),
+        ('expense_list', 'get', reverse('expense_list'), {}),
+        ('expense_list page 2', 'get', reverse('expense_list'), {'page': 2}),
+        ('expense_list cursor', 'get', reverse('expense_list'), {'cursor': cursor}),
+        ('expense_list cursor back', 'get', reverse('expense_list'),
+         {'cursor': pagination.make_token(expense, backwards=True)}),
+        ('expense_list_api', 'get', reverse('expense_list_api'), {'cursor': cursor, 'total': 1}),
+        ('expense_list range', 'get', reverse('expense_list'), {'start': month_start, 'end': today.isoformat()}),
+        ('expense_list search', 'get', reverse('expense_list'), {'q': 'lunch'}),
+        ('month_total_api', 'get', reverse('month_total_api'), {}),
+        ('export_csv', 'get', reverse('export_csv'), {}),
+        ('add_expense', 'post', reverse('add_expense'), {
+            'title': 'Plan check', 'amount': '1.00', 'date': today.isoformat(),
+            'category': Category.objects.values_list('id', flat=True).first() or '',
+            'description': '',
+        }),
+        ('edit_expense', 'post', reverse('edit_expense', args=[expense_id]), {
+            'title': 'Plan check', 'amount': '2.00', 'date': today.isoformat(),
+            'category': 'Food', 'description': '',
+        }),
+    ]
+
+
+def check_views(client, user, sample_rows=60):
+    """
+    Drive the hot views as `user` and return {label: [problem, ...]}
+    for every view whose statements have a bad plan. The caller is
+    responsible for rolling back the rows this creates.
+    """
+    if connection.vendor != 'sqlite':
+        raise NotImplementedError('Query plan checks only support SQLite.')
+
+    category = Category.objects.first()
+    today = date.today()
+    Expense.objects.bulk_create(
+        Expense(user=user, category=category, title=f'Lunch {i}', amount=Decimal('5.00'),
+                date=today.replace(day=1 + i % 28))
+        for i in range(sample_rows)
+    )
+    # Somewhere in the middle of the listing, for the cursor requests
+    expense = Expense.objects.filter(user=user).order_by('-date', '-id')[sample_rows // 2]
+    client.force_login(user)
+
+    failures = {}
+    for label, method, url, data in view_requests(expense):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        problems = []
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            for problem in plan_problems(sql, explain(sql)):
+                problems.append(f'{problem}\n    {sql}')
+        if problems:
+            failures[label] = problems
+    return failures
@@ -0,0 +1,222 @@
+# expenses/reports.py
+"""
+Statements for a date range (a year-end one by default) as PDF or XLSX.
+
+A report has a category breakdown, monthly totals, budget adherence and
+the largest expenses, all in the user's preferred currency. Each section
+is one grouped query. Ranges made of whole months, a calendar year for
+instance, are summed from the rollup table; other ranges are grouped from
+the expenses themselves. The XLSX file also lists every expense in the
+range, streamed from the database into the sheet (expenses/writers.py).
+
+Reports are generated as "report" jobs so the file is stored like any
+other job result. A range holding more than REPORT_BACKGROUND_ROWS
+expenses is queued for a worker; smaller ones run during the request.
+The job is cached by (user, range, format) at the user's data version,
+so asking again before anything changes returns the same file.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from . import caching, fx, jobs, writers
+from .models import BudgetCounter, Expense, ExpenseRollup, Job
+
+TOP_EXPENSES = 20
+CHUNK_SIZE = 2000
+
+
+@dataclass
+class Report:
+    username: str
+    start: date
+    end: date
+    currency: str
+    categories: list = field(default_factory=list)  # (name, count, total), largest first
+    months: list = field(default_factory=list)      # (month, count, total)
+    budgets: list = field(default_factory=list)     # (month, category or None, limit, spent)
+    top: list = field(default_factory=list)         # (date, title, category, amount, currency, converted)
+
+    @property
+    def total(self):
+        return sum(total for _, _, total in self.categories)
+
+    @property
+    def count(self):
+        return sum(count for _, count, _ in self.categories)
+
+
+def whole_months(start, end):
+    return start.day == 1 and (end + timedelta(days=1)).day == 1
+
+
+def buckets(user, start, end, currency):
+    """
+    Rows with `month`, `category__name`, `converted` (total in `currency`)
+    and `n` (expense count) covering the range, ready to be grouped.
+    """
+    if whole_months(start, end):
+        return ExpenseRollup.objects.filter(user=user, month__range=(start, end)).annotate(
+            converted=fx.converted(currency, amount='total', month=OuterRef('month')), n=F('count'),
+        )
+    return Expense.objects.filter(user=user, date__range=(start, end)).annotate(
+        month=TruncMonth('date'), converted=fx.converted(currency), n=Value(1),
+    )
+
+
+def build(user, start, end):
+    """Collect every section of the report for `user` between `start` and `end` inclusive."""
+    currency = fx.preferred_currency(user.pk)
+    rows = buckets(user, start, end, currency)
+    report = Report(user.get_username(), start, end, currency)
+    report.categories = [
+        (r['category__name'] or 'Uncategorized', r['count'], r['total'])
+        for r in rows.values('category__name').annotate(total=Sum('converted'), count=Sum('n')).order_by('-total')
+    ]
+    report.months = [
+        (r['month'], r['count'], r['total'])
+        for r in rows.values('month').annotate(total=Sum('converted'), count=Sum('n')).order_by('month')
+    ]
+    report.budgets = list(
+        BudgetCounter.objects.filter(user=user, month__range=(start.replace(day=1), end))
+        .order_by('month', 'category__name').values_list('month', 'category__name', 'limit', 'spent')
+    )
+    report.top = list(
+        Expense.objects.filter(user=user, date__range=(start, end)).annotate(converted=fx.converted(currency))
+        .order_by('-converted', '-date')
+        .values_list('date', 'title', 'category__name', 'amount', 'currency', 'converted')[:TOP_EXPENSES]
+    )
+    return report
+
+
+def expense_rows(user, start, end, currency):
+    """Every expense in the range, oldest first, read in chunks."""
+    rows = Expense.objects.filter(user=user, date__range=(start, end)).order_by('date', 'id').annotate(
+        converted=fx.converted(currency),
+    ).values_list('date', 'category__name', 'title', 'description', 'amount', 'currency', 'converted')
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def used(spent, limit):
+    return f'{spent * 100 / limit:.0f}%' if limit else ''
+
+
+def write_xlsx(report, user, fileobj, progress=None):
+    with writers.XlsxWriter(fileobj) as book:
+        book.add_sheet('Summary', [
+            ('User', report.username),
+            ('From', report.start),
+            ('To', report.end),
+            ('Currency', report.currency),
+            ('Expenses', report.count),
+            ('Total', report.total),
+        ], widths=(14, 24))
+        book.add_sheet('Categories', ((name, count, total) for name, count, total in report.categories),
+                       header=('Category', 'Expenses', f'Total ({report.currency})'), widths=(28, 12, 16))
+        book.add_sheet('Months', ((month, count, total) for month, count, total in report.months),
+                       header=('Month', 'Expenses', f'Total ({report.currency})'), widths=(12, 12, 16))
+        book.add_sheet('Budgets', (
+            (month, category or 'Overall', limit, spent, float(spent / limit) if limit else None)
+            for month, category, limit, spent in report.budgets
+        ), header=('Month', 'Budget', 'Limit', 'Spent', 'Used'), widths=(12, 24, 14, 14, 8))
+        book.add_sheet('Top expenses', (
+            (day, title, category, amount, currency, converted)
+            for day, title, category, amount, currency, converted in report.top
+        ), header=('Date', 'Title', 'Category', 'Amount', 'Currency', f'Amount ({report.currency})'),
+            widths=(12, 32, 20, 14, 10, 16))
+
+        def expenses():
+            for n, row in enumerate(expense_rows(user, report.start, report.end, report.currency), start=1):
+                if progress and n % CHUNK_SIZE == 0:
+                    progress(n, report.count)
+                yield row
+
+        book.add_sheet('Expenses', expenses(), header=(
+            'Date', 'Category', 'Title', 'Description', 'Amount', 'Currency', f'Amount ({report.currency})',
+        ), widths=(12, 20, 32, 32, 14, 10, 16))
+
+
+def write_pdf(report, fileobj):
+    money = '{:,.2f}'.format
+    with writers.PdfWriter(fileobj, title=f'Expense statement {report.start} to {report.end}') as pdf:
+        pdf.heading('Expense statement', size=18)
+        pdf.paragraph(f'{report.username}, {report.start:%d %b %Y} to {report.end:%d %b %Y}')
+        pdf.paragraph(f'{report.count} expenses, {money(report.total)} {report.currency} in total',
+                      color=writers.GREY)
+
+        pdf.heading('By category')
+        pdf.bars([name for name, _, _ in report.categories], [float(t) for _, _, t in report.categories])
+        pdf.table(('Category', 'Expenses', f'Total ({report.currency})', 'Share'), [
+            (name, str(count), money(total), f'{total * 100 / report.total:.1f}%' if report.total else '')
+            for name, count, total in report.categories
+        ], widths=(3, 1, 1.5, 1), align=('left', 'right', 'right', 'right'))
+
+        pdf.heading('By month')
+        overall = {month: limit for month, category, limit, _ in report.budgets if category is None}
+        pdf.columns([f'{month:%b %y}' for month, _, _ in report.months],
+                    [float(t) for _, _, t in report.months],
+                    marks=[float(overall[m]) if m in overall else None for m, _, _ in report.months])
+        pdf.table(('Month', 'Expenses', f'Total ({report.currency})'), [
+            (f'{month:%B %Y}', str(count), money(total)) for month, count, total in report.months
+        ], widths=(3, 1, 1.5), align=('left', 'right', 'right'))
+
+        pdf.heading('Budgets')
+        if report.budgets:
+            pdf.table(('Month', 'Budget', 'Limit', 'Spent', 'Used'), [
+                (f'{month:%b %Y}', category or 'Overall', money(limit), money(spent), used(spent, limit))
+                for month, category, limit, spent in report.budgets
+            ], widths=(1.2, 2.5, 1.3, 1.3, 0.8), align=('left', 'left', 'right', 'right', 'right'))
+        else:
+            pdf.paragraph('No budgets were set for these months.', color=writers.GREY)
+
+        pdf.heading(f'Largest {TOP_EXPENSES} expenses')
+        pdf.table(('Date', 'Title', 'Category', 'Amount', f'Amount ({report.currency})'), [
+            (day.isoformat(), title, category or '', f'{money(amount)} {currency}', money(converted))
+            for day, title, category, amount, currency, converted in report.top
+        ], widths=(1.1, 3, 1.6, 1.5, 1.5), align=('left', 'left', 'left', 'right', 'right'))
+
+
+def generate(user, start, end, fmt, fileobj, progress=None):
+    """Write the report in `fmt` ('pdf' or 'xlsx') to `fileobj`. Returns the Report."""
+    report = build(user, start, end)
+    if fmt == 'xlsx':
+        write_xlsx(report, user, fileobj, progress)
+    else:
+        write_pdf(report, fileobj)
+    return report
+
+
+def filename(start, end, fmt):
+    return f'expenses-{start}-to-{end}.{fmt}'
+
+
+def estimated_rows(user, start, end):
+    """Expenses in the months the range touches, counted from the rollups (an upper bound)."""
+    rollups = ExpenseRollup.objects.filter(user=user, month__range=(start.replace(day=1), end))
+    return rollups.aggregate(n=Sum('count'))['n'] or 0
+
+
+def request(user, start, end, fmt):
+    """
+    The job holding this report at the user's current data version: the
+    cached one while it is still usable, else a new one, queued when the
+    range is large and run right away otherwise.
+    """
+    cache = caching.get_cache()
+    key = caching.entry_key(user.pk, 'report', start, end, fmt)
+    job_id = cache.get(key)
+    job = Job.objects.filter(pk=job_id, user=user).exclude(status=Job.FAILED).first() if job_id else None
+    if job is not None and (job.status != Job.DONE or job.result_file):
+        return job
+
+    params = {'start': start.isoformat(), 'end': end.isoformat(), 'format': fmt}
+    if estimated_rows(user, start, end) > getattr(settings, 'REPORT_BACKGROUND_ROWS', 20000):
+        job = jobs.enqueue('report', user, params)
+    else:
+        job = jobs.run_now('report', user, params)
+    if job.status != Job.FAILED:
+        cache.set(key, job.id, caching.ENTRY_TIMEOUT)
+    return job
@@ -0,0 +1,136 @@
+# expenses/rollups.py
+"""
+Helpers for the ExpenseRollup table.
+
+Every Expense contributes its amount (and a count of one) to the bucket
+(user, first day of its month, category, currency). Saves and deletes turn
+into small deltas against those buckets, so the dashboard never has to
+aggregate the raw Expense table; it converts the few bucket totals to the
+user's currency instead (fx.converted()).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Expense, ExpenseRollup
+
+TRACKED_FIELDS = ('user_id', 'category_id', 'amount', 'currency', 'date')
+
+
+def state_of(expense):
+    """
+    Return the rollup-relevant values of an Expense instance, normalised
+    (None for a deleted one, which no longer counts).
+    Views such as edit_expense assign raw POST strings to amount/date,
+    so run them through the model fields before using them.
+    """
+    if expense.deleted_at is not None:
+        return None
+    amount = Expense._meta.get_field('amount').to_python(expense.amount)
+    day = Expense._meta.get_field('date').to_python(expense.date)
+    return {
+        'user_id': expense.user_id,
+        'category_id': expense.category_id,
+        'amount': amount,
+        'currency': expense.currency,
+        'date': day,
+    }
+
+
+def stored_state(values):
+    """
+    The rollup-relevant part of an expense's stored values
+    (journal.stored_values()); None if it is new or deleted.
+    """
+    if values is None or values['deleted_at'] is not None:
+        return None
+    return {name: values[name] for name in TRACKED_FIELDS}
+
+
+def bucket_of(state):
+    return (state['user_id'], state['date'].replace(day=1), state['category_id'], state['currency'])
+
+
+def deltas(old, new):
+    """
+    Compute {(user_id, month, category_id, currency): (amount, count)} changes
+    needed to go from `old` to `new`. Either side may be None.
+    """
+    changes = defaultdict(lambda: [Decimal('0'), 0])
+    if old is not None:
+        change = changes[bucket_of(old)]
+        change[0] -= old['amount']
+        change[1] -= 1
+    if new is not None:
+        change = changes[bucket_of(new)]
+        change[0] += new['amount']
+        change[1] += 1
+    return {
+        key: (amount, count)
+        for key, (amount, count) in changes.items()
+        if amount or count
+    }
+
+
+def deltas_for_rows(states):
+    """Sum the deltas of many newly created expenses (bulk paths)."""
+    changes = defaultdict(lambda: [Decimal('0'), 0])
+    for state in states:
+        change = changes[bucket_of(state)]
+        change[0] += state['amount']
+        change[1] += 1
+    return {key: tuple(value) for key, value in changes.items()}
+
+
+def apply_deltas(changes):
+    """Apply deltas from deltas()/deltas_for_rows() with F-expressions."""
+    for (user_id, month, category_id, currency), (amount, count) in changes.items():
+        key = dict(user_id=user_id, month=month, category_id=category_id, currency=currency)
+        bucket = ExpenseRollup.objects.filter(**key)
+        updated = bucket.update(total=F('total') + amount, count=F('count') + count)
+        if not updated and count > 0:
+            # First expense in this bucket. get_or_create copes with a
+            # concurrent insert; the update then adds our share.
+            ExpenseRollup.objects.get_or_create(**key)
+            bucket.update(total=F('total') + amount, count=F('count') + count)
+        if count < 0:
+            bucket.filter(count__lte=0).delete()
+
+
+def rebuild(user_ids=None):
+    """
+    Recompute rollups from the Expense table. Restricted to `user_ids`
+    when given, otherwise every user is rebuilt. Returns rows written.
+    """
+    expenses = Expense.objects.all()
+    rollups = ExpenseRollup.objects.all()
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    grouped = (
+        expenses.annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        objs = ExpenseRollup.objects.bulk_create(
+            (
+                ExpenseRollup(
+                    user_id=row['user_id'],
+                    month=row['month'],
+                    category_id=row['category_id'],
+                    currency=row['currency'],
+                    total=row['total'],
+                    count=row['count'],
+                )
+                for row in grouped.iterator(chunk_size=2000)
+            ),
+            batch_size=1000,
+        )
+    return len(objs)
@@ -0,0 +1,216 @@
+# expenses/search.py
+"""
+Expense search.
+
+Searches title, description and category name. The backend is chosen per
+database: an FTS5 virtual table on SQLite, tsvector matching on Postgres,
+and plain icontains filters anywhere else. Override the choice with the
+EXPENSES_SEARCH_BACKEND setting (a dotted path to a backend class).
+
+The SQLite index is kept in sync by the handlers in expenses/signals.py
+and can be rebuilt with `manage.py rebuild_search_index`.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from . import categories
+from .models import Expense
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+FTS_TABLE = 'expenses_expense_fts'
+INDEX_BATCH_SIZE = 2000
+
+
+def tokens(query):
+    return TOKEN_RE.findall(query or '')
+
+
+class BasicSearchBackend:
+    """icontains over the three fields; no index to maintain."""
+
+    def filter(self, qs, user, query):
+        for token in tokens(query):
+            qs = qs.filter(
+                Q(title__icontains=token) | Q(description__icontains=token) | Q(category__name__icontains=token)
+            )
+        return qs
+
+    def search(self, user, query, limit=20):
+        qs = self.filter(Expense.objects.filter(user=user), user, query)
+        return list(qs.order_by('-date', '-id').values_list('id', flat=True)[:limit])
+
+    def index(self, expenses):
+        pass
+
+    def remove(self, expense_ids):
+        pass
+
+    def rename_category(self, category):
+        pass
+
+    def clear_category(self, category):
+        pass
+
+    def rebuild(self, user_ids=None):
+        return 0
+
+
+class SQLiteFTSBackend(BasicSearchBackend):
+    """
+    FTS5 table keyed by expense id (rowid) with an unindexed user_id column.
+    Every query token is matched as a prefix; results rank by bm25.
+    """
+
+    @staticmethod
+    def match_expression(query):
+        return ' '.join(f'"{token}"*' for token in tokens(query))
+
+    def filter(self, qs, user, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return qs
+        return qs.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND user_id = %s',
+            (expression, user.pk),
+        ))
+
+    def search(self, user, query, limit=20):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND user_id = %s '
+                f'ORDER BY rank LIMIT %s',
+                [expression, user.pk, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _insert(cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, category, user_id) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def index(self, expenses):
+        expenses = list(expenses)
+        if not expenses:
+            return
+        names = categories.names()
+        rows = [
+            (e.pk, e.title, e.description or '', names.get(e.category_id, ''), e.user_id)
+            for e in expenses
+        ]
+        self.remove([row[0] for row in rows])
+        with connection.cursor() as cursor:
+            self._insert(cursor, rows)
+
+    def remove(self, expense_ids):
+        expense_ids = list(expense_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(expense_ids), INDEX_BATCH_SIZE):
+                chunk = expense_ids[start:start + INDEX_BATCH_SIZE]
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(chunk))})', chunk
+                )
+
+    def _set_category(self, category_id, name):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET category = %s WHERE rowid IN '
+                f'(SELECT id FROM {Expense._meta.db_table} WHERE category_id = %s)',
+                [name, category_id],
+            )
+
+    def rename_category(self, category):
+        self._set_category(category.pk, category.name)
+
+    def clear_category(self, category):
+        self._set_category(category.pk, '')
+
+    def rebuild(self, user_ids=None):
+        with transaction.atomic():
+            return self._rebuild(user_ids)
+
+    def _rebuild(self, user_ids):
+        with connection.cursor() as cursor:
+            if user_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            else:
+                for user_id in user_ids:
+                    cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE user_id = %s', [user_id])
+        qs = Expense.objects.all()
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=user_ids)
+        rows = qs.values_list('id', 'title', 'description', 'category__name', 'user_id')
+        count = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for pk, title, description, category, user_id in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+                batch.append((pk, title, description or '', category or '', user_id))
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._insert(cursor, batch)
+                count += len(batch)
+        return count
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """
+    tsvector matching computed in the query. For large tables add a GIN
+    index on the same to_tsvector(...) expression in a migration.
+    """
+
+    def _query(self, query):
+        from django.contrib.postgres.search import SearchQuery
+        terms = ' & '.join(f'{token}:*' for token in tokens(query))
+        return SearchQuery(terms, search_type='raw') if terms else None
+
+    def _vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return (
+            SearchVector('title', weight='A')
+            + SearchVector('category__name', weight='B')
+            + SearchVector('description', weight='C')
+        )
+
+    def filter(self, qs, user, query):
+        search_query = self._query(query)
+        if search_query is None:
+            return qs
+        return qs.annotate(search=self._vector()).filter(search=search_query)
+
+    def search(self, user, query, limit=20):
+        from django.contrib.postgres.search import SearchRank
+        search_query = self._query(query)
+        if search_query is None:
+            return []
+        qs = (
+            Expense.objects.filter(user=user)
+            .annotate(rank=SearchRank(self._vector(), search_query))
+            .filter(rank__gt=0)
+            .order_by('-rank', '-date')
+        )
+        return list(qs.values_list('id', flat=True)[:limit])
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = getattr(settings, 'EXPENSES_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return BasicSearchBackend()
@@ -1,22 +1,165 @@
 # expenses/signals.py 8 nov 2025 new one
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.dispatch import receiver, Signal
 from django.contrib.auth import get_user_model
-from .models import Profile
+from .models import Profile, Expense, Category, ExpenseRollup, Budget
+from . import budgets, caching, categories, journal, profiles, rollups, search
 
 User = get_user_model()
 
+# Sent with expenses=[...] after Expense.objects.bulk_create(), which
+# bypasses post_save. Bulk writers (importers, seeders) must send it.
+expenses_bulk_created = Signal()
+
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     """
     Automatically create a Profile instance whenever a new User is created.
+    Later User saves (last_login on every login) leave the profile alone;
+    bulk-created users get theirs from profiles.create_for().
     """
     if created:
-        Profile.objects.create(user=instance)
+        profiles.create_for([instance])
 
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
+
+# ---------------- Expense rollups ---------------- #
+@receiver(pre_save, sender=Expense)
+def remember_expense_state(sender, instance, **kwargs):
+    """
+    Keep the stored values of an edited expense so post_save can move
+    its amount out of the old (month, category) bucket and journal the
+    change.
+    """
+    instance._previous_values = journal.stored_values(instance)
+    instance._previous_state = rollups.stored_state(instance._previous_values)
+
+@receiver(post_save, sender=Expense)
+def update_rollups_on_save(sender, instance, **kwargs):
+    old = getattr(instance, '_previous_state', None)
+    rollups.apply_deltas(rollups.deltas(old, rollups.state_of(instance)))
+
+@receiver(expenses_bulk_created, sender=Expense)
+def update_rollups_on_bulk_create(sender, expenses, **kwargs):
+    rollups.apply_deltas(rollups.deltas_for_rows(rollups.state_of(e) for e in expenses))
+
+@receiver(post_delete, sender=Expense)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    rollups.apply_deltas(rollups.deltas(rollups.state_of(instance), None))
+
+@receiver(pre_delete, sender=Category)
+def remember_category_users(sender, instance, **kwargs):
     """
-    Save the profile every time the user object is saved.
+    Deleting a category sets its expenses' category to NULL in SQL,
+    without Expense signals. Note who is affected so their rollups
+    can be rebuilt afterwards.
     """
-    instance.profile.save()
+    instance._rollup_users = list(
+        set(ExpenseRollup.objects.filter(category=instance).values_list('user_id', flat=True))
+        | set(Budget.objects.filter(category=instance).values_list('user_id', flat=True))
+    )
+
+@receiver(post_delete, sender=Category)
+def rebuild_rollups_for_category(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_rollup_users', None)
+    if user_ids:
+        rollups.rebuild(user_ids)
+        # Their category budgets became overall ones (SET_NULL)
+        budgets.rebuild(user_ids)
+
+
+# ---------------- Budget counters ---------------- #
+@receiver(post_save, sender=Expense)
+def update_budget_counters_on_save(sender, instance, **kwargs):
+    old = getattr(instance, '_previous_state', None)
+    budgets.apply_deltas(rollups.deltas(old, rollups.state_of(instance)))
+
+@receiver(expenses_bulk_created, sender=Expense)
+def update_budget_counters_on_bulk_create(sender, expenses, **kwargs):
+    budgets.apply_deltas(rollups.deltas_for_rows(rollups.state_of(e) for e in expenses))
+
+@receiver(post_delete, sender=Expense)
+def update_budget_counters_on_delete(sender, instance, **kwargs):
+    budgets.apply_deltas(rollups.deltas(rollups.state_of(instance), None))
+
+@receiver(post_save, sender=Budget)
+def sync_budget_counter(sender, instance, **kwargs):
+    budgets.sync(instance)
+
+@receiver(pre_save, sender=Profile)
+def remember_preferred_currency(sender, instance, update_fields=None, **kwargs):
+    skip = instance._state.adding or (update_fields is not None and 'preferred_currency' not in update_fields)
+    instance._previous_currency = (
+        None if skip
+        else Profile.objects.filter(pk=instance.pk).values_list('preferred_currency', flat=True).first()
+    )
+
+@receiver(post_save, sender=Profile)
+def reconvert_budget_counters(sender, instance, created, **kwargs):
+    """Counters are kept in the preferred currency; recompute them when it changes."""
+    previous = getattr(instance, '_previous_currency', None)
+    if not created and previous is not None and previous != instance.preferred_currency:
+        budgets.rebuild([instance.user_id])
+        caching.bump_user_version(instance.user_id)
+
+
+# ---------------- Search index ---------------- #
+@receiver(post_save, sender=Expense)
+def index_expense(sender, instance, **kwargs):
+    if instance.deleted_at is not None:
+        search.get_backend().remove([instance.pk])
+    else:
+        search.get_backend().index([instance])
+
+@receiver(expenses_bulk_created, sender=Expense)
+def index_bulk_expenses(sender, expenses, **kwargs):
+    search.get_backend().index(expenses)
+
+@receiver(post_delete, sender=Expense)
+def unindex_expense(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+@receiver(post_save, sender=Category)
+def reindex_category_name(sender, instance, created, **kwargs):
+    if not created:
+        search.get_backend().rename_category(instance)
+
+@receiver(pre_delete, sender=Category)
+def clear_category_name(sender, instance, **kwargs):
+    search.get_backend().clear_category(instance)
+
+
+# ---------------- Change journal ---------------- #
+@receiver(post_save, sender=Expense)
+def journal_expense_save(sender, instance, **kwargs):
+    journal.record(instance, getattr(instance, '_previous_values', None), journal.snapshot(instance))
+
+@receiver(expenses_bulk_created, sender=Expense)
+def journal_bulk_expenses(sender, expenses, **kwargs):
+    journal.record_created(expenses)
+
+@receiver(post_delete, sender=Expense)
+def journal_expense_purge(sender, instance, **kwargs):
+    journal.record(instance, journal.snapshot(instance), None)
+
+
+# ---------------- Cache invalidation ---------------- #
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def bump_data_version(sender, instance, signal, **kwargs):
+    # Purging an expense that was already deleted changes nothing visible
+    if signal is post_delete and getattr(instance, 'deleted_at', None) is not None:
+        return
+    caching.bump_user_version(instance.user_id)
+
+@receiver(expenses_bulk_created, sender=Expense)
+def bump_data_version_bulk(sender, expenses, **kwargs):
+    for user_id in {e.user_id for e in expenses}:
+        caching.bump_user_version(user_id)
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_global_data_version(sender, **kwargs):
+    caching.bump_global_version()
+    categories.changed()
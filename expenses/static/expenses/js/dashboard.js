@@ -0,0 +1,57 @@
+/* static/expenses/js/dashboard.js – dashboard charts.
+   The data comes from data-* attributes on each canvas (JSON, HTML-escaped
+   by the template), so this file is static and cached by the browser. */
+(function () {
+  function json(el, key) {
+    return JSON.parse(el.dataset[key] || '[]');
+  }
+
+  const spending = document.getElementById('spendingChart');
+  if (spending) {
+    new Chart(spending, {
+      type: 'bar',
+      data: {
+        labels: json(spending, 'labels'),
+        datasets: [{
+          label: spending.dataset.label,
+          data: json(spending, 'values'),
+          tension: 0.4,
+          borderWidth: 3
+        }]
+      },
+      options: {
+        responsive: true,
+        plugins: { legend: { display: false } }
+      }
+    });
+  }
+
+  const weeklyChart = document.getElementById('weeklyChart');
+  if (weeklyChart) {
+    const weekly = json(weeklyChart, 'points');
+    new Chart(weeklyChart, {
+      type: 'line',
+      data: {
+        labels: weekly.map(w => w.period),
+        datasets: [
+          { label: weeklyChart.dataset.label, data: weekly.map(w => w.total), tension: 0.3 },
+          { label: '4-week Average', data: weekly.map(w => w.avg), borderDash: [6, 4], pointRadius: 0 }
+        ]
+      },
+      options: { responsive: true }
+    });
+  }
+
+  const category = document.getElementById('categoryChart');
+  if (category) {
+    new Chart(category, {
+      type: 'doughnut',
+      data: {
+        labels: json(category, 'labels'),
+        datasets: [{
+          data: json(category, 'values')
+        }]
+      }
+    });
+  }
+})();
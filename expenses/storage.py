@@ -0,0 +1,55 @@
+# expenses/storage.py
+"""
+Static files storage for production: content-hashed names plus gzip and
+Brotli copies written at collectstatic time.
+
+Hashed names (style.3f2a9c.css) change whenever the content does, so
+StaticFilesMiddleware can send them with a one-year immutable
+Cache-Control. Text files are compressed once here instead of on every
+request; the middleware picks the .br or .gz copy the browser accepts.
+Brotli is optional: without the `brotli` package only .gz files are made.
+"""
+import gzip
+from importlib.util import find_spec
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.ico')
+MIN_SIZE = 256          # bytes; smaller files gain nothing from compression
+MIN_SAVING = 0.95       # keep a compressed copy only if it is at most 95% of the original
+
+
+def encoders():
+    """[(suffix, compress(bytes) -> bytes)], best first."""
+    found = []
+    if find_spec('brotli') is not None:
+        import brotli
+        found.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    # mtime=0 keeps the output identical between runs
+    found.append(('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+    return found
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        compressors = encoders()
+        # Both the hashed copies and the originals (still reachable by name)
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name, compressors)
+
+    def compress(self, name, compressors):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_SIZE:
+            return
+        for suffix, compress in compressors:
+            packed = compress(data)
+            if len(packed) <= len(data) * MIN_SAVING:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(packed))
@@ -0,0 +1,89 @@
+# expenses/tasks.py
+"""
+Background job handlers, run by `manage.py run_workers` (see jobs.py).
+Imported from ExpensesConfig.ready() so every process knows the kinds.
+"""
+import tempfile
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+
+from . import budgets, importers, reports, rollups
+from .export import apply_list_filters, export_rows
+from .jobs import handler, report
+from .models import Expense
+
+PROGRESS_EVERY = 5000  # rows between progress reports on exports
+REBUILD_CHUNK = 500    # users rebuilt per transaction (and heartbeat)
+
+
+@handler('export_csv')
+def export_csv(job):
+    """CSV of the user's expenses, filtered like the list page (params: q, start, end)."""
+    qs = Expense.objects.filter(user=job.user).order_by('-date')
+    qs = apply_list_filters(qs, job.params, job.user)
+    total = qs.count()
+    with tempfile.TemporaryFile() as fh:
+        # Line 0 is the header, so n counts data rows
+        for n, line in enumerate(export_rows(qs)):
+            fh.write(line.encode('utf-8'))
+            if n and n % PROGRESS_EVERY == 0:
+                report(job, n * 100 / total, f'{n} of {total} rows written')
+        fh.seek(0)
+        job.result_file.save(f'expenses-{job.pk}.csv', File(fh), save=False)
+    job.result = {'rows': total, 'filename': 'expenses.csv'}
+
+
+@handler('import_expenses')
+def import_expenses(job):
+    """Import the uploaded statement in job.input_file (params: format)."""
+    size = job.input_file.size or 1
+    with job.input_file.open('rb') as fh:
+        def progress(result):
+            report(job, fh.tell() * 100 / size, f'{result.created} expenses imported')
+        result = importers.import_file(job.user, fh, job.params.get('format', 'csv'), progress=progress)
+    job.message = f'{result.created} expenses imported'
+    job.result = {
+        'created': result.created,
+        'skipped': result.skipped,
+        'error_count': result.error_count,
+        'errors': result.errors,
+    }
+
+
+@handler('rebuild_rollups')
+def rebuild_rollups(job):
+    """
+    Rebuild rollups and budget counters (params: user_ids, or everyone),
+    a chunk of users at a time so the heartbeat keeps up on big tables.
+    """
+    user_ids = job.params.get('user_ids')
+    if user_ids is None:
+        user_ids = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+    written = counters = 0
+    for start in range(0, len(user_ids), REBUILD_CHUNK):
+        chunk = user_ids[start:start + REBUILD_CHUNK]
+        written += rollups.rebuild(chunk)
+        counters += budgets.rebuild(chunk)
+        done = start + len(chunk)
+        report(job, done * 100 / len(user_ids), f'{done} of {len(user_ids)} users rebuilt')
+    job.result = {'rollups': written, 'budget_counters': counters}
+
+
+@handler('report')
+def report_file(job):
+    """PDF or XLSX statement for a date range (params: start, end, format)."""
+    start, end = date.fromisoformat(job.params['start']), date.fromisoformat(job.params['end'])
+    fmt = job.params.get('format', 'pdf')
+
+    def progress(n, total):
+        report(job, n * 100 / max(total, 1), f'{n} of {total} expenses written')
+
+    with tempfile.TemporaryFile() as fh:
+        built = reports.generate(job.user, start, end, fmt, fh, progress)
+        fh.seek(0)
+        job.result_file.save(f'report-{job.pk}.{fmt}', File(fh), save=False)
+    job.message = f'{built.count} expenses'
+    job.result = {'expenses': built.count, 'total': float(built.total), 'currency': built.currency,
+                  'filename': reports.filename(start, end, fmt)}
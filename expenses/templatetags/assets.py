@@ -0,0 +1,11 @@
+from django import template
+
+from expenses import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_url(path):
+    """{% vendor_url 'chart.js/chart.umd.js' %}: see expenses/assets.py."""
+    return assets.url(path)
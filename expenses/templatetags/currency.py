@@ -0,0 +1,11 @@
+from django import template
+
+from expenses import fx
+
+register = template.Library()
+
+
+@register.filter
+def currency_symbol(code):
+    """'INR' -> '₹'; codes without a known symbol are shown as-is."""
+    return fx.symbol(code)
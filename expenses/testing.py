@@ -0,0 +1,21 @@
+# expenses/testing.py
+"""Test helpers shared by the expenses test suite."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    assertQueryBudget() fails when a request issues more SQL than allowed,
+    so N+1 regressions show up in CI with the offending queries listed.
+    """
+
+    def assertQueryBudget(self, max_queries, url, method='get', data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data or {})
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        if len(ctx.captured_queries) > max_queries:
+            queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+            self.fail(f'{url} ran {len(ctx.captured_queries)} queries, budget is {max_queries}:\n{queries}')
+        return response
@@ -1,2 +1,1068 @@
-from django.test import TestCase
-# You can add unit tests here later
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .models import (Budget, BudgetCounter, Category, Expense, ExpenseEvent, ExpenseRollup, Job, Profile,
+                     RecurringExpense)
+from . import analytics, assets, benchmarks, budgets, caching, categories, database, fx, importers, jobs, journal, pagination, perf, profiles, queryplans, recurring, reports, rollups, search, tasks, views
+from .middleware import StaticFilesMiddleware
+from .signals import expenses_bulk_created
+from .testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw-12345!')
+        self.food = Category.objects.get(name='Food')
+        self.bills = Category.objects.get(name='Bills')
+
+    def totals(self):
+        return {
+            (r.month, r.category_id): (r.total, r.count)
+            for r in ExpenseRollup.objects.filter(user=self.user)
+        }
+
+    def test_save_edit_and_delete_keep_rollups_in_step(self):
+        exp = Expense.objects.create(user=self.user, category=self.food, title='Lunch',
+                                     amount=Decimal('12.50'), date=date(2025, 1, 10))
+        Expense.objects.create(user=self.user, category=self.food, title='Dinner',
+                               amount=Decimal('7.50'), date=date(2025, 1, 20))
+        self.assertEqual(self.totals(), {(date(2025, 1, 1), self.food.id): (Decimal('20.00'), 2)})
+
+        # Move one expense to another month and category, the way edit_expense does
+        exp.amount = '30'
+        exp.date = '2025-02-03'
+        exp.category = self.bills
+        exp.save()
+        self.assertEqual(self.totals(), {
+            (date(2025, 1, 1), self.food.id): (Decimal('7.50'), 1),
+            (date(2025, 2, 1), self.bills.id): (Decimal('30.00'), 1),
+        })
+
+        exp.delete()
+        self.assertEqual(self.totals(), {(date(2025, 1, 1), self.food.id): (Decimal('7.50'), 1)})
+
+        before = self.totals()
+        rollups.rebuild([self.user.id])
+        self.assertEqual(self.totals(), before)
+
+    def test_dashboard_reads_rollups(self):
+        Expense.objects.create(user=self.user, category=self.food, title='Lunch',
+                               amount=Decimal('12.50'), date=date.today())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['overall_total'], 12.5)
+        self.assertEqual(response.context['this_month_total'], 12.5)
+        self.assertEqual(response.context['total_categories'], 1)
+
+
+class BudgetCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bella', password='pw-12345!')
+        self.food = Category.objects.get(name='Food')
+        self.bills = Category.objects.get(name='Bills')
+        self.jan, self.feb = date(2025, 1, 1), date(2025, 2, 1)
+        self.overall = Budget.objects.create(user=self.user, month=self.jan, amount=Decimal('100'))
+        self.food_jan = Budget.objects.create(user=self.user, month=self.jan, category=self.food, amount=Decimal('50'))
+        self.bills_feb = Budget.objects.create(user=self.user, month=self.feb, category=self.bills, amount=Decimal('80'))
+
+    def spent(self):
+        return {c.budget_id: c.spent for c in BudgetCounter.objects.filter(user=self.user)}
+
+    def test_counters_follow_creates_edits_and_deletes(self):
+        exp = Expense.objects.create(user=self.user, category=self.food, title='Lunch',
+                                     amount=Decimal('40'), date=date(2025, 1, 10))
+        # A later month never counts towards January
+        Expense.objects.create(user=self.user, category=self.food, title='Later',
+                               amount=Decimal('500'), date=date(2025, 3, 1))
+        self.assertEqual(self.spent(), {self.overall.id: 40, self.food_jan.id: 40, self.bills_feb.id: 0})
+
+        exp.category, exp.date = self.bills, '2025-02-03'
+        exp.save()
+        self.assertEqual(self.spent(), {self.overall.id: 0, self.food_jan.id: 0, self.bills_feb.id: 40})
+
+        exp.delete()
+        self.assertEqual(self.spent(), {self.overall.id: 0, self.food_jan.id: 0, self.bills_feb.id: 0})
+
+        # Bulk writers send the signal; a fresh rebuild agrees with the running totals
+        bulk = Expense.objects.bulk_create([
+            Expense(user=self.user, category=self.food, title='Bulk', amount=Decimal('45'), date=date(2025, 1, 5)),
+        ])
+        expenses_bulk_created.send(sender=Expense, expenses=bulk)
+        before = self.spent()
+        budgets.rebuild([self.user.id])
+        self.assertEqual(self.spent(), before)
+        self.assertEqual(before[self.food_jan.id], 45)
+
+        statuses = budgets.check(self.user, date(2025, 1, 20), self.food.id)
+        self.assertEqual(sorted(s.level or 0 for s in statuses), [0, 80])
+        self.assertEqual([s.category for s in budgets.alerts(statuses, Decimal('45'))], ['Food'])
+
+    def test_add_expense_warns_at_thresholds(self):
+        self.client.force_login(self.user)
+        data = {'title': 'Groceries', 'amount': '30', 'date': '2025-01-12', 'category': self.food.id}
+        response = self.client.post(reverse('add_expense'), data, follow=True)
+        self.assertEqual([str(m) for m in response.context['messages']][:-1], [])
+
+        data['amount'] = '12'
+        response = self.client.post(reverse('add_expense'), data, follow=True)
+        self.assertIn('⚠️ You have used 80% of your Food budget for Jan 2025.',
+                      [str(m) for m in response.context['messages']])
+
+        data['amount'] = '70'
+        response = self.client.post(reverse('add_expense'), data, follow=True)
+        warnings = [str(m) for m in response.context['messages']]
+        self.assertIn('⚠️ You have exceeded your Food budget for Jan 2025!', warnings)
+        self.assertIn('⚠️ You have exceeded your monthly budget for Jan 2025!', warnings)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN checks are SQLite specific')
+class QueryPlanTests(TestCase):
+    def test_hot_views_use_indexes(self):
+        user = User.objects.create_user('planner', password='pw-12345!')
+        failures = queryplans.check_views(self.client, user)
+        self.assertEqual(failures, {}, '\n'.join(
+            f'{label}: {problem}' for label, problems in failures.items() for problem in problems
+        ))
+
+
+class ExportCsvTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bob', password='pw-12345!')
+        food = Category.objects.get(name='Food')
+        Expense.objects.create(user=self.user, category=food, title='Lunch', amount=Decimal('10'), date=date(2025, 3, 1))
+        Expense.objects.create(user=self.user, category=None, title='Taxi', amount=Decimal('4'), date=date(2025, 4, 1))
+        self.client.force_login(self.user)
+
+    def test_streams_filtered_rows_with_one_data_query(self):
+        response = self.client.get(reverse('export_csv'), {'start': '2025-03-15'})
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines(), [
+            'Date,Category,Title,Description,Amount,Currency,Converted Amount',
+            '2025-04-01,,Taxi,,4.0,INR,4.0',
+        ])
+
+
+class CurrencyTests(TestCase):
+    RATES = b"date,currency,rate\n2025-01-01,USD,83\n2025-02-01,USD,84\n2025-01-01,EUR,90\n"
+
+    def setUp(self):
+        self.addCleanup(fx.clear_cache)
+        fx.load_rates(io.BytesIO(self.RATES))
+        self.user = User.objects.create_user('xavi', password='pw-12345!')
+        self.budget = Budget.objects.create(user=self.user, month=date(2025, 1, 1), amount=Decimal('1000'))
+        for title, amount, currency, day in [('Coffee', '10', 'USD', date(2025, 1, 15)),
+                                             ('Lunch', '100', 'INR', date(2025, 1, 20)),
+                                             ('Taxi', '5', 'USD', date(2025, 2, 3))]:
+            Expense.objects.create(user=self.user, title=title, amount=Decimal(amount), currency=currency, date=day)
+
+    def test_rates_and_cache(self):
+        self.assertEqual(fx.currencies(), ['EUR', 'INR', 'USD'])
+        self.assertEqual(fx.convert(Decimal('10'), 'USD', 'EUR', date(2025, 1, 9)), Decimal('9.22'))
+        # Before the first rate the earliest one applies; unknown currencies count at par
+        self.assertEqual(fx.rate('USD', date(2024, 6, 1)), 83)
+        self.assertEqual(fx.rate('XYZ', date(2025, 1, 1)), 1)
+        with self.assertRaisesMessage(ValueError, 'Line 2'):
+            fx.parse_rates(io.BytesIO(b'date,currency,rate\nyesterday,USD,83\n'))
+
+        cache = fx.RateCache(max_months=2, max_age=60)
+        for month in (date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)):
+            cache.get('USD', month)
+        self.assertEqual(list(cache.months), [date(2025, 2, 1), date(2025, 3, 1)])
+
+    def test_totals_are_converted_in_the_database(self):
+        self.assertEqual(BudgetCounter.objects.get(budget=self.budget).spent, Decimal('930'))
+        self.assertEqual(budgets.spent_for(self.user.id, date(2025, 1, 1)), Decimal('930'))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'), {'months': 24})
+        self.assertEqual(response.context['overall_total'], 1350)
+        body = b''.join(self.client.get(reverse('export_csv')).streaming_content).decode()
+        self.assertIn('2025-02-03,,Taxi,,5.0,USD,420.0', body.splitlines())
+
+        # Switching the preferred currency re-expresses the counters
+        profile = self.user.profile
+        profile.preferred_currency = 'USD'
+        profile.save()
+        self.assertEqual(BudgetCounter.objects.get(budget=self.budget).spent, Decimal('11.20'))
+        response = self.client.get(reverse('dashboard'), {'months': 24})
+        self.assertEqual((response.context['currency_symbol'], round(response.context['overall_total'], 2)),
+                         ('$', 16.2))
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('carol', password='pw-12345!')
+
+    def test_csv_import_reports_bad_rows_and_updates_rollups(self):
+        data = (
+            'Date,Category,Title,Description,Amount\n'
+            '2025-05-01,Food,Lunch,,12.50\n'
+            'not-a-date,Food,Dinner,,3\n'
+            '2025-05-02,Gadgets,Cable,usb-c,7.5\n'
+            'bad-date,Toys,Kite,,4\n'
+            '2025-05-03,Refunds,Return,,-9.99\n'
+        ).encode()
+        result = importers.import_file(self.user, io.BytesIO(data), 'csv', batch_size=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.errors, [
+            (3, "Unrecognised date 'not-a-date'"),
+            (5, "Unrecognised date 'bad-date'"),
+            (6, "Negative amount '-9.99' (a credit or refund?) was not imported"),
+        ])
+        self.assertTrue(Category.objects.filter(name='Gadgets').exists())
+        # Rejected rows do not leave categories behind
+        self.assertFalse(Category.objects.filter(name__in=['Toys', 'Refunds']).exists())
+        self.assertEqual(
+            ExpenseRollup.objects.filter(user=self.user).aggregate(total=Sum('total'))['total'],
+            Decimal('20.00'),
+        )
+
+    def test_non_finite_amounts_are_reported_and_the_rest_imported(self):
+        data = (
+            'Date,Title,Amount\n'
+            '2025-05-01,Lunch,nan\n'
+            '2025-05-02,Dinner,inf\n'
+            '2025-05-03,Coffee,3.20\n'
+        ).encode()
+        result = importers.import_file(self.user, io.BytesIO(data), 'csv')
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(2, "Invalid amount 'nan'"), (3, "Invalid amount 'inf'")])
+        self.assertTrue(Expense.objects.filter(user=self.user, title='Coffee').exists())
+
+    def test_non_utf8_csv_is_reported_not_raised(self):
+        data = 'Date,Title,Amount\n2025-05-01,Caf\u00e9 cr\u00e8me,3.20\n'.encode('cp1252')
+        result = importers.import_file(self.user, io.BytesIO(data), 'csv')
+        self.assertEqual(result.created, 0)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('not UTF-8', result.errors[0][1])
+
+    def test_ofx_import_keeps_debits_only(self):
+        data = (
+            b'OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+            b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250601120000<TRNAMT>-42.10<NAME>Grocer<MEMO>weekly</STMTTRN>\n'
+            b'<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250602<TRNAMT>1000.00<NAME>Salary</STMTTRN>\n'
+            b'</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+        )
+        result = importers.import_file(self.user, io.BytesIO(data), 'ofx')
+        self.assertEqual((result.created, result.skipped, result.error_count), (1, 1, 0))
+        expense = Expense.objects.get(user=self.user)
+        self.assertEqual((expense.title, expense.amount, expense.date), ('Grocer', Decimal('42.10'), date(2025, 6, 1)))
+
+
+class CategoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cleo', password='pw-12345!')
+        self.other = User.objects.create_user('dara', password='pw-12345!')
+        self.food = Category.objects.get(name='Food')
+        self.expense = Expense.objects.create(user=self.user, category=self.food, title='Lunch',
+                                              amount=Decimal('10'), date=date(2025, 3, 1))
+        self.client.force_login(self.user)
+
+    def category_queries(self, fn):
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        return [q['sql'] for q in ctx.captured_queries if 'FROM "expenses_category"' in q['sql']]
+
+    def test_forms_and_edits_read_categories_from_the_cache(self):
+        categories.choices()
+        edit = {'title': 'Lunch', 'amount': '12', 'date': '2025-03-01', 'description': '', 'category': ' food '}
+        self.assertEqual(self.category_queries(lambda: self.client.get(reverse('add_expense'))), [])
+        self.assertEqual(self.category_queries(
+            lambda: self.client.post(reverse('edit_expense', args=[self.expense.id]), edit)), [])
+        self.expense.refresh_from_db()
+        self.assertEqual((self.expense.category_id, self.expense.amount), (self.food.id, Decimal('12')))
+
+        # Names are unique ignoring case, and lookups ignore case and spacing
+        self.assertEqual(categories.get_or_create('FOOD'), self.food.id)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Category.objects.create(name='food')
+
+    def test_other_processes_see_category_changes(self):
+        # Another worker's copy of the cache, and a category it has not seen
+        # created by this process
+        other = categories.CategoryCache(max_age=60)
+        self.assertIsNone(other.refresh().ids.get((None, 'travel')))
+        with self.captureOnCommitCallbacks(execute=True):
+            travel = Category.objects.create(name='Travel')
+        self.assertEqual(other.refresh().ids.get((None, 'travel')), travel.id)
+
+        # Without a shared cache the bump never arrives; the copy still expires
+        with mock.patch.object(caching, 'global_version', return_value='local'):
+            self.assertNotIn((None, 'parking'), other.refresh().ids)
+            Category.objects.create(name='Parking')
+            self.assertNotIn((None, 'parking'), other.refresh().ids)
+            with mock.patch.object(categories.time, 'monotonic', return_value=time.monotonic() + 61):
+                self.assertIn((None, 'parking'), other.refresh().ids)
+
+    def test_new_names_become_the_users_own_categories(self):
+        self.client.post(reverse('edit_expense', args=[self.expense.id]),
+                         {'title': 'Lunch', 'amount': '10', 'date': '2025-03-01', 'category': 'Snacks'})
+        snacks = Category.objects.get(name='Snacks')
+        self.assertEqual(snacks.owner, self.user)
+        self.assertIn((snacks.id, 'Snacks'), categories.choices(self.user.id))
+        self.assertNotIn((snacks.id, 'Snacks'), categories.choices(self.other.id))
+        self.assertNotEqual(categories.get_or_create('snacks', self.other.id), snacks.id)
+
+        # A rolled-back category is forgotten, though no signal says so
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            gifts = categories.get_or_create('Gifts', self.user.id)
+            self.assertEqual(categories.find('gifts', self.user.id), gifts)
+            raise RuntimeError
+        self.assertIsNone(categories.find('Gifts', self.user.id))
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        with override_settings(PBKDF2_ITERATIONS=1000):
+            self.user = User.objects.create_user('lena', password='pw-12345!')
+
+    def post_login(self, password, username='lena'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password})
+
+    @override_settings(PBKDF2_ITERATIONS=1000)
+    def test_password_is_hashed_once_and_rehashed_when_the_cost_changes(self):
+        with mock.patch('django.contrib.auth.hashers.pbkdf2', wraps=hashers.pbkdf2) as hashed:
+            self.assertRedirects(self.post_login('pw-12345!'), reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(hashed.call_count, 1)
+
+        with override_settings(PBKDF2_ITERATIONS=1200):
+            self.post_login('pw-12345!')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1200$'))
+
+    @override_settings(PBKDF2_ITERATIONS=1000)
+    def test_login_leaves_the_profile_alone(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.post_login('pw-12345!')
+        self.assertEqual([q['sql'] for q in ctx.captured_queries if 'expenses_profile' in q['sql']], [])
+
+        users = User.objects.bulk_create([User(username='bulk1'), User(username='bulk2')])
+        profiles.create_for([*users, self.user])
+        self.assertEqual(Profile.objects.filter(user__in=[*users, self.user]).count(), 3)
+
+    @override_settings(AUTH_THROTTLE_LIMITS={'login:ip': 10, 'login:username': 2, 'register:ip': 1},
+                       PBKDF2_ITERATIONS=1000)
+    def test_failed_attempts_are_throttled_before_hashing(self):
+        self.assertContains(self.post_login('wrong'), 'Please enter a correct username')
+        self.post_login('wrong')
+        with mock.patch('django.contrib.auth.hashers.pbkdf2') as hashed:
+            response = self.post_login('pw-12345!')
+        self.assertContains(response, 'Too many failed attempts', status_code=429)
+        hashed.assert_not_called()
+        # Other usernames from the same address are still under the IP limit
+        User.objects.create_user('omar', password='pw-12345!')
+        self.assertEqual(self.post_login('pw-12345!', 'omar').status_code, 302)
+
+        mismatch = {'username': 'newbie', 'email': 'n@example.com', 'password1': 'Xy7-long-pass', 'password2': 'nope'}
+        self.assertEqual(self.client.post(reverse('register'), mismatch).status_code, 200)
+        response = self.client.post(reverse('register'), {**mismatch, 'password2': 'Xy7-long-pass'})
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+
+
+class CacheVersionTests(TestCase):
+    def test_prod_profile_refuses_a_per_process_cache(self):
+        def load_settings(backend):
+            env = dict(os.environ, DJANGO_ENV='prod', SECRET_KEY='test', ALLOWED_HOSTS='example.com',
+                       CACHE_BACKEND=backend)
+            return subprocess.run([sys.executable, '-c', 'import tracker.settings'], env=env,
+                                  capture_output=True, text=True)
+
+        refused = load_settings('locmem')
+        self.assertNotEqual(refused.returncode, 0)
+        self.assertIn('CACHE_BACKEND=redis', refused.stderr)
+        self.assertEqual(load_settings('file').returncode, 0)
+
+
+class DatabaseTests(TestCase):
+    def test_sqlite_pragmas_are_applied_to_new_connections(self):
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -4321}):
+            database.apply_sqlite_pragmas(sender=type(connection), connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4321)
+
+    @override_settings(DATABASE_REPLICA='replica')
+    def test_replica_reads_until_the_browser_writes(self):
+        router = database.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Expense))
+        with database.replica_reads_enabled():
+            self.assertEqual(router.db_for_read(Expense), 'replica')
+            self.assertIsNone(router.db_for_read(Category))
+        self.assertFalse(router.allow_migrate('replica', 'expenses'))
+
+        # After a POST the browser is pinned to the primary, so the dashboard
+        # works even though this test has no replica connection at all
+        user = User.objects.create_user('wren', password='pw-12345!')
+        self.client.force_login(user)
+        response = self.client.post(reverse('add_expense'), {'title': 'Tea', 'amount': '2', 'date': '2025-03-01'})
+        self.assertIn(database.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+
+class StaticFilesTests(TestCase):
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'expenses.storage.CompressedManifestStaticFilesStorage'},
+    }
+
+    def test_hashed_compressed_files_are_served_with_long_cache_headers(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(STATIC_ROOT=root, STORAGES=self.STORAGES):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            serve = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+        with open(f'{root}/staticfiles.json') as f:
+            hashed = json.load(f)['paths']['expenses/js/dashboard.js']
+
+        response = serve(RequestFactory().get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        self.assertEqual((response['Content-Encoding'], response['Cache-Control']),
+                         ('gzip', 'public, max-age=31536000, immutable'))
+        with open(f'{root}/expenses/js/dashboard.js', 'rb') as f:
+            self.assertEqual(gzip.decompress(response.content), f.read())
+        revalidated = serve(RequestFactory().get(f'/static/{hashed}', HTTP_IF_NONE_MATCH=response['ETag'],
+                                                 HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(revalidated.status_code, 304)
+
+        plain = serve(RequestFactory().get('/static/expenses/js/dashboard.js'))
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(serve(RequestFactory().get('/static/missing.js')).status_code, 404)
+
+    def test_missing_vendored_assets_fail_checks_and_use_the_cdn_only_when_allowed(self):
+        path = 'chart.js/chart.umd.js'
+        with mock.patch.object(assets, 'vendored', return_value=False):
+            with override_settings(VENDOR_CDN_FALLBACK=False):
+                self.assertEqual(assets.url(path), '/static/vendor/chart.js/chart.umd.js')
+                self.assertEqual([e.id for e in assets.check_vendored(None)], ['expenses.W001'])
+                with override_settings(PRODUCTION=True):
+                    self.assertEqual([e.id for e in assets.check_vendored(None)], ['expenses.E001'])
+            with override_settings(VENDOR_CDN_FALLBACK=True):
+                self.assertEqual(assets.url(path), assets.CDN + assets.FILES[path])
+                self.assertEqual(assets.check_vendored(None), [])
+        with mock.patch.object(assets, 'vendored', return_value=True):
+            self.assertEqual(assets.check_vendored(None), [])
+
+    def test_vendored_assets_exist_or_load_from_the_cdn(self):
+        # A fresh checkout must render with its assets: each one named in
+        # assets.py is committed under static/vendor/, or the CDN fallback
+        # is on and the page links the pinned copy there
+        absent = [path for path in assets.FILES if not (assets.VENDOR_DIR / path).is_file()]
+        if absent:
+            self.assertTrue(assets.cdn_fallback(),
+                            f"Not vendored: {', '.join(absent)}; run `manage.py vendor_assets` and commit them")
+        for path in absent:
+            self.assertEqual(assets.url(path), assets.CDN + assets.FILES[path])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.user = User.objects.create_user('jobs', password='pw-12345!')
+        self.client.force_login(self.user)
+        food = Category.objects.get(name='Food')
+        Expense.objects.create(user=self.user, category=food, title='Coffee beans', amount=Decimal('9'), date=date(2025, 3, 2))
+        Expense.objects.create(user=self.user, category=food, title='Bread', amount=Decimal('3'), date=date(2025, 3, 3))
+
+    def drain(self):
+        while (job := jobs.claim('test')) is not None:
+            jobs.run(job)
+
+    def test_async_export_is_queued_then_downloadable(self):
+        response = self.client.get(reverse('export_csv'), {'async': '1', 'q': 'coffee'})
+        job = Job.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('job_detail', args=[job.id]))
+        self.assertEqual((job.kind, job.status, job.params), ('export_csv', Job.QUEUED, {'q': 'coffee'}))
+
+        self.drain()
+        status = self.client.get(reverse('job_status_api', args=[job.id])).json()
+        self.assertEqual((status['status'], status['progress'], status['result']['rows']), ('done', 100, 1))
+        response = self.client.get(status['download_url'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Coffee beans', body)
+        self.assertNotIn('Bread', body)
+
+        other = User.objects.create_user('nosy', password='pw-12345!')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(status['download_url']).status_code, 404)
+
+    def test_failures_are_retried_with_backoff_then_marked_failed(self):
+        broken = mock.Mock(side_effect=RuntimeError('disk full'))
+        with mock.patch.dict(jobs.HANDLERS, {'export_csv': broken}), self.assertLogs('expenses.jobs', 'ERROR'):
+            job = jobs.enqueue('export_csv', self.user)
+            self.drain()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('disk full', job.error)
+            self.assertIsNone(jobs.claim('test'))  # waiting out the backoff
+
+            Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            self.drain()
+            Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            self.drain()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, broken.call_count), (Job.FAILED, 3, 3))
+
+    def test_stale_jobs_are_requeued_only_while_attempts_remain(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        once = jobs.enqueue('export_csv', self.user, max_attempts=1)
+        again = jobs.enqueue('export_csv', self.user)
+        Job.objects.filter(pk__in=[once.pk, again.pk]).update(status=Job.RUNNING, attempts=1, heartbeat_at=long_ago)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        once.refresh_from_db()
+        again.refresh_from_db()
+        self.assertEqual((once.status, again.status), (Job.FAILED, Job.QUEUED))
+        self.assertIn('stopped responding', once.error)
+
+    def test_rollup_rebuild_reports_progress_per_chunk_of_users(self):
+        User.objects.create_user('idle', password='pw-12345!')
+        ExpenseRollup.objects.all().delete()
+        with mock.patch.object(tasks, 'REBUILD_CHUNK', 1), mock.patch.object(tasks, 'report') as report:
+            job = jobs.run_now('rebuild_rollups')
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(report.call_count, User.objects.count())
+        self.assertEqual(ExpenseRollup.objects.filter(user=self.user).aggregate(n=Sum('count'))['n'], 2)
+
+    @override_settings(IMPORT_BACKGROUND_BYTES=10)
+    def test_large_uploads_are_imported_by_a_worker(self):
+        upload = io.BytesIO(b'Date,Title,Amount\n2025-04-01,Rent,500\n2025-04-02,Fuel,40\n')
+        upload.name = 'statement.csv'
+        response = self.client.post(reverse('import_expenses'), {'file': upload, 'file_format': 'auto'})
+        job = Job.objects.get(user=self.user, kind='import_expenses')
+        self.assertRedirects(response, reverse('job_detail', args=[job.id]))
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+
+        self.drain()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['created']), (Job.DONE, 2))
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 4)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.user = User.objects.create_user('rita', password='pw-12345!')
+        self.client.force_login(self.user)
+        food, bills = Category.objects.get(name='Food'), Category.objects.get(name='Bills')
+        Budget.objects.create(user=self.user, month=date(2025, 2, 1), amount=Decimal('100'))
+        for day, category, title, amount in [
+            (date(2025, 1, 5), food, 'Groceries', '40'), (date(2025, 2, 10), bills, 'Power', '90'),
+            (date(2025, 2, 20), food, 'Dinner (birthday)', '25.50'), (date(2025, 12, 31), None, 'Taxi', '12'),
+            (date(2026, 1, 1), food, 'Next year', '999'),
+        ]:
+            Expense.objects.create(user=self.user, category=category, title=title, amount=Decimal(amount), date=day)
+        self.year = {'start': '2025-01-01', 'end': '2025-12-31'}
+
+    def test_year_end_workbook_is_cached_until_the_data_changes(self):
+        response = self.client.get(reverse('report'), {**self.year, 'file_format': 'xlsx'})
+        job = Job.objects.get(user=self.user, kind='report')
+        self.assertRedirects(response, reverse('job_download', args=[job.id]), fetch_redirect_response=False)
+        self.assertEqual((job.status, job.result['expenses'], job.result['total']), (Job.DONE, 4, 167.5))
+
+        with job.result_file.open('rb') as fh, zipfile.ZipFile(fh) as book:
+            workbook = book.read('xl/workbook.xml').decode()
+            categories = book.read('xl/worksheets/sheet2.xml').decode()
+            rows = book.read('xl/worksheets/sheet6.xml').decode()
+        self.assertIn('name="Top expenses"', workbook)
+        self.assertIn('<t xml:space="preserve">Food</t></is></c><c r="B3"><v>2</v></c><c r="C3" s="3"><v>65.5</v>', categories)
+        self.assertEqual(rows.count('<row '), 5)  # header plus the four 2025 expenses
+        self.assertNotIn('Next year', rows)
+
+        self.client.get(reverse('report'), {**self.year, 'file_format': 'xlsx'})
+        self.assertEqual(Job.objects.filter(kind='report').count(), 1)
+        Expense.objects.create(user=self.user, title='Late bill', amount=Decimal('5'), date=date(2025, 6, 1))
+        self.client.get(reverse('report'), {**self.year, 'file_format': 'xlsx'})
+        self.assertEqual(Job.objects.filter(kind='report').count(), 2)
+
+    def test_partial_ranges_match_the_rollups_and_large_ones_go_to_a_worker(self):
+        whole = reports.build(self.user, date(2025, 1, 1), date(2025, 12, 31))
+        with mock.patch.object(reports, 'whole_months', return_value=False):
+            grouped = reports.build(self.user, date(2025, 1, 1), date(2025, 12, 31))
+        self.assertEqual((grouped.categories, grouped.months), (whole.categories, whole.months))
+        self.assertEqual(whole.budgets, [(date(2025, 2, 1), None, Decimal('100'), Decimal('115.5'))])
+        self.assertEqual([row[1] for row in whole.top], ['Power', 'Groceries', 'Dinner (birthday)', 'Taxi'])
+
+        with override_settings(REPORT_BACKGROUND_ROWS=0):
+            response = self.client.get(reverse('report'), {'start': '2025-02-15', 'end': '2025-12-31', 'file_format': 'pdf'})
+        job = Job.objects.get(user=self.user, kind='report')
+        self.assertRedirects(response, reverse('job_detail', args=[job.id]))
+        self.assertEqual(job.status, Job.QUEUED)
+        jobs.run(jobs.claim('test'))
+        job.refresh_from_db()
+        with job.result_file.open('rb') as fh:
+            pdf = fh.read()
+        self.assertEqual((job.status, job.result['expenses']), (Job.DONE, 2))
+        self.assertTrue(pdf.startswith(b'%PDF-1.4') and pdf.endswith(b'%%EOF\n'))
+        xref = int(pdf.rsplit(b'startxref', 1)[1].split()[0])
+        self.assertEqual(pdf[xref:xref + 4], b'xref')
+
+
+class RecurringExpenseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rhea', password='pw-12345!')
+        self.bills = Category.objects.get(name='Bills')
+
+    def dates(self, schedule):
+        return list(Expense.objects.filter(recurring=schedule).order_by('date').values_list('date', flat=True))
+
+    def test_catches_up_missed_periods_once(self):
+        rent = RecurringExpense.objects.create(user=self.user, category=self.bills, title='Rent',
+                                               amount=Decimal('900'), start_date=date(2025, 1, 31))
+        gym = RecurringExpense.objects.create(user=self.user, title='Gym', amount=Decimal('15'),
+                                              frequency=RecurringExpense.WEEKLY, interval=2,
+                                              start_date=date(2025, 1, 1), end_date=date(2025, 2, 1))
+        self.assertEqual(recurring.materialize(date(2025, 4, 15)), (2, 6))
+        # Month ends clamp without drifting; the end date stops the weekly schedule
+        self.assertEqual(self.dates(rent), [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)])
+        self.assertEqual(self.dates(gym), [date(2025, 1, 1), date(2025, 1, 15), date(2025, 1, 29)])
+        rent.refresh_from_db()
+        self.assertEqual((rent.occurrences, rent.next_date), (3, date(2025, 4, 30)))
+
+        # Re-running is a no-op; derived data saw the bulk insert
+        self.assertEqual(recurring.materialize(date(2025, 4, 15)), (0, 0))
+        march = ExpenseRollup.objects.filter(user=self.user, month=date(2025, 3, 1))
+        self.assertEqual(march.aggregate(total=Sum('total'))['total'], Decimal('900'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Expense.objects.create(user=self.user, title='Rent', amount=Decimal('900'),
+                                   date=date(2025, 3, 31), recurring=rent)
+
+        out = io.StringIO()
+        call_command('materialize_recurring', date='2025-05-31', stdout=out)
+        self.assertIn('Created 2 expenses from 1 due schedules', out.getvalue())
+
+    def test_view_adds_schedule_and_creates_due_expenses(self):
+        self.client.force_login(self.user)
+        start = date.today().replace(day=1)
+        response = self.client.post(reverse('recurring_list'), {
+            'title': 'Netflix', 'amount': '9.99', 'category': self.bills.id,
+            'frequency': 'monthly', 'interval': 1, 'start_date': start.isoformat(),
+        }, follow=True)
+        self.assertContains(response, 'Netflix')
+        schedule = RecurringExpense.objects.get(user=self.user)
+        self.assertEqual(self.dates(schedule), [start])
+
+        self.client.post(reverse('delete_recurring', args=[schedule.id]))
+        self.assertFalse(RecurringExpense.objects.exists())
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+
+    def test_view_rejects_start_dates_long_past(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('recurring_list'), {
+            'title': 'Coffee', 'amount': '3', 'category': self.bills.id,
+            'frequency': 'daily', 'interval': 1, 'start_date': '1900-01-01',
+        })
+        self.assertFormError(response.context['form'], 'start_date', 'The start date can be at most a year in the past.')
+        self.assertFalse(RecurringExpense.objects.exists())
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dave', password='pw-12345!')
+        # Three expenses share each date so the id tiebreak matters
+        created = Expense.objects.bulk_create(
+            Expense(user=self.user, title=f'E{i}', amount=Decimal('1'), date=date(2025, 1, 1 + i // 3))
+            for i in range(25)
+        )
+        expenses_bulk_created.send(sender=Expense, expenses=created)
+        self.expected = list(Expense.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True))
+
+    def test_walks_forwards_and_backwards_through_every_row(self):
+        qs = Expense.objects.filter(user=self.user)
+        seen, pages, token = [], [], None
+        while True:
+            page = pagination.paginate(qs, token, per_page=7)
+            pages.append(page)
+            seen.extend(e.id for e in page)
+            if not page.has_next():
+                break
+            token = page.next_token
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        back = pagination.paginate(qs, pages[-1].previous_token, per_page=7)
+        self.assertEqual([e.id for e in back], [e.id for e in pages[-2]])
+
+    def test_api_returns_pages_and_tokens(self):
+        self.client.force_login(self.user)
+        first = self.client.get(reverse('expense_list_api'), {'limit': 10, 'total': 1}).json()
+        self.assertEqual([r['id'] for r in first['results']], self.expected[:10])
+        self.assertEqual(first['total'], 25)
+        second = self.client.get(reverse('expense_list_api'), {'limit': 10, 'cursor': first['next']}).json()
+        self.assertEqual([r['id'] for r in second['results']], self.expected[10:20])
+
+    def test_filtered_count_follows_writes(self):
+        qs = Expense.objects.filter(user=self.user, date__gte=date(2025, 1, 5))
+        self.assertEqual(pagination.approximate_total(self.user, qs, filtered=True), 13)
+        Expense.objects.create(user=self.user, title='Late', amount=Decimal('1'), date=date(2025, 1, 9))
+        self.assertEqual(pagination.approximate_total(self.user, qs, filtered=True), 14)
+
+
+@skipUnless(analytics.available(), 'numpy/pandas not installed')
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ivy', password='pw-12345!')
+        food = Category.objects.get(name='Food')
+        rows = [Expense(user=self.user, category=food, title='Lunch', amount=Decimal('10'), date=date(2025, 2, day))
+                for day in range(1, 21)]
+        rows.append(Expense(user=self.user, category=food, title='Banquet', amount=Decimal('200'), date=date(2025, 3, 10)))
+        rows.append(Expense(user=self.user, title='Misc', amount=Decimal('5.50'), date=date(2025, 3, 3)))
+        Expense.objects.bulk_create(rows)
+
+    def test_history_loads_as_columns(self):
+        history = analytics.load_history(self.user)
+        self.assertEqual(len(history), 22)
+        self.assertEqual(str(history['date'].dtype), 'datetime64[ns]')
+        self.assertEqual(history.groupby('category', observed=True)['amount'].sum().to_dict(),
+                         {'Food': 400.0, 'Uncategorized': 5.5})
+
+    def test_summary_trends_forecast_and_anomalies(self):
+        summary = analytics.summarise(self.user, today=date(2025, 3, 21))
+        self.assertEqual([(m['period'], m['total']) for m in summary['monthly']],
+                         [('2025-02-01', 200.0), ('2025-03-01', 205.5)])
+        # Weeks start on Monday; 2025-03-10 is one
+        self.assertIn({'period': '2025-03-10', 'total': 200.0, 'avg': 61.38}, summary['weekly'])
+        self.assertEqual(summary['daily'][-1]['period'], '2025-03-21')
+
+        forecast = summary['forecast']
+        self.assertEqual((forecast['spent_to_date'], forecast['days_left']), (205.5, 10))
+        self.assertAlmostEqual(forecast['projected'], 205.5 + forecast['daily_rate'] * 10, places=1)
+
+        self.assertEqual([(a['amount'], a['category']) for a in summary['anomalies']], [(200.0, 'Food')])
+
+    def test_api(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('analytics_api')).json()
+        self.assertEqual(data['expenses'], 22)
+        self.assertEqual(set(data), {'expenses', 'daily', 'weekly', 'monthly', 'forecast', 'anomalies'})
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('erin', password='pw-12345!')
+        other = User.objects.create_user('frank', password='pw-12345!')
+        self.food = Category.objects.get(name='Food')
+        self.coffee = Expense.objects.create(user=self.user, category=self.food, title='Coffee beans',
+                                             amount=Decimal('9'), date=date(2025, 2, 1))
+        self.rent = Expense.objects.create(user=self.user, category=None, title='Rent',
+                                           description='February flat rent', amount=Decimal('900'), date=date(2025, 2, 1))
+        Expense.objects.create(user=other, category=self.food, title='Coffee', amount=Decimal('3'), date=date(2025, 2, 1))
+        self.backend = search.get_backend()
+
+    def ids(self, q):
+        return set(self.backend.filter(Expense.objects.filter(user=self.user), self.user, q).values_list('id', flat=True))
+
+    def test_prefix_matching_on_title_description_and_category(self):
+        self.assertEqual(self.ids('cof'), {self.coffee.id})
+        self.assertEqual(self.ids('febr'), {self.rent.id})
+        self.assertEqual(self.ids('foo'), {self.coffee.id})
+
+    def test_index_follows_edits_deletes_and_category_renames(self):
+        self.rent.title = 'Mortgage'
+        self.rent.save()
+        self.assertEqual(self.ids('mortg'), {self.rent.id})
+        self.food.name = 'Groceries'
+        self.food.save()
+        self.assertEqual(self.ids('grocer'), {self.coffee.id})
+        self.coffee.delete()
+        self.assertEqual(self.ids('grocer'), set())
+
+    def test_search_api_ranks_results(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_api'), {'q': 'rent'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.rent.id])
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.user = User.objects.create_user('gina', password='pw-12345!')
+        self.client.force_login(self.user)
+
+    def test_payload_is_cached_until_data_changes(self):
+        # The payload, plus the analytics summary when numpy/pandas are installed
+        entries = 2 if analytics.available() else 1
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(2):  # session, user; recent expenses come from the cached fragment
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['overall_total'], 0)
+        self.assertEqual(caching.stats()['hits'], entries)
+
+        Expense.objects.create(user=self.user, title='Book', amount=Decimal('15'), date=date.today())
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['overall_total'], 15)
+        self.assertContains(response, 'Book')
+
+        Budget.objects.create(user=self.user, month=date.today().replace(day=1), amount=Decimal('10'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertTrue(response.context['budget_alert'])
+        self.assertEqual(caching.stats()['misses'], 3 * entries)
+
+    def test_list_row_fragments_follow_edits(self):
+        expense = Expense.objects.create(user=self.user, title='Book', amount=Decimal('15'), date=date.today())
+        self.assertContains(self.client.get(reverse('expense_list')), 'Book')
+        expense.title = 'Notebook'
+        expense.save()
+        self.assertContains(self.client.get(reverse('expense_list')), 'Notebook')
+
+
+class SessionTests(TestCase):
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_and_cookie_messages_skip_the_session_table(self):
+        caching.get_cache().clear()
+        self.client.force_login(User.objects.create_user('sam', password='pw-12345!'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('month_total_api'))
+            response = self.client.post(reverse('add_expense'), {
+                'title': 'Tea', 'amount': '2.50', 'date': date.today().isoformat(), 'description': '',
+            })
+        self.assertRedirects(response, reverse('expense_list'), fetch_redirect_response=False)
+        self.assertIn('messages', response.cookies)
+        self.assertEqual([q['sql'] for q in ctx.captured_queries if 'django_session' in q['sql']], [])
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)
+        ] + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))])
+        out = io.StringIO()
+        call_command('clear_expired_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+
+
+@override_settings(CONDITIONAL_GETS=True)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.user = User.objects.create_user('nina', password='pw-12345!')
+        Expense.objects.create(user=self.user, title='Rent', amount=Decimal('500.00'), date=date.today())
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))  # sets the CSRF cookie, which is part of the ETag
+
+    def test_unchanged_data_is_answered_before_any_view_query(self):
+        for name in ('dashboard', 'expense_list', 'month_total_api', 'export_csv'):
+            first = self.client.get(reverse(name))
+            self.assertEqual(first.status_code, 200)
+            self.assertIn('private', first['Cache-Control'])
+            with self.assertNumQueries(2):  # session and user
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304, name)
+            response = self.client.get(reverse(name), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304, name)
+
+        etag = self.client.get(reverse('month_total_api'))['ETag']
+        self.assertEqual(self.client.get(reverse('month_total_api'), {'x': '1'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        Expense.objects.create(user=self.user, title='Tea', amount=Decimal('2.00'), date=date.today())
+        response = self.client.get(reverse('month_total_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(json.loads(response.content), {'month_total': 502.0})
+
+    @override_settings(CONDITIONAL_GETS=False)
+    def test_off_without_a_shared_cache(self):
+        response = self.client.get(reverse('month_total_api'))
+        self.assertNotIn('ETag', response)
+        self.assertEqual(self.client.get(reverse('month_total_api'), HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+
+    async def test_async_views_revalidate(self):
+        user = self.user
+
+        async def auser():
+            return user
+        request = AsyncRequestFactory().get(reverse('month_total_api'))
+        request.user, request.auser = user, auser
+        first = await views.amonth_total_api(request)
+        request = AsyncRequestFactory().get(reverse('month_total_api'), headers={'If-None-Match': first['ETag']})
+        request.user, request.auser = user, auser
+        self.assertEqual((await views.amonth_total_api(request)).status_code, 304)
+
+
+class JournalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('olga', password='pw-12345!')
+        self.food = Category.objects.get(name='Food')
+        self.client.force_login(self.user)
+
+    def rollup_total(self):
+        return ExpenseRollup.objects.filter(user=self.user).aggregate(t=Sum('total'))['t'] or 0
+
+    def test_changes_are_journaled_and_deletes_can_be_undone(self):
+        expense = Expense.objects.create(user=self.user, category=self.food, title='Lunch',
+                                         amount=Decimal('12.00'), date=date(2025, 3, 4))
+        self.client.post(reverse('edit_expense', args=[expense.pk]), {
+            'title': 'Lunch', 'amount': '15', 'date': '2025-03-04', 'description': '', 'currency': 'INR',
+        })
+        self.client.post(reverse('delete_expense', args=[expense.pk]))
+        self.assertFalse(Expense.objects.filter(pk=expense.pk).exists())
+        self.assertEqual(self.rollup_total(), 0)
+        self.assertContains(self.client.get(reverse('deleted_expenses')), 'Lunch')
+
+        self.client.post(reverse('restore_expense', args=[expense.pk]))
+        self.assertTrue(Expense.objects.filter(pk=expense.pk).exists())
+        self.assertEqual(self.rollup_total(), Decimal('15.00'))
+
+        events = list(journal.history(expense.pk))
+        self.assertEqual([e.action for e in events], ['create', 'update', 'delete', 'restore'])
+        self.assertEqual(events[1].changes, {'amount': ('12.00', '15'), 'description': (None, '')})
+        self.assertEqual(events[0].after['date'], '2025-03-04')
+
+    def test_admin_deletes_softly_and_lists_deleted_expenses(self):
+        admin_user = User.objects.create_superuser('root', password='pw-12345!')
+        expense = Expense.objects.create(user=self.user, title='Taxi', amount=Decimal('8.00'), date=date(2025, 3, 1))
+        self.client.force_login(admin_user)
+        changelist = reverse('admin:expenses_expense_changelist')
+        self.client.post(changelist, {'action': 'delete_selected', '_selected_action': [expense.pk], 'post': 'yes'})
+        expense = Expense.all_objects.get(pk=expense.pk)
+        self.assertIsNotNone(expense.deleted_at)
+        self.assertContains(self.client.get(changelist, {'deleted': 'yes'}), 'Taxi')
+
+        self.client.post(changelist, {'action': 'restore_selected', '_selected_action': [expense.pk]})
+        self.assertTrue(Expense.objects.filter(pk=expense.pk).exists())
+        self.assertEqual([e.action for e in journal.history(expense.pk)], ['create', 'delete', 'restore'])
+
+    def test_consumers_resume_from_their_checkpoint(self):
+        batches = []
+        journal.consumer('test')(lambda events: batches.append([e.expense_id for e in events]))
+        self.addCleanup(journal.CONSUMERS.pop, 'test')
+        expenses = [Expense.objects.create(user=self.user, title=f'Item {n}', amount=Decimal('1.00'),
+                                           date=date(2025, 1, 1)) for n in range(3)]
+
+        self.assertEqual(journal.consume('test', batch_size=2), 3)
+        self.assertEqual(batches, [[expenses[0].pk, expenses[1].pk], [expenses[2].pk]])
+        self.assertEqual(journal.consume('test'), 0)
+        expenses[0].soft_delete()
+        self.assertEqual(journal.consume('test'), 1)
+        self.assertEqual(journal.position('test'), ExpenseEvent.objects.latest('seq').seq)
+
+    def test_purge_removes_old_deleted_expenses_in_batches(self):
+        old, recent, live = [Expense.objects.create(user=self.user, category=self.food, title=title,
+                                                    amount=Decimal('5.00'), date=date(2025, 2, 1))
+                             for title in ('Old', 'Recent', 'Live')]
+        old.soft_delete()
+        recent.soft_delete()
+        Expense.all_objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=40))
+        out = io.StringIO()
+        call_command('purge_deleted_expenses', batch_size=1, pause=0, stdout=out)
+        self.assertIn('Purged 1 deleted expenses', out.getvalue())
+        self.assertEqual(set(Expense.all_objects.values_list('title', flat=True)), {'Recent', 'Live'})
+        self.assertEqual(journal.history(old.pk).last().action, 'purge')
+        self.assertEqual(self.rollup_total(), Decimal('5.00'))
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.user = User.objects.create_user('hugo', password='pw-12345!')
+        food = Category.objects.get(name='Food')
+        for day in range(1, 26):
+            Expense.objects.create(user=self.user, category=food, title=f'Meal {day}',
+                                   amount=Decimal('4.00'), date=date.today().replace(day=1))
+        Budget.objects.create(user=self.user, month=date.today().replace(day=1), amount=Decimal('80'))
+
+    def request(self, path, data=None):
+        request = AsyncRequestFactory().get(path, data or {})
+        user = self.user
+
+        async def auser():
+            return user
+        request.user, request.auser = user, auser
+        return request
+
+    async def test_async_dashboard_payload_matches_sync(self):
+        payload = await views.adashboard_payload(self.user, 6)
+        self.assertEqual(payload['overall_total'], 100)
+        self.assertTrue(payload['budget_alert'])
+        self.assertEqual(payload, await views.sync_to_async(views.dashboard_payload)(self.user, 6))
+
+    async def test_async_json_views(self):
+        response = await views.amonth_total_api(self.request(reverse('month_total_api')))
+        self.assertEqual(json.loads(response.content), {'month_total': 100.0})
+
+        response = await views.aexpense_list_api(self.request(reverse('expense_list_api'), {'total': '1'}))
+        data = json.loads(response.content)
+        self.assertEqual((len(data['results']), data['total']), (20, 25))
+        response = await views.aexpense_list_api(self.request(reverse('expense_list_api'), {'cursor': data['next']}))
+        self.assertEqual(len(json.loads(response.content)['results']), 5)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query counts must not grow with the number of rows shown."""
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.user = User.objects.create_user('hank', password='pw-12345!')
+        for i, category in enumerate(Category.objects.all()[:5]):
+            for day in range(1, 4):
+                Expense.objects.create(user=self.user, category=category, title=f'E{i}-{day}',
+                                       amount=Decimal('2'), date=date.today().replace(day=day))
+        self.client.force_login(self.user)
+
+    def test_views_stay_within_query_budgets(self):
+        self.assertQueryBudget(9, reverse('dashboard'))          # cold cache
+        self.assertQueryBudget(3, reverse('dashboard'))          # warm cache
+        self.assertQueryBudget(4, reverse('expense_list'))
+        self.assertQueryBudget(5, reverse('expense_list'), data={'q': 'E1'})
+        self.assertQueryBudget(3, reverse('expense_list_api'))
+        self.assertQueryBudget(3, reverse('export_csv'))
+        self.assertQueryBudget(3, reverse('month_total_api'))
+
+    def test_middleware_records_per_view_metrics(self):
+        perf.store.clear()
+        self.client.get(reverse('expense_list'))
+        staff = User.objects.create_user('ivy', password='pw-12345!', is_staff=True)
+        self.client.force_login(staff)
+        report = self.client.get(reverse('perf_api')).json()
+        self.assertEqual(report['expense_list']['count'], 1)
+        self.assertGreater(report['expense_list']['queries']['p50'], 0)
+        self.assertGreater(report['expense_list']['template_ms']['p50'], 0)
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seeded_user_can_be_benchmarked(self):
+        call_command('seed_expenses', users=2, years=1, per_month=4, prefix='bench', stdout=io.StringIO())
+        user = User.objects.filter(username__startswith='bench').first()
+        self.assertTrue(user.profile)
+        self.assertEqual(
+            ExpenseRollup.objects.filter(user=user).aggregate(n=Sum('count'))['n'],
+            Expense.objects.filter(user=user).count(),
+        )
+        self.assertEqual(
+            ExpenseEvent.objects.filter(user=user, action=ExpenseEvent.CREATE).count(),
+            Expense.objects.filter(user=user).count(),
+        )
+        results = benchmarks.run_suite(self.client, user, iterations=2)
+        self.assertIn('dashboard', results)
+        self.assertEqual(set(results['month_total_api']),
+                         {'iterations', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'queries', 'peak_kb'})
+        self.assertEqual(benchmarks.compare(results, results), [])
@@ -1,16 +1,39 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI the read-heavy views are served by their async variants
+if getattr(settings, 'EXPENSES_ASYNC_VIEWS', False):
+    dashboard, expense_list = views.adashboard, views.aexpense_list
+    month_total_api, expense_list_api = views.amonth_total_api, views.aexpense_list_api
+else:
+    dashboard, expense_list = views.dashboard, views.expense_list
+    month_total_api, expense_list_api = views.month_total_api, views.expense_list_api
+
 urlpatterns = [
-    path('', views.expense_list, name='expense_list'),
+    path('', expense_list, name='expense_list'),
     path('add/', views.add_expense, name='add_expense'),
     path('edit/<int:expense_id>/', views.edit_expense, name='edit_expense'),
     path('delete/<int:expense_id>/', views.delete_expense, name='delete_expense'),
+    path('deleted/', views.deleted_expenses, name='deleted_expenses'),   # soft-deleted, until purged
+    path('deleted/<int:expense_id>/restore/', views.restore_expense, name='restore_expense'),
+    path('import/', views.import_expenses, name='import_expenses'),
+    path('recurring/', views.recurring_list, name='recurring_list'),
+    path('recurring/<int:recurring_id>/delete/', views.delete_recurring, name='delete_recurring'),
 
      # Dashboard and analytics
-    path('dashboard/', views.dashboard, name='dashboard'),         # main dashboard with graphs
-    path('api/month_total/', views.month_total_api, name='month_total_api'),  # AJAX API for month total
-    path('export/csv/', views.export_csv, name='export_csv'),   
+    path('dashboard/', dashboard, name='dashboard'),         # main dashboard with graphs
+    path('api/month_total/', month_total_api, name='month_total_api'),  # AJAX API for month total
+    path('api/expenses/', expense_list_api, name='expense_list_api'),  # keyset-paginated JSON listing
+    path('api/search/', views.search_api, name='search_api'),  # ranked full-text search
+    path('api/analytics/', views.analytics_api, name='analytics_api'),  # trends, forecast, anomalies
+    path('api/cache_stats/', views.cache_stats_api, name='cache_stats_api'),  # staff only
+    path('api/perf/', views.perf_api, name='perf_api'),  # staff only: per-view query/latency report
+    path('export/csv/', views.export_csv, name='export_csv'),   # ?async=1 queues a background job
+    path('reports/', views.report, name='report'),   # PDF/XLSX statement; large ranges run as a job
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+    path('api/jobs/<int:job_id>/', views.job_status_api, name='job_status_api'),   
     #path('register/', views.register_view, name='register'),#8 nov 2025 new
     # CSV export
 ]
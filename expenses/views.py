@@ -1,17 +1,23 @@
 # expenses/views.py
+import asyncio
 import json
-import csv
 from datetime import date
 from dateutil.relativedelta import relativedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
-from django.db.models.functions import TruncMonth
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from django.db.models import OuterRef, Sum
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse, Http404
 from django.contrib.auth import login
-from .models import Expense, Category, Budget
-from .forms import ExpenseForm, BudgetForm, RegisterForm
+from django.urls import reverse
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from .models import Expense, BudgetCounter, ExpenseRollup, Job, RecurringExpense
+from .forms import ExpenseForm, BudgetForm, RegisterForm, ImportForm, RecurringExpenseForm, ReportForm
+from . import analytics, budgets, caching, categories, conditional, database, fx, importers, jobs, pagination, perf, recurring, reports, search
+from .export import apply_list_filters, export_rows
 
 # ------------------------
 # User Registration new 9 nov
@@ -35,38 +41,51 @@ from .forms import ExpenseForm, BudgetForm, RegisterForm
 # ------------------------
 # Dashboard View
 # ------------------------
-@login_required
-def dashboard(request):
-    user = request.user
-    qs = Expense.objects.filter(user=user)
+# Columns the list and dashboard rows render; the rest stay deferred
+ROW_FIELDS = ('id', 'title', 'amount', 'currency', 'date', 'description', 'category__name')
 
-    # Overall total
-    overall = qs.aggregate(total=Sum('amount'))['total'] or 0
 
-    # Category breakdown
-    cat_qs = qs.values('category__name').annotate(total=Sum('amount')).order_by('-total')
-    categories = [c['category__name'] or 'Uncategorized' for c in cat_qs]
-    category_amounts = [float(c['total'] or 0) for c in cat_qs]
+def listed(qs):
+    """Expense queryset trimmed to what a rendered row needs (one JOIN for the category name)."""
+    return qs.select_related('category').only(*ROW_FIELDS)
 
-    # Last N months
-    months_back = int(request.GET.get('months', 6))
-    end_month = date.today().replace(day=1)
-    start_month = end_month - relativedelta(months=months_back - 1)
 
+def dashboard_months(months_back):
+    """(first, last) month shown on the spending chart."""
+    end_month = date.today().replace(day=1)
+    return end_month - relativedelta(months=months_back - 1), end_month
+
+
+def dashboard_querysets(user, start_month, end_month, currency):
+    """
+    The dashboard's three independent reads: category totals, monthly totals
+    and this month's overall budget counter. Shared by the sync and async views.
+    """
+    # Aggregates come from the maintained rollup table, not the raw expenses,
+    # with each (month, category, currency) bucket converted to `currency`
+    rollup_qs = ExpenseRollup.objects.filter(user=user).annotate(
+        converted=fx.converted(currency, amount='total', month=OuterRef('month')),
+    )
+    cat_qs = rollup_qs.values('category__name').annotate(total=Sum('converted')).order_by('-total')
     monthly_qs = (
-        qs.filter(date__gte=start_month)
-        .annotate(month=TruncMonth('date'))
+        rollup_qs.filter(month__gte=start_month)
         .values('month')
-        .annotate(total=Sum('amount'))
+        .annotate(total=Sum('converted'))
         .order_by('month')
     )
+    budget_qs = BudgetCounter.objects.filter(user=user, month=end_month, category__isnull=True).values_list('limit', 'spent')
+    return cat_qs, monthly_qs, budget_qs
+
+
+def shape_dashboard(cat_rows, monthly_rows, budget, start_month, end_month, currency):
+    """Turn the dashboard query results into the cached template payload."""
+    # Category breakdown; every rollup row belongs to one category, so this is also the overall total
+    categories = [c['category__name'] or 'Uncategorized' for c in cat_rows]
+    category_amounts = [float(c['total'] or 0) for c in cat_rows]
+    overall = sum(category_amounts)
 
     # Continuous timeline mapping
-    totals_map = {}
-    for m in monthly_qs:
-        month_dt = m['month'].date() if hasattr(m['month'], 'date') else m['month']
-        month_dt = month_dt.replace(day=1)
-        totals_map[month_dt] = float(m['total'] or 0)
+    totals_map = {m['month']: float(m['total'] or 0) for m in monthly_rows}
 
     month_labels, month_totals = [], []
     cur = start_month
@@ -75,102 +94,176 @@ def dashboard(request):
         month_totals.append(totals_map.get(cur, 0.0))
         cur = cur + relativedelta(months=1)
 
-    # Current month total + budget
-    this_month_start = date.today().replace(day=1)
-    this_month_total = float(qs.filter(date__gte=this_month_start).aggregate(total=Sum('amount'))['total'] or 0)
-
-    try:
-        b = Budget.objects.get(user=user, month=this_month_start, category__isnull=True)
-        monthly_budget_amount = float(b.amount)
-    except Budget.DoesNotExist:
-        monthly_budget_amount = None
+    # Current month total + budget (limit, spent) from the running counter
+    this_month_total = totals_map.get(end_month, 0.0)
+    monthly_budget_amount = float(budget[0]) if budget else None
 
     budget_percent = None
-    budget_alert = False
-    if monthly_budget_amount:
-        budget_percent = (this_month_total / monthly_budget_amount) * 100
-        if budget_percent >= 100:
-            budget_alert = True
-
-    recent_expenses = Expense.objects.filter(user=request.user).order_by('-date')[:10]
-
-
-    context = {
-        'overall_total': float(overall),
+    budget_level = None
+    if budget and budget[0]:
+        budget_percent = float(budget[1] * 100 / budget[0])
+        budget_level = budgets.level_of(budget[1], budget[0])
+    budget_alert = budget_level is not None and budget_level >= 100
+
+    return {
+        'overall_total': overall,
         'categories_json': json.dumps(categories),
         'category_amounts_json': json.dumps(category_amounts),
         'month_labels_json': json.dumps(month_labels),
         'month_totals_json': json.dumps(month_totals),
-        'cat_qs': cat_qs,
-        'monthly_qs': monthly_qs,
-        'recent_expenses': recent_expenses,
         'this_month_total': this_month_total,
         'monthly_budget_amount': monthly_budget_amount,
         'budget_alert': budget_alert,
         'budget_percent': budget_percent,
-        'total_categories': cat_qs.count(),
+        'budget_level': budget_level,
+        'total_categories': len(categories),
         'months_shown': len(month_labels),
-        'username': request.user.username,
+        'currency': currency,
+        'currency_symbol': fx.symbol(currency),
     }
+
+
+def dashboard_payload(user, months_back):
+    """
+    Everything on the dashboard that is derived from the user's expenses
+    and budgets, ready for the template. Cached per user and `months_back`.
+    """
+    start_month, end_month = dashboard_months(months_back)
+    currency = fx.preferred_currency(user.pk)
+    cat_qs, monthly_qs, budget_qs = dashboard_querysets(user, start_month, end_month, currency)
+    return shape_dashboard(list(cat_qs), list(monthly_qs), budget_qs.first(), start_month, end_month, currency)
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+def dashboard(request):
+    user = request.user
+    months_back = max(int(request.GET.get('months', 6)), 1)
+    # The month is part of the key so "this month" rolls over at midnight
+    payload = caching.get_or_build(
+        user.pk, 'dashboard', lambda: dashboard_payload(user, months_back),
+        months_back, date.today().strftime('%Y%m'),
+    )
+
+    # Lazy: only read when the cached table fragment is stale
+    recent_expenses = listed(Expense.objects.filter(user=request.user)).order_by('-date')[:10]
+
+    insights = user_insights(user) if analytics.available() else None
+    context = dict(payload, recent_expenses=recent_expenses, username=request.user.username,
+                   insights=insights, weekly_json=json.dumps(insights['weekly'] if insights else []),
+                   data_version=caching.data_version(user.pk), today=date.today().isoformat())
     return render(request, 'expenses/dashboard.html', context)
 
 
+def user_insights(user):
+    """analytics.summarise() for the user, cached until their data changes."""
+    return caching.get_or_build(user.pk, 'analytics', lambda: analytics.summarise(user), date.today().isoformat())
+
+
+@login_required
+@conditional.conditional
+def analytics_api(request):
+    """Daily/weekly/monthly trends, month-end forecast and anomaly flags."""
+    if not analytics.available():
+        return JsonResponse({'error': 'Analytics needs numpy and pandas installed.'}, status=503)
+    return JsonResponse(user_insights(request.user))
+
+
+@staff_member_required
+def cache_stats_api(request):
+    return JsonResponse(caching.stats())
+
+
+@staff_member_required
+def perf_api(request):
+    """Per-URL latency/query percentiles from this process's PerformanceMiddleware."""
+    return JsonResponse(perf.summarise(perf.store.all_samples()))
+
+
 # ------------------------
 # CRUD Operations
 # ------------------------
+LIST_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+
+def page_query(params, token):
+    """Querystring for another page of the same listing."""
+    query = params.copy()
+    query.pop('page', None)
+    query['cursor'] = token
+    return query.urlencode()
+
+
 @login_required
+@conditional.conditional
+@database.replica_reads
 def expense_list(request):
-    qs = Expense.objects.filter(user=request.user).order_by('-date')
-
+    qs = listed(Expense.objects.filter(user=request.user))
+    qs = apply_list_filters(qs, request.GET, request.user)
     q = request.GET.get('q')
-    if q:
-        qs = qs.filter(Q(description__icontains=q) | Q(category__name__icontains=q))
-
     start = request.GET.get('start')
     end = request.GET.get('end')
-    if start:
-        qs = qs.filter(date__gte=start)
-    if end:
-        qs = qs.filter(date__lte=end)
 
-    # pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(qs, 20)
-    page = request.GET.get('page') or 1
-    expenses = paginator.get_page(page)
+    if request.GET.get('page'):
+        # Old ?page=N links keep working through the offset paginator
+        from django.core.paginator import Paginator
+        paginator = Paginator(qs.order_by('-date', '-id'), LIST_PAGE_SIZE)
+        expenses = paginator.get_page(request.GET.get('page'))
+        next_query = page_query(request.GET, pagination.make_token(expenses[-1])) if expenses.has_next() else None
+        prev_query = None
+        if expenses.has_previous():
+            prev_query = request.GET.copy()
+            prev_query['page'] = expenses.previous_page_number()
+            prev_query = prev_query.urlencode()
+        total = paginator.count
+    else:
+        expenses = pagination.paginate(qs, request.GET.get('cursor'), LIST_PAGE_SIZE)
+        next_query = page_query(request.GET, expenses.next_token) if expenses.has_next() else None
+        prev_query = page_query(request.GET, expenses.previous_token) if expenses.has_previous() else None
+        total = pagination.approximate_total(request.user, qs, filtered=bool(q or start or end))
+
+    return render(request, 'expenses/expense_list.html', {
+        'expenses': expenses, 'q': q, 'start': start, 'end': end,
+        'next_query': next_query, 'prev_query': prev_query, 'total': total,
+        'data_version': caching.data_version(request.user.pk),
+    })
+
 
-    return render(request, 'expenses/expense_list.html', {'expenses': expenses, 'q': q, 'start': start, 'end': end})
+def budget_warning(status, day):
+    budget = f'{status.category} budget' if status.category else 'monthly budget'
+    if status.level >= 100:
+        return f'⚠️ You have exceeded your {budget} for {day:%b %Y}!'
+    return f'⚠️ You have used {status.level}% of your {budget} for {day:%b %Y}.'
 
 
 @login_required
 def add_expense(request):
     if request.method == 'POST':
-        form = ExpenseForm(request.POST)
+        form = ExpenseForm(request.POST, user=request.user)
         if form.is_valid():
             exp = form.save(commit=False)
             exp.user = request.user
+            exp.currency = exp.currency or fx.preferred_currency(request.user.pk)
             exp.save()
 
-            # Optional: Budget warning
-            month_start = exp.date.replace(day=1)
-            month_total = Expense.objects.filter(user=request.user, date__gte=month_start).aggregate(total=Sum('amount'))['total'] or 0
-            try:
-                b = Budget.objects.get(user=request.user, month=month_start, category__isnull=True)
-                if month_total >= b.amount:
-                    messages.warning(request, '⚠️ You have exceeded your monthly budget!')
-            except Budget.DoesNotExist:
-                pass
+            # Budget warnings, read from the running counters
+            statuses = budgets.check(request.user, exp.date, exp.category_id)
+            added = fx.convert(exp.amount, exp.currency, fx.preferred_currency(request.user.pk), exp.date)
+            for status in budgets.alerts(statuses, added):
+                messages.warning(request, budget_warning(status, exp.date))
 
             messages.success(request, 'Expense added successfully!')
             return redirect('expense_list')
     else:
-        form = ExpenseForm()
+        form = ExpenseForm(user=request.user)
     return render(request, 'expenses/add_expense.html', {'form': form})
 
 
 @login_required
 def edit_expense(request, expense_id):
-    expense = get_object_or_404(Expense, id=expense_id, user=request.user)
+    expense = get_object_or_404(Expense.objects.select_related('category'), id=expense_id, user=request.user)
 
     if request.method == "POST":
         # Read values manually from input fields
@@ -178,52 +271,350 @@ def edit_expense(request, expense_id):
         expense.amount = request.POST.get("amount")
         expense.date = request.POST.get("date")
         expense.description = request.POST.get("description")
+        expense.currency = (request.POST.get("currency") or expense.currency).upper()[:3]
 
-        # Category handling:
+        # Category handling: names resolve through the in-process cache;
+        # a name the user has not used before becomes their own category
         category_name = request.POST.get("category")
         if category_name:
-            category_obj, created = Category.objects.get_or_create(name=category_name)
-            expense.category = category_obj
+            expense.category_id = categories.get_or_create(category_name, request.user.pk)
 
         expense.save()
         messages.success(request, "Expense updated successfully!")
         return redirect("expense_list")
 
-    return render(request, "expenses/edit_expense.html", {"expense": expense})
+    currencies = sorted({*fx.currencies(), expense.currency})
+    return render(request, "expenses/edit_expense.html", {"expense": expense, "currencies": currencies})
 
 @login_required
 def delete_expense(request, expense_id):
     expense = get_object_or_404(Expense, id=expense_id, user=request.user)
     if request.method == 'POST':
-        expense.delete()
-        messages.success(request, "Expense deleted successfully!")
+        expense.soft_delete()
+        messages.success(request, "Expense deleted. You can restore it from Deleted expenses.")
         return redirect('expense_list')
     return render(request, 'expenses/delete_expense.html', {'expense': expense})
 
 
+DELETED_PAGE_SIZE = 100
+
+
+@login_required
+def deleted_expenses(request):
+    """Deleted expenses not purged yet, most recently deleted first, each with a Restore button."""
+    expenses = Expense.all_objects.filter(user=request.user, deleted_at__isnull=False).select_related(
+        'category',
+    ).only(*ROW_FIELDS, 'deleted_at').order_by('-deleted_at')[:DELETED_PAGE_SIZE]
+    return render(request, 'expenses/deleted_expenses.html', {
+        'expenses': expenses, 'purge_days': getattr(settings, 'EXPENSE_PURGE_DAYS', 30),
+    })
+
+
+@login_required
+@require_POST
+def restore_expense(request, expense_id):
+    expense = get_object_or_404(Expense.all_objects, id=expense_id, user=request.user, deleted_at__isnull=False)
+    expense.restore()
+    messages.success(request, f'"{expense.title}" restored.')
+    return redirect('deleted_expenses')
+
+
+@login_required
+def recurring_list(request):
+    if request.method == 'POST':
+        form = RecurringExpenseForm(request.POST, user=request.user)
+        if form.is_valid():
+            schedule = form.save(commit=False)
+            schedule.user = request.user
+            schedule.currency = schedule.currency or fx.preferred_currency(request.user.pk)
+            schedule.save()
+            # Occurrences already due (start date today or earlier) are created now
+            _, created = recurring.materialize(schedules=RecurringExpense.objects.filter(pk=schedule.pk))
+            messages.success(request, f'Recurring expense added; {created} expense(s) created so far.')
+            return redirect('recurring_list')
+    else:
+        form = RecurringExpenseForm(initial={'start_date': date.today()}, user=request.user)
+    schedules = RecurringExpense.objects.filter(user=request.user).select_related('category')
+    return render(request, 'expenses/recurring_list.html', {'form': form, 'schedules': schedules})
+
+
+@login_required
+@require_POST
+def delete_recurring(request, recurring_id):
+    # Expenses already generated are kept; they just lose the link
+    schedule = get_object_or_404(RecurringExpense, id=recurring_id, user=request.user)
+    schedule.delete()
+    messages.success(request, 'Recurring expense removed.')
+    return redirect('recurring_list')
+
+
+@login_required
+def import_expenses(request):
+    result = None
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = form.cleaned_data['file_format']
+            if fmt == 'auto':
+                fmt = importers.detect_format(upload.name)
+            if upload.size > settings.IMPORT_BACKGROUND_BYTES:
+                # Large statements go to the job queue instead of tying up the request
+                job = jobs.enqueue('import_expenses', request.user, {'format': fmt}, input_file=upload, max_attempts=1)
+                messages.info(request, 'Your statement is being imported in the background.')
+                return redirect('job_detail', job_id=job.id)
+            result = importers.import_file(request.user, upload.file, fmt)
+            if result.created:
+                messages.success(request, f"Imported {result.created} expenses.")
+            if result.error_count:
+                messages.warning(request, f"{result.error_count} rows could not be imported.")
+    else:
+        form = ImportForm()
+    return render(request, 'expenses/import_expenses.html', {'form': form, 'result': result})
+
+
 # ------------------------
 # Extra Utilities
 # ------------------------
 @login_required
+@conditional.conditional
+@database.replica_reads
 def month_total_api(request):
     start = date.today().replace(day=1)
-    total = Expense.objects.filter(user=request.user, date__gte=start).aggregate(total=Sum('amount'))['total'] or 0
+    qs = Expense.objects.filter(user=request.user, date__gte=start)
+    total = qs.aggregate(total=Sum(fx.converted()))['total'] or 0
     return JsonResponse({'month_total': float(total)})
 
 
+def expense_json(e):
+    return {
+        'id': e.id,
+        'title': e.title,
+        'amount': float(e.amount),
+        'currency': e.currency,
+        'date': e.date.isoformat(),
+        'category': e.category.name if e.category else None,
+        'description': e.description or '',
+    }
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+def expense_list_api(request):
+    """JSON pages of the expense list, for infinite scrolling."""
+    qs = Expense.objects.filter(user=request.user)
+    qs = apply_list_filters(qs, request.GET, request.user)
+    try:
+        limit = min(max(int(request.GET.get('limit', LIST_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = LIST_PAGE_SIZE
+    page = pagination.paginate(listed(qs), request.GET.get('cursor'), limit)
+
+    data = {
+        'results': [expense_json(e) for e in page],
+        'next': page.next_token,
+        'previous': page.previous_token,
+    }
+    if request.GET.get('total'):
+        filtered = any(request.GET.get(k) for k in ('q', 'start', 'end'))
+        data['total'] = pagination.approximate_total(request.user, qs, filtered)
+    return JsonResponse(data)
+
+
+@login_required
+@conditional.conditional
+def search_api(request):
+    """Best matches first for ?q=, with prefix matching on every word."""
+    try:
+        limit = min(max(int(request.GET.get('limit', LIST_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = LIST_PAGE_SIZE
+    ids = search.get_backend().search(request.user, request.GET.get('q', ''), limit)
+    found = Expense.objects.filter(user=request.user, id__in=ids).select_related('category').in_bulk()
+    return JsonResponse({'results': [expense_json(found[pk]) for pk in ids if pk in found]})
+
+
+EXPORT_FILTERS = ('q', 'start', 'end')
+
+
 @login_required
+@conditional.conditional
 def export_csv(request):
+    if request.GET.get('async'):
+        params = {k: request.GET[k] for k in EXPORT_FILTERS if request.GET.get(k)}
+        job = jobs.enqueue('export_csv', request.user, params)
+        return redirect('job_detail', job_id=job.id)
+
     qs = Expense.objects.filter(user=request.user).order_by('-date')
-    response = HttpResponse(content_type='text/csv')
+    qs = apply_list_filters(qs, request.GET, request.user)
+    response = StreamingHttpResponse(export_rows(qs), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="expenses.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Category', 'Title', 'Description', 'Amount'])
-    for e in qs:
-        writer.writerow([
-            e.date,
-            e.category.name if e.category else '',
-            e.title,
-            e.description or '',
-            float(e.amount)
-        ])
     return response
+
+
+@login_required
+def report(request):
+    """Statement for a date range; last calendar year unless chosen otherwise."""
+    last_year = date.today().year - 1
+    form = ReportForm(request.GET or None, initial={'start': date(last_year, 1, 1), 'end': date(last_year, 12, 31)})
+    if form.is_valid():
+        job = reports.request(request.user, form.cleaned_data['start'], form.cleaned_data['end'],
+                              form.cleaned_data['file_format'])
+        if job.status == Job.DONE:
+            return redirect('job_download', job_id=job.id)
+        return redirect('job_detail', job_id=job.id)
+    return render(request, 'expenses/report.html', {'form': form})
+
+
+# ------------------------
+# Background jobs
+# ------------------------
+def job_json(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'attempts': job.attempts,
+        'result': job.result,
+        'download_url': reverse('job_download', args=[job.id]) if job.result_file else None,
+    }
+
+
+@login_required
+def job_detail(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return render(request, 'expenses/job_detail.html', {'job': job})
+
+
+@login_required
+def job_status_api(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return JsonResponse(job_json(job))
+
+
+@login_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user, status=Job.DONE)
+    if not job.result_file:
+        raise Http404('This job has no file')
+    return FileResponse(job.result_file.open('rb'), as_attachment=True,
+                        filename=job.result.get('filename') or job.result_file.name.rsplit('/', 1)[-1])
+
+
+# ------------------------
+# Async (ASGI) variants of the read-heavy views.
+# Routed instead of the sync views when EXPENSES_ASYNC_VIEWS is on; see
+# expenses/urls.py and deploy/gunicorn_asgi.py.
+# ------------------------
+async def adashboard_payload(user, months_back):
+    """dashboard_payload() with its three reads awaited together."""
+    start_month, end_month = dashboard_months(months_back)
+    currency = await fx.apreferred_currency(user.pk)
+    cat_qs, monthly_qs, budget_qs = dashboard_querysets(user, start_month, end_month, currency)
+    cat_rows, monthly_rows, budget = await asyncio.gather(
+        alist(cat_qs), alist(monthly_qs), budget_qs.afirst(),
+    )
+    return shape_dashboard(cat_rows, monthly_rows, budget, start_month, end_month, currency)
+
+
+async def alist(qs):
+    return [row async for row in qs]
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+async def adashboard(request):
+    user = await request.auser()
+    months_back = max(int(request.GET.get('months', 6)), 1)
+    reads = [
+        caching.aget_or_build(
+            user.pk, 'dashboard', lambda: adashboard_payload(user, months_back),
+            months_back, date.today().strftime('%Y%m'),
+        ),
+        caching.adata_version(user.pk),
+    ]
+    if analytics.available():
+        reads.append(caching.aget_or_build(
+            user.pk, 'analytics', lambda: sync_to_async(analytics.summarise)(user), date.today().isoformat(),
+        ))
+    payload, data_version, *insights = await asyncio.gather(*reads)
+    insights = insights[0] if insights else None
+    # Lazy like the sync view: read by the render thread only on a fragment cache miss
+    recent_expenses = listed(Expense.objects.filter(user=user)).order_by('-date')[:10]
+    context = dict(payload, recent_expenses=recent_expenses, username=user.username,
+                   insights=insights, weekly_json=json.dumps(insights['weekly'] if insights else []),
+                   data_version=data_version, today=date.today().isoformat())
+    # Context processors (messages, auth) touch the session, so render off the event loop
+    return await sync_to_async(render)(request, 'expenses/dashboard.html', context)
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+async def aexpense_list(request):
+    if request.GET.get('page'):
+        return await sync_to_async(expense_list)(request)
+
+    user = await request.auser()
+    qs = listed(Expense.objects.filter(user=user))
+    qs = apply_list_filters(qs, request.GET, user)
+    q = request.GET.get('q')
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+
+    expenses, total, data_version = await asyncio.gather(
+        pagination.apaginate(qs, request.GET.get('cursor'), LIST_PAGE_SIZE),
+        pagination.aapproximate_total(user, qs, filtered=bool(q or start or end)),
+        caching.adata_version(user.pk),
+    )
+    next_query = page_query(request.GET, expenses.next_token) if expenses.has_next() else None
+    prev_query = page_query(request.GET, expenses.previous_token) if expenses.has_previous() else None
+
+    return await sync_to_async(render)(request, 'expenses/expense_list.html', {
+        'expenses': expenses, 'q': q, 'start': start, 'end': end,
+        'next_query': next_query, 'prev_query': prev_query, 'total': total,
+        'data_version': data_version,
+    })
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+async def amonth_total_api(request):
+    user = await request.auser()
+    start = date.today().replace(day=1)
+    qs = Expense.objects.filter(user=user, date__gte=start)
+    total = (await qs.aaggregate(total=Sum(fx.converted())))['total'] or 0
+    return JsonResponse({'month_total': float(total)})
+
+
+@login_required
+@conditional.conditional
+@database.replica_reads
+async def aexpense_list_api(request):
+    user = await request.auser()
+    qs = Expense.objects.filter(user=user)
+    qs = apply_list_filters(qs, request.GET, user)
+    try:
+        limit = min(max(int(request.GET.get('limit', LIST_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = LIST_PAGE_SIZE
+
+    reads = [pagination.apaginate(listed(qs), request.GET.get('cursor'), limit)]
+    if request.GET.get('total'):
+        filtered = any(request.GET.get(k) for k in ('q', 'start', 'end'))
+        reads.append(pagination.aapproximate_total(user, qs, filtered))
+    page, *total = await asyncio.gather(*reads)
+
+    data = {
+        'results': [expense_json(e) for e in page],
+        'next': page.next_token,
+        'previous': page.previous_token,
+    }
+    if total:
+        data['total'] = total[0]
+    return JsonResponse(data)
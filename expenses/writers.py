@@ -0,0 +1,411 @@
+# expenses/writers.py
+"""
+Streaming XLSX and PDF writers for the reports (expenses/reports.py).
+
+Both write straight to a file object as they go instead of building the
+document in memory, and neither needs a third-party package:
+- XlsxWriter streams each sheet row by row into its zip entry. Strings
+  are stored inline rather than in a shared-strings table, so memory use
+  stays flat however many rows a sheet has.
+- PdfWriter draws text in the standard Helvetica fonts, rectangles and
+  lines on A4 pages, and writes each page out as soon as the next one
+  starts. Charts are drawn as vector bars (see bars() and columns()).
+"""
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+# ---------------- XLSX ---------------- #
+EXCEL_EPOCH = date(1899, 12, 30)
+# XML 1.0 has no way to write most control characters
+XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>'
+)
+SHEET_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}<Relationship Id="rIdStyles" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/></Relationships>'
+)
+SHEET_REL = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+# cellXfs: 0 plain, 1 bold (headers), 2 date, 3 amount with thousands separators
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+PLAIN, BOLD, DATE, AMOUNT = range(4)
+FLUSH_ROWS = 500  # rows buffered between writes to the zip stream
+
+
+@lru_cache(maxsize=None)
+def column_name(index):
+    """'A' for 0, 'Z' for 25, 'AA' for 26..."""
+    name = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        name = chr(65 + rest) + name
+    return name
+
+
+def cell_xml(ref, value, bold=False):
+    """One <c> element; numbers, dates and Decimal amounts get their own styles."""
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="{DATE}"><v>{(value - EXCEL_EPOCH).days}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        style = f' s="{AMOUNT}"' if isinstance(value, Decimal) else ''
+        return f'<c r="{ref}"{style}><v>{value}</v></c>'
+    text = escape(XML_ILLEGAL_RE.sub('', str(value)))
+    style = f' s="{BOLD}"' if bold else ''
+    return f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class XlsxWriter:
+    """
+    Write an .xlsx workbook to `fileobj`, one sheet at a time:
+
+        with XlsxWriter(fh) as book:
+            book.add_sheet('Expenses', rows, header=['Date', 'Amount'])
+    """
+
+    def __init__(self, fileobj):
+        self.zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        self.sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_sheet(self, title, rows, header=(), widths=()):
+        """
+        Stream the iterable `rows` (sequences of cell values) into a new
+        sheet under an optional bold `header` row. `widths` are column
+        widths in characters. Returns the number of rows written.
+        """
+        self.sheets.append(title[:31])
+        written = 0
+        with self.zip.open(f'xl/worksheets/sheet{len(self.sheets)}.xml', 'w') as out:
+            out.write(SHEET_HEAD.encode())
+            if widths:
+                cols = ''.join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>'
+                               for i, w in enumerate(widths, start=1))
+                out.write(f'<cols>{cols}</cols>'.encode())
+            out.write(b'<sheetData>')
+            line = 0
+            if header:
+                line += 1
+                out.write(self.row_xml(line, header, bold=True).encode())
+            buffered = []
+            for row in rows:
+                line += 1
+                buffered.append(self.row_xml(line, row))
+                if len(buffered) == FLUSH_ROWS:
+                    out.write(''.join(buffered).encode())
+                    written += len(buffered)
+                    buffered = []
+            out.write(''.join(buffered).encode() + b'</sheetData></worksheet>')
+            written += len(buffered)
+        return written
+
+    @staticmethod
+    def row_xml(line, values, bold=False):
+        cells = ''.join(cell_xml(f'{column_name(i)}{line}', v, bold) for i, v in enumerate(values))
+        return f'<row r="{line}">{cells}</row>'
+
+    def close(self):
+        numbers = range(1, len(self.sheets) + 1)
+        self.zip.writestr('[Content_Types].xml', CONTENT_TYPES.format(
+            sheets=''.join(SHEET_TYPE.format(n=n) for n in numbers)))
+        self.zip.writestr('_rels/.rels', PACKAGE_RELS)
+        self.zip.writestr('xl/workbook.xml', WORKBOOK.format(sheets=''.join(
+            f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, title in zip(numbers, self.sheets))))
+        self.zip.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS.format(
+            sheets=''.join(SHEET_REL.format(n=n) for n in numbers)))
+        self.zip.writestr('xl/styles.xml', STYLES)
+        self.zip.close()
+
+
+# ---------------- PDF ---------------- #
+# Advance widths of ASCII 32..126 in Helvetica, in 1/1000 of the font size
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+BOLD_FACTOR = 1.06  # Helvetica-Bold runs about this much wider
+FONTS = ('Helvetica', 'Helvetica-Bold')
+GREY, LIGHT_GREY, GREEN, RED = (0.45, 0.45, 0.45), (0.9, 0.9, 0.9), (0.1, 0.53, 0.33), (0.86, 0.21, 0.27)
+
+
+def text_width(text, size, bold=False):
+    units = sum(HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) < 127 else 556 for c in text)
+    return units * size / 1000 * (BOLD_FACTOR if bold else 1)
+
+
+def fit(text, width, size, bold=False):
+    """`text` shortened with an ellipsis to fit in `width` points."""
+    text = str(text)
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + '...', size, bold) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def pdf_string(text):
+    # WinAnsiEncoding is cp1252; anything outside it prints as '?'
+    raw = str(text).encode('cp1252', 'replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class PdfWriter:
+    """
+    Write a PDF to `fileobj` top to bottom. Drawing calls use PDF points
+    with the origin at the bottom left; the flow helpers (heading(),
+    paragraph(), table(), bars(), columns()) keep a cursor `y` and start a
+    new page when the next block would not fit.
+    """
+    WIDTH, HEIGHT = 595, 842  # A4
+    MARGIN = 50
+
+    def __init__(self, fileobj, title=''):
+        self.out = fileobj
+        self.position = 0
+        self.offsets = {}        # object number -> byte offset
+        self.pages = []          # page object numbers
+        self.next_number = 3 + len(FONTS)  # 1 catalog, 2 page tree, then the fonts
+        self.title = title
+        self.ops = []
+        self.y = self.HEIGHT - self.MARGIN
+        self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------- low level -------- #
+    def write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def new_object(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def write_object(self, number, body):
+        self.offsets[number] = self.position
+        self.write(f'{number} 0 obj\n'.encode() + body + b'\nendobj\n')
+
+    def finish_page(self):
+        content = zlib.compress('\n'.join(self.ops).encode('latin-1'))
+        stream, page = self.new_object(), self.new_object()
+        self.write_object(stream, f'<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n'.encode()
+                          + content + b'\nendstream')
+        fonts = ' '.join(f'/F{i} {3 + i} 0 R' for i in range(len(FONTS)))
+        self.write_object(page, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.WIDTH} {self.HEIGHT}] '
+            f'/Resources << /Font << {fonts} >> >> /Contents {stream} 0 R >>'
+        ).encode())
+        self.pages.append(page)
+        self.ops = []
+        self.y = self.HEIGHT - self.MARGIN
+
+    def close(self):
+        if self.ops or not self.pages:
+            self.finish_page()
+        for i, name in enumerate(FONTS):
+            self.write_object(3 + i, f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} '
+                                     f'/Encoding /WinAnsiEncoding >>'.encode())
+        kids = ' '.join(f'{p} 0 R' for p in self.pages)
+        self.write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>'.encode())
+        self.write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        info = self.new_object()
+        self.write_object(info, b'<< /Title ' + pdf_string(self.title) + b' /Producer (SmartExpense) >>')
+        xref = self.position
+        count = self.next_number
+        entries = ''.join(f'{self.offsets[n]:010d} 00000 n \n' for n in range(1, count))
+        self.write(f'xref\n0 {count}\n0000000000 65535 f \n{entries}'.encode())
+        self.write(f'trailer\n<< /Size {count} /Root 1 0 R /Info {info} 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+
+    def text(self, x, y, text, size=10, bold=False, align='left', color=None):
+        if align == 'right':
+            x -= text_width(text, size, bold)
+        elif align == 'center':
+            x -= text_width(text, size, bold) / 2
+        fill = '{:.3f} {:.3f} {:.3f} rg '.format(*color) if color else '0 g '
+        self.ops.append(f'BT {fill}/F{int(bold)} {size} Tf {x:.2f} {y:.2f} Td '
+                        + pdf_string(text).decode('latin-1') + ' Tj ET')
+
+    def rect(self, x, y, width, height, color):
+        self.ops.append('{:.3f} {:.3f} {:.3f} rg '.format(*color) + f'{x:.2f} {y:.2f} {width:.2f} {height:.2f} re f')
+
+    def line(self, x1, y1, x2, y2, color=LIGHT_GREY, width=0.5):
+        self.ops.append('{:.3f} {:.3f} {:.3f} RG '.format(*color)
+                        + f'{width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S')
+
+    # -------- flow layout -------- #
+    @property
+    def content_width(self):
+        return self.WIDTH - 2 * self.MARGIN
+
+    def ensure(self, height):
+        """Start a new page unless `height` points fit below the cursor."""
+        if self.y - height < self.MARGIN:
+            self.finish_page()
+
+    def heading(self, text, size=14):
+        self.ensure(size + 40)  # keep a heading with the first lines under it
+        self.y -= size + 6
+        self.text(self.MARGIN, self.y, text, size, bold=True)
+        self.y -= 8
+
+    def paragraph(self, text, size=10, color=None):
+        self.ensure(size + 4)
+        self.y -= size + 4
+        self.text(self.MARGIN, self.y, fit(text, self.content_width, size), size, color=color)
+
+    def table(self, header, rows, widths, align=(), size=9):
+        """
+        Rows of cell strings in columns `widths` points wide (scaled to the
+        page width); `align` holds 'left' or 'right' per column. The
+        header is repeated on every page the table runs onto.
+        """
+        scale = self.content_width / sum(widths)
+        widths = [w * scale for w in widths]
+        align = list(align) + ['left'] * (len(widths) - len(align))
+        height = size + 6
+
+        def draw(cells, bold=False):
+            x = self.MARGIN
+            for value, width, side in zip(cells, widths, align):
+                value = fit(value, width - 6, size, bold)
+                if side == 'right':
+                    self.text(x + width - 3, self.y + 4, value, size, bold, align='right')
+                else:
+                    self.text(x + 3, self.y + 4, value, size, bold)
+                x += width
+
+        def draw_header():
+            self.y -= height
+            self.rect(self.MARGIN, self.y, self.content_width, height, LIGHT_GREY)
+            draw(header, bold=True)
+
+        self.ensure(2 * height)
+        draw_header()
+        for row in rows:
+            if self.y - height < self.MARGIN:
+                self.finish_page()
+                draw_header()
+            self.y -= height
+            draw(row)
+            self.line(self.MARGIN, self.y, self.MARGIN + self.content_width, self.y)
+        self.y -= 6
+
+    def bars(self, labels, values, color=GREEN, size=8, bar=12):
+        """Horizontal bar chart, one labelled bar per value, longest bar across the page."""
+        if not values:
+            return
+        label_width = self.content_width * 0.3
+        value_width = 70
+        span = self.content_width - label_width - value_width
+        top = max(values) or 1
+        for label, value in zip(labels, values):
+            self.ensure(bar + 4)
+            self.y -= bar + 4
+            self.text(self.MARGIN, self.y + 3, fit(label, label_width - 6, size), size)
+            length = max(span * value / top, 0.5)
+            self.rect(self.MARGIN + label_width, self.y, length, bar, color)
+            self.text(self.MARGIN + label_width + length + 4, self.y + 3, f'{value:,.2f}', size, color=GREY)
+        self.y -= 8
+
+    def columns(self, labels, values, marks=(), color=GREEN, height=140, size=7):
+        """
+        Vertical bar chart of `values` with `labels` along the bottom.
+        `marks` are optional per-column reference values (budget limits),
+        drawn as red ticks.
+        """
+        if not values:
+            return
+        self.ensure(height + 30)
+        base = self.y - height - 12
+        top = max([*values, *(m for m in marks if m)]) or 1
+        slot = self.content_width / len(values)
+        width = slot * 0.7
+        self.line(self.MARGIN, base, self.MARGIN + self.content_width, base, GREY)
+        self.text(self.MARGIN, self.y - 4, f'max {top:,.2f}', size, color=GREY)
+        marks = list(marks) + [None] * (len(values) - len(marks))
+        for i, (label, value, mark) in enumerate(zip(labels, values, marks)):
+            x = self.MARGIN + i * slot + (slot - width) / 2
+            self.rect(x, base, width, max((height - 10) * value / top, 0.5), color)
+            if mark:
+                level = base + (height - 10) * mark / top
+                self.line(x - 2, level, x + width + 2, level, RED, 1.5)
+            self.text(x + width / 2, base - 10, fit(label, slot, size), size, align='center')
+        self.y = base - 20
@@ -2,6 +2,8 @@
 ASGI config for tracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Set ASYNC_VIEWS=1 to route the read-heavy views to their async variants;
+deploy/gunicorn_asgi.py does this and runs the app under uvicorn workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
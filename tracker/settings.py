@@ -11,22 +11,33 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Settings profile: DJANGO_ENV=prod for a deployment (no DEBUG, secret key
+# and hosts from the environment, tuned database connections); anything
+# else is the development setup below.
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+PRODUCTION = DJANGO_ENV == 'prod'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-9n_1#m4j^zb$c$)!@0bh8pwlsc95iiqaonb-lzpxdh!#n7!^0^'
+SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-9n_1#m4j^zb$c$)!@0bh8pwlsc95iiqaonb-lzpxdh!#n7!^0^')
+if PRODUCTION and 'SECRET_KEY' not in os.environ:
+    raise ImproperlyConfigured('Set SECRET_KEY in the environment when DJANGO_ENV=prod.')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [h for h in os.environ.get('ALLOWED_HOSTS', '').split(',') if h]
 
 
 # Application definition
@@ -48,6 +59,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'expenses.middleware.StaticFilesMiddleware',
+    'expenses.middleware.PerformanceMiddleware',
+    'expenses.middleware.PrimaryAfterWriteMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +71,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view query/latency metrics (see expenses/perf.py)
+PERF_MONITORING = os.environ.get('PERF_MONITORING', '1') == '1'
+PERF_LOG_FILE = os.environ.get('PERF_LOG_FILE')  # JSON lines read by `manage.py perf_report`
+
+# Serve dashboard/list/month-total views from their async variants (ASGI only;
+# see deploy/gunicorn_asgi.py). Under WSGI the sync views are faster.
+EXPENSES_ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
@@ -66,9 +88,10 @@ ROOT_URLCONF = 'tracker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Standard Django templates, with render time recorded for perf reports
+        'BACKEND': 'expenses.perf.TimedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
+        'APP_DIRS': not PRODUCTION,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
@@ -78,6 +101,14 @@ TEMPLATES = [
         },
     },
 ]
+if PRODUCTION:
+    # Compiled templates are kept for the life of the process (no file checks)
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'tracker.wsgi.application'
 
@@ -85,12 +116,155 @@ WSGI_APPLICATION = 'tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default; DB_ENGINE=postgres (with DB_NAME, DB_USER, DB_PASSWORD,
+# DB_HOST, DB_PORT) for PostgreSQL. Connection tuning and replica routing
+# live in expenses/database.py.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # Either a psycopg pool per process (DB_POOL=1, needs psycopg[pool]) or
+    # persistent connections; Django does not allow both at once
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'smartexpense'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600 if PRODUCTION else 0)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {'min_size': 2, 'max_size': int(os.environ.get('DB_POOL_SIZE', 10)), 'timeout': 10},
+            } if DB_POOL else {},
+        }
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': 600 if PRODUCTION else 0,
+            # Writers take the lock when their transaction starts (no deadlocked
+            # read-to-write upgrades) and wait up to 20s for it
+            'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'} if PRODUCTION else {},
+        }
     }
+    if os.environ.get('SQLITE_REPLICA_PATH'):
+        # A read-only copy kept in sync by e.g. LiteFS or Litestream
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.environ['SQLITE_REPLICA_PATH'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# Applied to every new SQLite connection. WAL lets readers carry on while a
+# writer commits; synchronous=NORMAL is durable across crashes of the app
+# (not of the OS) in WAL mode; mmap and a 64 MB page cache cut read syscalls.
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS if PRODUCTION else {}
+
+# Dashboard and listing reads go to the replica when there is one
+DATABASE_ROUTERS = ['expenses.database.ReplicaRouter']
+DATABASE_REPLICA = 'replica' if 'replica' in DATABASES else None
+REPLICA_PIN_SECONDS = 5   # reads stay on the primary this long after a browser writes
+
+
+# Cache
+# Local memory by default; set CACHE_BACKEND=file or CACHE_BACKEND=redis
+# (with CACHE_LOCATION) to share the dashboard cache between processes.
+# The per-user data versions that invalidate cached pages live in this
+# cache, so a deployment (several workers) must use a shared one: with
+# local memory a write would only be seen by the worker that took it.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if PRODUCTION and CACHE_BACKEND not in ('file', 'redis'):
+    raise ImproperlyConfigured('Set CACHE_BACKEND=redis or CACHE_BACKEND=file when DJANGO_ENV=prod; '
+                               'the local-memory cache is not shared between workers.')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'smartexpense',
+        }
+    }
+
+EXPENSES_CACHE_ALIAS = 'default'
+
+# ETag/Last-Modified and 304 responses on the user pages (expenses/conditional.py).
+# They are only as fresh as the data versions in the cache, so they are off by
+# default with the local-memory cache, which workers and commands do not share.
+CONDITIONAL_GETS = os.environ.get('CONDITIONAL_GETS', '0' if CACHE_BACKEND == 'locmem' else '1') == '1'
+
+# Sessions: SESSION_PROFILE=db, cached_db, cache or signed_cookies.
+# - cached_db reads sessions from the cache and falls back to (and writes
+#   through to) the database; the default with a shared cache.
+# - cache keeps them only in the cache: no database at all, but a session
+#   is lost (the user logged out) when the cache evicts it.
+# - signed_cookies keeps them in the browser; nothing is stored server-side,
+#   so a session cannot be revoked before it expires.
+# The local-memory cache is per process, so with it the default is db:
+# a logout in one worker would not reach the others' caches.
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'db' if CACHE_BACKEND == 'locmem' else 'cached_db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+if SESSION_PROFILE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f'Unknown SESSION_PROFILE {SESSION_PROFILE!r}.')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+SESSION_CACHE_ALIAS = 'default'
+# Flash messages ride in a cookie, so showing one never writes the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Deleted expenses can be restored for this long before
+# `manage.py purge_deleted_expenses` removes them for good
+EXPENSE_PURGE_DAYS = 30
+
+# Budget warnings fire when spending crosses these percentages of a budget
+BUDGET_ALERT_THRESHOLDS = (80, 100)
+
+# Currencies (see expenses/fx.py, rates loaded with `manage.py load_fx_rates`).
+# FxRate.rate is the value of one unit of a currency in FX_BASE_CURRENCY.
+FX_BASE_CURRENCY = 'INR'
+FX_CACHE_MONTHS = 36      # months of rates kept by the in-process rate cache
+FX_CACHE_SECONDS = 300    # re-read cached rates after this long (other processes may load new ones)
+
+# Each process keeps the Category table in memory (expenses/categories.py),
+# reloaded when the shared cache says a category changed, and at least this often
+CATEGORY_CACHE_SECONDS = 60
 
 
 # Password validation
@@ -111,6 +285,38 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profile: PASSWORD_HASHER_PROFILE=argon2 (needs the
+# argon2-cffi package) or pbkdf2 (default). New passwords use the first
+# hasher below; a password stored with another hasher, or with other cost
+# parameters, is rehashed the next time its owner logs in.
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+PASSWORD_HASHERS = [
+    'users.hashers.TunedPBKDF2PasswordHasher',
+    'users.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER_PROFILE == 'argon2':
+    if find_spec('argon2') is None:
+        raise ImproperlyConfigured('PASSWORD_HASHER_PROFILE=argon2 needs the argon2-cffi package.')
+    PASSWORD_HASHERS[:2] = PASSWORD_HASHERS[1::-1]
+elif PASSWORD_HASHER_PROFILE != 'pbkdf2':
+    raise ImproperlyConfigured(f'Unknown PASSWORD_HASHER_PROFILE {PASSWORD_HASHER_PROFILE!r}.')
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000))
+# OWASP's Argon2id baseline: 19 MiB, two passes, one lane per hash
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19 * 1024))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+# Failed logins and registrations allowed per AUTH_THROTTLE_WINDOW seconds,
+# per client IP and per username (users/throttle.py)
+AUTH_THROTTLE_WINDOW = 300
+AUTH_THROTTLE_LIMITS = {
+    'login:ip': 20,
+    'login:username': 5,
+    'register:ip': 10,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -135,6 +341,33 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# In prod, collectstatic writes content-hashed names plus .gz/.br copies
+# (expenses/storage.py), which expenses.middleware.StaticFilesMiddleware
+# serves with far-future cache headers. Vendored Bootstrap, icons and
+# Chart.js: see expenses/assets.py and `manage.py vendor_assets`. Until
+# expenses/static/vendor/ is committed, pages load the files not downloaded
+# yet from the CDN; set VENDOR_CDN_FALLBACK=0 to require the local copies.
+VENDOR_CDN_FALLBACK = os.environ.get('VENDOR_CDN_FALLBACK', '1') == '1'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': ('expenses.storage.CompressedManifestStaticFilesStorage' if PRODUCTION
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+STATIC_MAX_AGE = 60   # seconds, for static files requested by their unhashed name
+
+# Uploaded files (avatars, background job inputs and results)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Background jobs (see expenses/jobs.py, run with `manage.py run_workers`)
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 30      # seconds before the first retry, doubled each time
+JOBS_STALE_AFTER = 600     # requeue running jobs silent for this many seconds
+IMPORT_BACKGROUND_BYTES = 2 * 1024 * 1024  # bigger uploads are imported by a worker
+REPORT_BACKGROUND_ROWS = 20000  # reports over more expenses than this are generated by a worker
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
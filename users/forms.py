@@ -1,7 +1,20 @@
 # users/forms.py
+import math
+
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+from expenses.forms import RegisterForm
+from . import throttle
+
+THROTTLED_MESSAGE = 'Too many failed attempts. Please try again in %(minutes)s minute(s).'
+
+
+def throttled_error(seconds):
+    return ValidationError(THROTTLED_MESSAGE, code='throttled', params={'minutes': math.ceil(seconds / 60)})
+
 
 class CustomUserCreationForm(UserCreationForm):
     #email = forms.EmailField(required=)
@@ -9,3 +22,37 @@ class CustomUserCreationForm(UserCreationForm):
     class Meta:
         model = User
         fields = ['username', 'password1', 'password2']
+
+
+class ThrottledAuthenticationForm(AuthenticationForm):
+    """
+    AuthenticationForm that checks the failed-login limits (throttle.py)
+    before the password is hashed, and counts the failures. After
+    is_valid(), get_user() is the authenticated user: there is no need to
+    call authenticate() again.
+    """
+    def clean(self):
+        username = self.cleaned_data.get('username')
+        wait = throttle.retry_after(self.request, 'login', username)
+        if wait:
+            raise throttled_error(wait)
+        try:
+            cleaned = super().clean()
+        except ValidationError:
+            throttle.failed(self.request, 'login', username)
+            raise
+        throttle.succeeded(self.request, 'login', username)
+        return cleaned
+
+
+class ThrottledRegisterForm(RegisterForm):
+    """RegisterForm refused outright while the client IP is over its failed-registration limit."""
+    def __init__(self, request, *args, **kwargs):
+        self.request = request
+        super().__init__(*args, **kwargs)
+
+    def clean(self):
+        wait = throttle.retry_after(self.request, 'register')
+        if wait:
+            raise throttled_error(wait)
+        return super().clean()
@@ -0,0 +1,34 @@
+# users/hashers.py
+"""
+Password hashers whose cost comes from settings (PBKDF2_ITERATIONS,
+ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM) rather than
+Django's built-in defaults.
+
+They keep Django's algorithm names, so passwords already stored as
+pbkdf2_sha256 or argon2 keep verifying. Django's must_update() compares a
+stored hash with the current parameters; when they differ, or the hash
+belongs to a hasher other than the first in PASSWORD_HASHERS, the
+password is rehashed on the owner's next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,77 @@
+import logging
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from expenses.perf import percentile
+from users import throttle
+
+
+class Command(BaseCommand):
+    help = ("Time login requests through the test client and report logins per second per core for the "
+            "configured password hasher, next to failed and throttled attempts. Seeded users "
+            "(`manage.py seed_expenses`) have the password 'seed-password'.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to log in as (default: the first user).')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        users = User.objects.order_by('pk')
+        user = users.filter(username=opts['user']).first() if opts['user'] else users.first()
+        if user is None or not user.check_password(opts['password']):
+            raise CommandError('Need an existing user and their password (--user, --password).')
+        # check_password() rehashed the password if the hasher settings changed, so every
+        # timed login below verifies a hash made with the current settings.
+        hasher = get_hasher()
+        self.stdout.write(f"hasher={hasher.algorithm} {self.cost(hasher)} runs={opts['iterations']}")
+        self.stdout.write(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'per s/core':>12}")
+
+        url = reverse('login')
+        good = {'username': user.get_username(), 'password': opts['password']}
+        scenarios = [
+            ('login', good, {}),
+            ('wrong password', {**good, 'password': opts['password'] + '!'}, {}),
+            # Every attempt is refused by the username limit before any hashing
+            ('throttled', {**good, 'password': opts['password'] + '!'}, {'login:username': 1}),
+        ]
+        setup_test_environment()
+        # Refused attempts would each log a "Too Many Requests" warning
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        try:
+            for name, data, limits in scenarios:
+                with override_settings(AUTH_THROTTLE_LIMITS=limits):
+                    timings = self.measure(url, data, opts['iterations'])
+                p50 = percentile(timings, 50)
+                self.stdout.write(f"{name:<22}{p50:>10.2f}{percentile(timings, 95):>10.2f}"
+                                  f"{1000 / statistics.fmean(timings):>12.1f}")
+        finally:
+            teardown_test_environment()
+            # Forget the failures counted against the user
+            with override_settings(AUTH_THROTTLE_LIMITS={'login:username': 1}):
+                throttle.succeeded(RequestFactory().post(url), 'login', user.get_username())
+
+    @staticmethod
+    def measure(url, data, iterations):
+        timings = []
+        for i in range(iterations + 1):
+            client = Client()
+            started = time.perf_counter()
+            client.post(url, data)
+            if i:  # the first request warms up templates and connections
+                timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)
+
+    @staticmethod
+    def cost(hasher):
+        if hasher.algorithm == 'argon2':
+            return f'time_cost={hasher.time_cost} memory_cost={hasher.memory_cost} parallelism={hasher.parallelism}'
+        return f'iterations={getattr(hasher, "iterations", "?")}'
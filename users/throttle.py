@@ -0,0 +1,100 @@
+# users/throttle.py
+"""
+Sliding-window limits on failed logins and registrations.
+
+Failures are counted per action and scope, for instance failed logins
+from one IP, or for one username. AUTH_THROTTLE_LIMITS in settings gives
+the number allowed in any AUTH_THROTTLE_WINDOW seconds.
+
+Each (action:scope, identity) has one counter per fixed window in the
+cache (expenses.caching.get_cache()). The count for the last
+AUTH_THROTTLE_WINDOW seconds is the current window's counter plus the
+previous one, weighted by the share of it still inside the sliding
+window. That approximates a true sliding window without storing every
+attempt, and counters only move with cache.incr(), so concurrent workers
+never lose a count.
+
+A blocked attempt is refused before any password is hashed. A
+credential-stuffing burst therefore costs one cache read per request
+instead of one hash.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+
+from expenses.caching import get_cache
+
+DEFAULT_LIMITS = {'login:ip': 20, 'login:username': 5, 'register:ip': 10}
+
+
+def window():
+    return getattr(settings, 'AUTH_THROTTLE_WINDOW', 300)
+
+
+def limits():
+    return getattr(settings, 'AUTH_THROTTLE_LIMITS', DEFAULT_LIMITS)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def identities(request, action, username=None):
+    """[(action:scope, identity)] that an attempt counts against, limited ones only."""
+    found = [(f'{action}:ip', client_ip(request))]
+    if username:
+        found.append((f'{action}:username', username.strip().lower()))
+    return [(name, value) for name, value in found if limits().get(name)]
+
+
+def counter_key(name, value, slot):
+    # Hashed so any username makes a valid cache key
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f'throttle:{name}:{digest}:{slot}'
+
+
+def retry_after(request, action, username=None):
+    """Seconds until this attempt would be allowed; 0 when it is allowed now."""
+    checked = identities(request, action, username)
+    if not checked:
+        return 0
+    now, length = time.time(), window()
+    slot, elapsed = divmod(now, length)
+    slot = int(slot)
+    keys = {(name, value): (counter_key(name, value, slot), counter_key(name, value, slot - 1))
+            for name, value in checked}
+    counts = get_cache().get_many([key for pair in keys.values() for key in pair])
+    for (name, value), (current, previous) in keys.items():
+        current, previous, limit = counts.get(current, 0), counts.get(previous, 0), limits()[name]
+        if current + previous * (1 - elapsed / length) < limit:
+            continue
+        if current >= limit:
+            # Wait for this window to become the previous one and fade below the limit
+            return max(math.ceil(length - elapsed + length * (1 - limit / current)), 1)
+        return max(math.ceil(length * (1 - (limit - current) / previous) - elapsed), 1)
+    return 0
+
+
+def failed(request, action, username=None):
+    """Count a failed attempt against every identity it was made with."""
+    cache = get_cache()
+    slot = int(time.time() // window())
+    for name, value in identities(request, action, username):
+        key = counter_key(name, value, slot)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Kept for two windows: as the current one, then as the previous one
+            if not cache.add(key, 1, 2 * window()):
+                cache.incr(key)
+
+
+def succeeded(request, action, username=None):
+    """Forget the username's failures after a successful attempt (the IP's still count)."""
+    slot = int(time.time() // window())
+    keys = [counter_key(name, value, s) for name, value in identities(request, action, username)
+            if name.endswith(':username') for s in (slot, slot - 1)]
+    if keys:
+        get_cache().delete_many(keys)
@@ -1,48 +1,51 @@
 # users/views.py
 from django.shortcuts import render, redirect
-from django.contrib.auth import login, authenticate, logout
-from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth import login, logout
 from django.contrib import messages
-from expenses.forms import RegisterForm
+from django.core.exceptions import NON_FIELD_ERRORS
+from . import throttle
+from .forms import ThrottledAuthenticationForm, ThrottledRegisterForm
+
+
+def throttled_status(form):
+    """429 for a form refused by the throttle, else 200."""
+    return 429 if form.has_error(NON_FIELD_ERRORS, 'throttled') else 200
 
 
 # ------------------ REGISTER VIEW ------------------ #
 def register(request):
+    status = 200
     if request.method == "POST":
-        form = RegisterForm(request.POST)
+        form = ThrottledRegisterForm(request, request.POST)
         if form.is_valid():
             user = form.save()
             # Do NOT auto-login here. Redirect to login page with success message.
             messages.success(request, 'Registration successful. Please log in.')
             return redirect('login')
+        status = throttled_status(form)
+        if status == 200:
+            throttle.failed(request, 'register')
     else:
-        form = RegisterForm()
+        form = ThrottledRegisterForm(request)
 
-    return render(request, 'users/register.html', {'form': form})
+    return render(request, 'users/register.html', {'form': form}, status=status)
 
 
 
 # ------------------ LOGIN VIEW ------------------ #
 def user_login(request):
+    status = 200
     if request.method == "POST":
-        form = AuthenticationForm(request, data=request.POST)
+        # The form authenticates (once) and enforces the failed-login throttle
+        form = ThrottledAuthenticationForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get("username")
-            password = form.cleaned_data.get("password")
-
-            user = authenticate(username=username, password=password)
-
-            if user is not None:
-                login(request, user)
-                return redirect('dashboard')
-            else:
-                messages.error(request, "Invalid username or password.")
-        else:
-            messages.error(request, "Invalid username or password.")
+            login(request, form.get_user())
+            return redirect('dashboard')
+        status = throttled_status(form)
     else:
-        form = AuthenticationForm()
+        form = ThrottledAuthenticationForm(request)
 
-    return render(request, 'users/login.html', {'form': form})
+    return render(request, 'users/login.html', {'form': form}, status=status)
 
 # ------------------ LOGOUT VIEW ------------------ #
 def user_logout(request):